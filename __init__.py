@@ -32,6 +32,12 @@ app.config['ADMIN_PASSWORD'] = os.environ.get('ADMIN_PASSWORD') or os.environ.ge
 app.config['DEFAULT_USER'] = os.environ.get('DEFAULT_USER') or 'user'
 app.config['DEFAULT_PASSWORD'] = os.environ.get('DEFAULT_PASSWORD') or 'password'
 
+# Password hashing policy, stored hashes using other parameters are upgraded on next successful login
+# Measure candidate settings with scripts/password_hash_benchmark.py
+app.config['PASSWORD_HASH_ALGORITHM'] = os.environ.get('PASSWORD_HASH_ALGORITHM') or 'pbkdf2:sha256'
+app.config['PASSWORD_HASH_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 600000)
+app.config['PASSWORD_SALT_LENGTH'] = int(os.environ.get('PASSWORD_SALT_LENGTH') or 10)
+
 # Browser settings
 SECRET_KEY = os.environ.get('SECRET_KEY') or 'SECRET_KEY'
 SESSION_COOKIE_NAME = os.environ.get('SESSION_COOKIE_NAME') or 'sess_python_flask'
@@ -78,6 +84,68 @@ app.config['UPLOAD_EXTENSIONS'] = ['.jpg', '.png', '.gif']
 app.config['UPLOAD_FOLDER'] = os.path.join(app.instance_path, 'uploads')
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Facial recognition settings, face encoding runs in a process pool per web worker,
+# FACE_QUEUE_DEPTH jobs at once across all workers, waiting FACE_SLOT_WAIT seconds for a free slot
+app.config['FACE_WORKERS'] = int(os.environ.get('FACE_WORKERS') or 2)
+app.config['FACE_QUEUE_DEPTH'] = int(os.environ.get('FACE_QUEUE_DEPTH') or 8)
+app.config['FACE_TIMEOUT'] = float(os.environ.get('FACE_TIMEOUT') or 10)
+app.config['FACE_DETECT_SIZE'] = int(os.environ.get('FACE_DETECT_SIZE') or 640)
+app.config['FACE_SLOT_WAIT'] = float(os.environ.get('FACE_SLOT_WAIT') or 0.2)
+app.config['FACE_SLOT_DIR'] = os.path.join(app.instance_path, 'face_slots')
+
+# Timelapse settings, rendered outputs are cached on disk up to TIMELAPSE_CACHE_BYTES
+app.config['TIMELAPSE_CACHE_BYTES'] = int(os.environ.get('TIMELAPSE_CACHE_BYTES') or 2 * 1024 * 1024 * 1024)
+app.config['TIMELAPSE_DOWNLOAD_WORKERS'] = int(os.environ.get('TIMELAPSE_DOWNLOAD_WORKERS') or 8)
+app.config['TIMELAPSE_RENDER_WORKERS'] = int(os.environ.get('TIMELAPSE_RENDER_WORKERS') or 1)
+
+# Video archive retention, see applyRetention in model/video_archive.py
+app.config['VIDEO_COMPACT_AFTER_HOURS'] = int(os.environ.get('VIDEO_COMPACT_AFTER_HOURS') or 24)
+app.config['VIDEO_COMPACT_SPEED'] = float(os.environ.get('VIDEO_COMPACT_SPEED') or 10)
+app.config['VIDEO_RAW_RETENTION_DAYS'] = int(os.environ.get('VIDEO_RAW_RETENTION_DAYS') or 7)
+app.config['VIDEO_HOURLY_RETENTION_DAYS'] = int(os.environ.get('VIDEO_HOURLY_RETENTION_DAYS') or 90)
+app.config['VIDEO_PROXY_CACHE_BYTES'] = int(os.environ.get('VIDEO_PROXY_CACHE_BYTES') or 1024 * 1024 * 1024)
+
+# Health sampler, seconds between samples, samples kept, and seconds CPU/network rates are averaged over
+app.config['HEALTH_SAMPLE_INTERVAL'] = float(os.environ.get('HEALTH_SAMPLE_INTERVAL') or 1)
+app.config['HEALTH_HISTORY'] = int(os.environ.get('HEALTH_HISTORY') or 300)
+app.config['HEALTH_RATE_WINDOW'] = float(os.environ.get('HEALTH_RATE_WINDOW') or 5)
+
+# Prometheus metrics at /api/metrics, served only with a bearer token, off until METRICS_TOKEN is set
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN') or None
+
+# Request profiler, see model/request_profiler.py, slow request capture is off until PROFILE_SLOW_MS is set
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS') or 5)
+app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS') or 0)
+app.config['PROFILE_RING'] = int(os.environ.get('PROFILE_RING') or 100)
+app.config['PROFILE_ROUTES'] = os.environ.get('PROFILE_ROUTES') or ''
+
+# Table backups, see model/table_backup.py, tables are streamed BACKUP_CHUNK_ROWS at a time
+app.config['BACKUP_DIR'] = os.environ.get('BACKUP_DIR') or 'backup'
+app.config['BACKUP_WORKERS'] = int(os.environ.get('BACKUP_WORKERS') or 4)
+app.config['BACKUP_CHUNK_ROWS'] = int(os.environ.get('BACKUP_CHUNK_ROWS') or 1000)
+
+# SQLite snapshots, see model/db_snapshot.py, 168 keeps a week of hourly snapshots
+app.config['SNAPSHOT_CHUNK_BYTES'] = int(os.environ.get('SNAPSHOT_CHUNK_BYTES') or 64 * 1024)
+app.config['SNAPSHOT_KEEP'] = int(os.environ.get('SNAPSHOT_KEEP') or 168)
+
+# Background tasks run by one server process, see model/preload.py, comma separated, e.g. 'checker,twitter'
+# Empty by default, the border checker sends emails and SMS, so each deploy opts in to the tasks it wants
+app.config['BACKGROUND_TASKS'] = os.environ.get('BACKGROUND_TASKS') or ''
+
+# Twitter/X ingestion, see api/twitter_search.py, point TWITTER_API_URL at scripts/twitter_stub_server.py to test
+app.config['TWITTER_API_URL'] = os.environ.get('TWITTER_API_URL') or 'https://api.twitter.com'
+app.config['TWITTER_INTERVAL'] = int(os.environ.get('TWITTER_INTERVAL') or 15 * 60)
+app.config['TWITTER_PAGE_SIZE'] = int(os.environ.get('TWITTER_PAGE_SIZE') or 100)
+app.config['TWITTER_MAX_PAGES'] = int(os.environ.get('TWITTER_MAX_PAGES') or 5)
+app.config['TWITTER_MAX_WAIT'] = int(os.environ.get('TWITTER_MAX_WAIT') or 60)
+
+# Tweet scoring, see model/tweet_scoring.py, a crossing's recent tweets move its wait prediction by up to TWEET_SIGNAL_WEIGHT
+app.config['TWEET_SCORE_BATCH'] = int(os.environ.get('TWEET_SCORE_BATCH') or 1000)
+app.config['TWEET_SCORE_WORKERS'] = int(os.environ.get('TWEET_SCORE_WORKERS') or 2)
+app.config['TWEET_SIGNAL_HOURS'] = int(os.environ.get('TWEET_SIGNAL_HOURS') or 2)
+app.config['TWEET_SIGNAL_MIN_TWEETS'] = int(os.environ.get('TWEET_SIGNAL_MIN_TWEETS') or 5)
+app.config['TWEET_SIGNAL_WEIGHT'] = float(os.environ.get('TWEET_SIGNAL_WEIGHT') or 0.25)
+
 # GitHub settings
 app.config['GITHUB_API_URL'] = 'https://api.github.com'
 app.config['GITHUB_TOKEN'] = os.environ.get('GITHUB_TOKEN') or None
@@ -97,6 +165,3 @@ def initialize_all_tables():
     with app.app_context():
         db.create_all()
         print("All database tables initialized, including border_feedbacks")
-
-# Run table initialization
-initialize_all_tables()
\ No newline at end of file
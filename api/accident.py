@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_restful import Api, Resource
 from model.accident import AccidentModel
+from api.batch_predict import read_records, stream_results
 
 accident_api = Blueprint('accident_api', __name__, url_prefix='/api/accident')
 api = Api(accident_api)
@@ -8,8 +9,20 @@ api = Api(accident_api)
 class AccidentAPI:
     class _Predict(Resource):
         def post(self):
-            data = request.get_json()
             required_fields = ['Gender', 'Speed_of_Impact', 'Helmet_Used', 'Seatbelt_Used']
+
+            # a JSON list or CSV upload is scored as one batch, results stream back in input order
+            records, error = read_records(required_fields)
+            if error:
+                return error
+            if records is not None:
+                try:
+                    results = AccidentModel.get_instance().predict_batch(records)
+                except ValueError as e:
+                    return {"error": f"Invalid record values: {e}"}, 400
+                return stream_results(results)
+
+            data = request.get_json()
             
             if not all(field in data for field in required_fields):
                 return {"error": "Missing required fields", "required_fields": required_fields}, 400
@@ -0,0 +1,63 @@
+import json
+from flask import request, Response
+
+# Rows serialized per streamed chunk of a batch prediction response
+STREAM_CHUNK = 1000
+
+def read_records(required_fields):
+    """
+    Read a batch of prediction records from the request.
+
+    A batch is either a JSON list of records, or a CSV file uploaded as the "file" form field
+    (or sent as the text/csv request body) with one record per row.
+
+    Args:
+        required_fields (list): column names every record must have.
+
+    Returns:
+        tuple: (DataFrame of records, None) for a batch, (None, None) when the request holds a
+        single JSON record, or (None, (error dict, status)) when the batch is invalid.
+    """
+    import pandas as pd
+    try:
+        if 'file' in request.files:
+            records = pd.read_csv(request.files['file'])
+        elif request.mimetype == 'text/csv':
+            records = pd.read_csv(request.stream)
+        else:
+            records = None
+    except ValueError as e:
+        return None, ({"error": f"Could not read CSV: {e}"}, 400)
+    if records is None:
+        data = request.get_json()
+        if not isinstance(data, list):
+            return None, None
+        records = pd.DataFrame(data)
+
+    missing = [field for field in required_fields if field not in records.columns]
+    if missing or records.empty:
+        return None, ({"error": "Missing required fields", "required_fields": required_fields}, 400)
+    # reject the batch if any record is missing a value, reporting the first offending rows
+    incomplete = records[required_fields].isna().any(axis=1)
+    if incomplete.any():
+        bad_rows = records.index[incomplete].tolist()
+        return None, ({"error": "Records with missing values", "rows": bad_rows[:100]}, 400)
+    return records, None
+
+def stream_results(results):
+    """
+    Stream a list of prediction results back as one JSON array, in chunks.
+
+    Args:
+        results (list): JSON serializable result dicts, in record order.
+
+    Returns:
+        Response: a streamed application/json response.
+    """
+    def generate():
+        yield '['
+        for start in range(0, len(results), STREAM_CHUNK):
+            chunk = ','.join(json.dumps(result) for result in results[start:start + STREAM_CHUNK])
+            yield (',' if start else '') + chunk
+        yield ']'
+    return Response(generate(), mimetype='application/json')
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_restful import Api, Resource
 from model.border import BorderWaitTimeModel
-from datetime import datetime
+from model.tweet_scoring import tweet_adjustment
+from datetime import datetime, timedelta, timezone
 import math
 import requests
 import json as JSON
@@ -9,6 +10,33 @@ import json as JSON
 border_api = Blueprint('border_api', __name__, url_prefix='/api/border')
 api = Api(border_api)
 
+def tweet_adjusted(minutes, values, crossing):
+    """Adjust a prediction for within an hour of now by the congestion reported in recent tweets.
+
+    The prediction's day, month and hour slot are matched to a real date yesterday, today or
+    tomorrow, so slots across midnight compare correctly. The gate and the tweet signal read one clock.
+
+    Returns:
+        tuple: (adjusted minutes, the tweet signal applied, or None when the prediction is unchanged)
+    """
+    utc_now = datetime.now(timezone.utc)
+    # server local time, like the request defaults for day, month and time
+    now = utc_now.astimezone().replace(tzinfo=None)
+    hour = datetime.combine(now.date(), datetime.min.time()) + timedelta(hours=int(values["time"]))
+    slots = [hour + timedelta(days=offset) for offset in (-1, 0, 1)]
+    if not any(slot.weekday() == values["day"] and slot.strftime('%B').lower() == values["month"]
+               and abs(slot - now) <= timedelta(hours=1) for slot in slots):
+        return minutes, None
+    try:
+        signal = tweet_adjustment(crossing, utc_now.replace(tzinfo=None))
+    except Exception as e:
+        # the prediction stands on its own when the signal cannot be read
+        print(f"⚠️ Could not read the tweet signal: {e}")
+        signal = None
+    if signal is None:
+        return minutes, None
+    return minutes * signal["factor"], signal
+
 class BorderAPI:
     class _Predict(Resource):
         def post(self):
@@ -70,7 +98,7 @@ class BorderAPI:
                 current_month = datetime.now().strftime('%B').lower()
                 values["month"] = current_month
             else:
-                values["month"] = data["month"]
+                values["month"] = str(data["month"]).lower()
 
             if "time" not in data:
                 current_hour = datetime.now().hour  # already in 24-hour format
@@ -78,13 +106,21 @@ class BorderAPI:
             else:
                 values["time"] = data["time"]
 
+            # recent tweets about this crossing adjust predictions for around the current hour
+            crossing = data.get("crossing", "san_ysidro")
+
             if values["mode"] == "long_term":
                 borderModel = BorderWaitTimeModel.get_instance()
-                response = borderModel.predict({"bwt_day": values["day"], "time_slot": values["time"], "month": values["month"]})
-
-                return jsonify({
-                    "time": math.trunc((response["random_forest_prediction"] + response["tree_model_prediction"]) / 2),
-                })
+                try:
+                    response = borderModel.predict({"bwt_day": values["day"], "time_slot": values["time"], "month": values["month"]})
+                except FileNotFoundError as e:
+                    return jsonify({"error": str(e)}), 404
+
+                minutes, signal = tweet_adjusted((response["random_forest_prediction"] + response["tree_model_prediction"]) / 2, values, crossing)
+                result = {"time": math.trunc(minutes)}
+                if signal:
+                    result["tweet_signal"] = signal
+                return jsonify(result)
             else:
                 response = requests.get("https://bwt.cbp.gov/api/bwtwaittimegraph/09250401/2025-05-27")
                 if response.status_code == 200:
@@ -124,9 +160,11 @@ class BorderAPI:
 
 
 
-                    return jsonify({
-                        "time": str(math.trunc(predicted_today)),
-                    })
+                    minutes, signal = tweet_adjusted(predicted_today, values, crossing)
+                    result = {"time": str(math.trunc(minutes))}
+                    if signal:
+                        result["tweet_signal"] = signal
+                    return jsonify(result)
                 else:
                     return jsonify({"error": "Failed to fetch data from external API"}), 500
 
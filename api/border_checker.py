@@ -7,7 +7,6 @@ import os
 import logging
 from datetime import datetime
 import json
-from googleapiclient.discovery import build
 
 # Enhanced logging configuration
 
@@ -165,7 +164,7 @@ def send_notification(notification, wait_time, port_data):
         logger.info(f"📧 Preparing to send email notification {notification['id']}")
         
         # Import here to avoid circular imports
-        from api.border_email import get_credentials, create_message, send_message
+        from api.border_email import get_credentials, gmail_service, create_message, send_message
         
         # Get type label
         type_labels = {
@@ -204,7 +203,7 @@ def send_notification(notification, wait_time, port_data):
         creds = get_credentials()
         
         # Create Gmail API service
-        service = build('gmail', 'v1', credentials=creds)
+        service = gmail_service(creds)
         
         # Create and send the email
         email_message = create_message(email_from, notification['email'], subject, html_message, html=True)
@@ -239,7 +238,7 @@ def send_sms_notification(notification, wait_time):
         logger.info(f"📱 Preparing to send SMS notification {notification['id']}")
         
         # Import here to avoid circular imports
-        from api.border_email import get_credentials
+        from api.border_email import get_credentials, gmail_service
         from api.border_sms import create_message, send_message
         
         # Get type label
@@ -260,7 +259,7 @@ def send_sms_notification(notification, wait_time):
         creds = get_credentials()
         
         # Create Gmail API service
-        service = build('gmail', 'v1', credentials=creds)
+        service = gmail_service(creds)
         
         # Create and send the SMS
         email_from = f"Border Alerts <{os.getenv('EMAIL_USER')}>"
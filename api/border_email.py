@@ -2,10 +2,6 @@ from flask import Blueprint, request, jsonify
 import os
 import base64
 from email.mime.text import MIMEText
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 import sqlite3
 from datetime import datetime
 import traceback
@@ -53,6 +49,9 @@ def get_db_connection():
 
 def get_credentials():
     """Get valid credentials for Gmail API using refresh token"""
+    # the Google client libraries are imported on first use, not at app startup
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
     try:
         creds = Credentials(
             None,
@@ -69,6 +68,11 @@ def get_credentials():
         print(traceback.format_exc())
         raise e
 
+def gmail_service(creds):
+    """Build the Gmail API service"""
+    from googleapiclient.discovery import build
+    return build('gmail', 'v1', credentials=creds)
+
 def create_message(sender, to, subject, message_text, html=True):
     """Create a message for an email"""
     if html:
@@ -86,6 +90,7 @@ def create_message(sender, to, subject, message_text, html=True):
 
 def send_message(service, user_id, message):
     """Send an email message"""
+    from googleapiclient.errors import HttpError
     try:
         message = service.users().messages().send(userId=user_id, body=message).execute()
         return message
@@ -113,7 +118,7 @@ def send_email():
         creds = get_credentials()
         
         # Create Gmail API service
-        service = build('gmail', 'v1', credentials=creds)
+        service = gmail_service(creds)
         
         # Create and send the email
         email_from = f'"Border Alerts" <{EMAIL_USER}>'
@@ -222,7 +227,7 @@ def create_notification():
             creds = get_credentials()
             
             # Create Gmail API service
-            service = build('gmail', 'v1', credentials=creds)
+            service = gmail_service(creds)
             
             # Create and send the email
             email_from = f'"Border Alerts" <{EMAIL_USER}>'
@@ -374,7 +379,7 @@ def test_email():
         creds = get_credentials()
         
         # Create Gmail API service
-        service = build('gmail', 'v1', credentials=creds)
+        service = gmail_service(creds)
         
         # Create and send the email
         email_from = f'"Border Alerts" <{EMAIL_USER}>'
@@ -2,10 +2,6 @@ from flask import Blueprint, request, jsonify
 import os
 import base64
 from email.mime.text import MIMEText
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 import sqlite3
 from datetime import datetime
 import traceback
@@ -25,6 +21,9 @@ template = "Border Alert: {label} wait time {direction} {threshold} minutes."
 
 # Function to get Gmail credentials
 def get_credentials():
+    # the Google client libraries are imported on first use, not at app startup
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
     creds = Credentials(
         None,
         refresh_token=GOOGLE_REFRESH_TOKEN,
@@ -36,6 +35,10 @@ def get_credentials():
     creds.refresh(Request())
     return creds
 
+def gmail_service(creds):
+    from googleapiclient.discovery import build
+    return build('gmail', 'v1', credentials=creds)
+
 # Function to send message via Gmail API
 def create_message(sender, to, subject, message_text):
     message = MIMEText(message_text, 'plain')
@@ -64,7 +67,7 @@ def test_sms():
         message_text = "This is a test SMS from the Border Alert System. If you received this, it works."
 
         creds = get_credentials()
-        service = build('gmail', 'v1', credentials=creds)
+        service = gmail_service(creds)
         email_message = create_message(f"Border Alerts <{EMAIL_USER}>", phone, subject, message_text)
         result = send_message(service, 'me', email_message)
 
@@ -138,7 +141,7 @@ def create_sms_notification():
         message_text = template.format(label=label, direction=direction, threshold=threshold)
 
         creds = get_credentials()
-        service = build('gmail', 'v1', credentials=creds)
+        service = gmail_service(creds)
         email_message = create_message(f"Border Alerts <{EMAIL_USER}>", data['smsEmail'], subject, message_text)
         result = send_message(service, 'me', email_message)
 
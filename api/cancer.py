@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_restful import Api, Resource
 from model.cancer import CancerModel
+from api.batch_predict import read_records, stream_results
 
 cancer_api = Blueprint('cancer_api', __name__, url_prefix='/api/cancer')
 api = Api(cancer_api)
@@ -8,8 +9,20 @@ api = Api(cancer_api)
 class CancerAPI:
     class _Predict(Resource):
         def post(self):
-            data = request.get_json()
             required_fields = ['age', 'year']
+
+            # a JSON list or CSV upload is scored as one batch, results stream back in input order
+            records, error = read_records(required_fields)
+            if error:
+                return error
+            if records is not None:
+                try:
+                    results = CancerModel.get_instance().predict_batch(records)
+                except ValueError as e:
+                    return {"error": f"Invalid record values: {e}"}, 400
+                return stream_results(results)
+
+            data = request.get_json()
             
             if not all(field in data for field in required_fields):
                 return {"error": "Missing required fields", "required_fields": required_fields}, 400
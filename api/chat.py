@@ -1,11 +1,38 @@
-from flask import Blueprint, request, jsonify, g
+import json
+import time
+from flask import Blueprint, request, jsonify, g, Response, stream_with_context
 from flask_restful import Api, Resource
 from api.jwt_authorize import token_required
+from __init__ import db
 from model.chat import Chat
 
 chat_api = Blueprint('chat_api', __name__, url_prefix='/api')
 api = Api(chat_api)
 
+# Server-Sent Events settings for the channel stream
+STREAM_POLL_INTERVAL = 1.0   # seconds between checks for new messages
+STREAM_HEARTBEAT = 15.0      # seconds between keep-alive comments
+# seconds a stream is held open, well under the gunicorn worker timeout, since a sync worker serves
+# nothing else meanwhile; clients reconnect with Last-Event-ID, so this works as a bounded long-poll
+STREAM_MAX_DURATION = 20.0
+
+def parse_since_id(value):
+    """
+    Parse a since_id cursor from a query string or JSON body.
+
+    Args:
+        value: The raw since_id value, may be None.
+
+    Returns:
+        int: The parsed cursor, or None if not provided.
+
+    Raises:
+        ValueError: The value is not an integer.
+    """
+    if value is None or value == '':
+        return None
+    return int(value)
+
 class ChatAPI:
     """
     Define the API CRUD endpoints for the Chat model.
@@ -31,16 +58,21 @@ class ChatAPI:
         @token_required()
         def get(self):
             """
-            Retrieve all chat messages by channel ID.
+            Retrieve all chat messages by channel ID, optionally only those after since_id.
             """
             # Extract channel_id from query parameters
             channel_id = request.args.get('id')
             if not channel_id:
                 return {'message': 'Channel ID is required'}, 400
-
-            # Query all chat messages for the given channel_id
-            chats = Chat.query.filter_by(_channel_id=channel_id).all()
-            if not chats:
+            try:
+                since_id = parse_since_id(request.args.get('since_id'))
+            except ValueError:
+                return {'message': 'since_id must be an integer'}, 400
+
+            # Query the chat messages for the given channel_id
+            chats = Chat.since(channel_id, since_id)
+            # An empty result is only an error for a full listing, polling with a cursor expects it
+            if not chats and since_id is None:
                 return {'message': 'No chat messages found for this channel'}, 404
 
             # Return the list of chats in JSON format
@@ -95,33 +127,90 @@ class ChatAPI:
         @token_required()
         def post(self):
             """
-            Retrieve all chat messages by channel ID.
+            Retrieve all chat messages by channel ID, optionally only those after since_id.
             """
             data = request.get_json()
             if 'channel_id' not in data:
                 return {'message': 'Channel ID is required'}, 400
+            try:
+                since_id = parse_since_id(data.get('since_id'))
+            except ValueError:
+                return {'message': 'since_id must be an integer'}, 400
 
-            # Retrieve all chat messages for the given channel
-            chats = Chat.query.filter_by(_channel_id=data['channel_id']).all()
+            # Retrieve the chat messages for the given channel
+            chats = Chat.since(data['channel_id'], since_id)
             return jsonify([chat.read() for chat in chats])
 
     class _FILTER(Resource):
         @token_required()
         def post(self):
             """
-            Retrieve all chat messages by channel ID.
+            Retrieve all chat messages by channel ID, optionally only those after since_id.
             """
             data = request.get_json()
             if data is None:
                 return {'message': 'Channel data not found'}, 400
             if 'channel_id' not in data:
                 return {'message': 'Channel ID not found'}, 400
+            try:
+                since_id = parse_since_id(data.get('since_id'))
+            except ValueError:
+                return {'message': 'since_id must be an integer'}, 400
 
-            # Retrieve all chat messages for the given channel
-            chats = Chat.query.filter_by(_channel_id=data['channel_id']).all()
+            # Retrieve the chat messages for the given channel
+            chats = Chat.since(data['channel_id'], since_id)
             return jsonify([chat.read() for chat in chats])
 
+    class _STREAM(Resource):
+        @token_required()
+        def get(self):
+            """
+            Stream new chat messages for a channel as Server-Sent Events.
+
+            Query parameters:
+            - channel_id: the channel to follow (required)
+            - since_id: only send messages after this ID (optional, the Last-Event-ID header takes precedence)
+
+            Each message is sent as an event whose id is the chat ID, so an EventSource that
+            reconnects resumes exactly where it left off. The stream closes once new messages
+            are sent or after STREAM_MAX_DURATION, freeing the worker until the client reconnects.
+            """
+            channel_id = request.args.get('channel_id')
+            if not channel_id:
+                return {'message': 'Channel ID is required'}, 400
+            try:
+                since_id = parse_since_id(request.headers.get('Last-Event-ID') or request.args.get('since_id'))
+            except ValueError:
+                return {'message': 'since_id must be an integer'}, 400
+
+            def generate(last_id):
+                started = last_beat = time.monotonic()
+                # Tell the browser how long to wait before reconnecting
+                yield f"retry: {int(STREAM_POLL_INTERVAL * 1000)}\n\n"
+                while time.monotonic() - started < STREAM_MAX_DURATION:
+                    chats = Chat.since(channel_id, last_id)
+                    for chat in chats:
+                        last_id = chat.id
+                        yield f"id: {chat.id}\nevent: chat\ndata: {json.dumps(chat.read())}\n\n"
+                    # End the read transaction so the next poll sees newly committed rows
+                    db.session.rollback()
+                    if chats:
+                        # delivered, the client reconnects from the last event id
+                        return
+                    now = time.monotonic()
+                    if now - last_beat >= STREAM_HEARTBEAT:
+                        last_beat = now
+                        yield ": keep-alive\n\n"
+                    time.sleep(STREAM_POLL_INTERVAL)
+
+            return Response(
+                stream_with_context(generate(since_id)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
     # Add resource endpoints
     api.add_resource(_CRUD, '/chat')
     api.add_resource(_CHANNEL, '/chats/channel')
     api.add_resource(_FILTER, '/chats/filter')
+    api.add_resource(_STREAM, '/chats/stream')
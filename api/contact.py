@@ -2,15 +2,14 @@ from flask import Blueprint, request, jsonify
 from flask_restful import Api, Resource
 import os
 from datetime import datetime
-import json
+from model.contact import Contact, ContactStats
 
 # Create Blueprint
 contact_api = Blueprint('contact_api', __name__, url_prefix='/api/contact')
 api = Api(contact_api)
 
-# File path for storing contact data
+# Human-readable log of signups, the contacts themselves are in the contacts table
 CONTACT_FILE = 'data/contacts.txt'
-CONTACT_JSON = 'data/contacts.json'
 
 def ensure_data_directory():
     """Ensure the data directory exists"""
@@ -67,44 +66,31 @@ class ContactAPI:
                     'ip_address': request.remote_addr
                 }
                 
-                # Check for duplicate email (optional)
-                if os.path.exists(CONTACT_JSON):
-                    try:
-                        with open(CONTACT_JSON, 'r', encoding='utf-8') as f:
-                            existing_contacts = json.load(f)
-                        
-                        # Check if email already exists
-                        for contact in existing_contacts:
-                            if contact.get('email') == contact_info['email']:
-                                return {
-                                    'message': 'Email already registered',
-                                    'status': 'duplicate'
-                                }, 200
-                    except (json.JSONDecodeError, FileNotFoundError):
-                        existing_contacts = []
-                else:
-                    existing_contacts = []
+                # The unique email index rejects duplicates, also across workers
+                contact, created = Contact.signup(contact_info)
+                if not created:
+                    return {
+                        'message': 'Email already registered',
+                        'status': 'duplicate'
+                    }, 200
                 
-                # Append to text file (human-readable format)
+                # Append to text file (human-readable format), in one write so concurrent workers don't interleave
                 with open(CONTACT_FILE, 'a', encoding='utf-8') as f:
-                    f.write(f"--- New Contact ---\n")
-                    f.write(f"Date: {contact_info['timestamp']}\n")
-                    f.write(f"Name: {contact_info['name']}\n")
-                    f.write(f"Email: {contact_info['email']}\n")
-                    f.write(f"Phone: {contact_info['phone'] or 'Not provided'}\n")
-                    f.write(f"Wants Updates: {'Yes' if contact_info['wants_updates'] else 'No'}\n")
-                    f.write(f"IP Address: {contact_info['ip_address']}\n")
-                    f.write(f"{'='*50}\n\n")
-                
-                # Also save to JSON file for easier processing
-                existing_contacts.append(contact_info)
-                with open(CONTACT_JSON, 'w', encoding='utf-8') as f:
-                    json.dump(existing_contacts, f, indent=2, ensure_ascii=False)
+                    f.write(
+                        f"--- New Contact ---\n"
+                        f"Date: {contact_info['timestamp']}\n"
+                        f"Name: {contact_info['name']}\n"
+                        f"Email: {contact_info['email']}\n"
+                        f"Phone: {contact_info['phone'] or 'Not provided'}\n"
+                        f"Wants Updates: {'Yes' if contact_info['wants_updates'] else 'No'}\n"
+                        f"IP Address: {contact_info['ip_address']}\n"
+                        f"{'='*50}\n\n"
+                    )
                 
                 return {
                     'message': 'Contact information saved successfully',
                     'status': 'success',
-                    'id': len(existing_contacts)
+                    'id': contact.id
                 }, 200
                 
             except Exception as e:
@@ -118,29 +104,10 @@ class ContactAPI:
         def get(self):
             """Get all contacts (admin only - you might want to add authentication)"""
             try:
-                ensure_data_directory()
-                
-                if not os.path.exists(CONTACT_JSON):
-                    return {'contacts': [], 'count': 0}, 200
-                
-                with open(CONTACT_JSON, 'r', encoding='utf-8') as f:
-                    contacts = json.load(f)
-                
-                # Remove sensitive info for security
-                safe_contacts = []
-                for contact in contacts:
-                    safe_contact = {
-                        'name': contact.get('name'),
-                        'email': contact.get('email'),
-                        'has_phone': bool(contact.get('phone')),
-                        'wants_updates': contact.get('wants_updates'),
-                        'timestamp': contact.get('timestamp')
-                    }
-                    safe_contacts.append(safe_contact)
-                
+                contacts = [contact.read() for contact in Contact.query.order_by(Contact.id).all()]
                 return {
-                    'contacts': safe_contacts,
-                    'count': len(safe_contacts)
+                    'contacts': contacts,
+                    'count': len(contacts)
                 }, 200
                 
             except Exception as e:
@@ -153,27 +120,8 @@ class ContactAPI:
         def get(self):
             """Get contact statistics"""
             try:
-                ensure_data_directory()
-                
-                if not os.path.exists(CONTACT_JSON):
-                    return {
-                        'total_contacts': 0,
-                        'contacts_with_phone': 0,
-                        'wants_updates': 0,
-                        'latest_signup': None
-                    }, 200
-                
-                with open(CONTACT_JSON, 'r', encoding='utf-8') as f:
-                    contacts = json.load(f)
-                
-                stats = {
-                    'total_contacts': len(contacts),
-                    'contacts_with_phone': sum(1 for c in contacts if c.get('phone')),
-                    'wants_updates': sum(1 for c in contacts if c.get('wants_updates')),
-                    'latest_signup': max(contacts, key=lambda x: x.get('timestamp', ''))['timestamp'] if contacts else None
-                }
-                
-                return stats, 200
+                # Counters are maintained by each signup, nothing is scanned here
+                return ContactStats.read(), 200
                 
             except Exception as e:
                 print(f"Error getting stats: {str(e)}")
@@ -1,9 +1,6 @@
 from flask import Blueprint, jsonify, Response
 from flask_restful import Api, Resource
 import json
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import os
 
 # Create the Blueprint
@@ -13,6 +10,9 @@ api = Api(historicalgraph_api)
 class BorderWaitAPI:
     class _GetVisualization(Resource):
         def get(self):
+            # pandas and plotly are imported on first use, not at app startup
+            import pandas as pd
+            import plotly.graph_objects as go
             try:
                 # Path to the JSON data file
                 # Adjust this path to where your JSON data is stored in your project
@@ -0,0 +1,20 @@
+import hmac
+from flask import Blueprint, Response, request
+from __init__ import app
+from model.request_metrics import RequestMetrics
+
+# Blueprint for the Prometheus scrape endpoint
+metrics_api = Blueprint('metrics_api', __name__, url_prefix='/api')
+
+@metrics_api.route('/metrics')
+def metrics():
+    """Request, database and outbound HTTP metrics of all workers, in Prometheus text format.
+
+    Scrapers must send METRICS_TOKEN as a bearer token, the endpoint is off while it is not set.
+    """
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        return Response("Metrics are disabled, set METRICS_TOKEN\n", status=404, mimetype='text/plain')
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return Response("Unauthorized\n", status=401, mimetype='text/plain')
+    return Response(RequestMetrics.get_instance().render(), mimetype='text/plain; version=0.0.4')
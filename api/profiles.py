@@ -0,0 +1,26 @@
+from flask import Blueprint, send_from_directory
+from flask_restful import Api, Resource
+from api.jwt_authorize import token_required
+from model.request_profiler import PROFILE_DIR, PROFILE_NAME, list_profiles
+
+# Blueprint for stored request profiles
+profiles_api = Blueprint('profiles_api', __name__, url_prefix='/api/profiles')
+api = Api(profiles_api)
+
+class ProfilesAPI:
+    class _List(Resource):
+        @token_required(["Admin"])
+        def get(self):
+            """Stored profiles, newest first, from X-Profile requests, sampled routes and slow requests."""
+            return list_profiles(), 200
+
+    class _Profile(Resource):
+        @token_required(["Admin"])
+        def get(self, name):
+            """One profile as collapsed stacks, for flamegraph.pl or speedscope."""
+            if not PROFILE_NAME.match(name):
+                return {"message": "Invalid profile name"}, 400
+            return send_from_directory(PROFILE_DIR, name, mimetype='text/plain', as_attachment=True)
+
+    api.add_resource(_List, '/')
+    api.add_resource(_Profile, '/<string:name>')
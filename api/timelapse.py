@@ -1,31 +1,103 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, send_from_directory
 from flask_restful import Api, Resource
-from moviepy import *
-from model.timelapse import TimelapseModel
-from flask import Response
-import requests
+from model.timelapse import TimelapseModel, ARCHIVE_DIR
+from model.video_archive import VideoArchive, VideoProxyCache, HOURLY_DIR, HOUR_FILE
 import os
-from datetime import datetime
 
 timelapse_api = Blueprint('timelapse_api', __name__, url_prefix='/api/timelapse')
 api = Api(timelapse_api)
 
+# Archived clips and content-addressed renders never change once written
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PROXY_MAX_AGE = 3600
+
+def immutable(resp):
+    """Mark a response for clients and proxies to cache without revalidating."""
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+def requested_videos(data):
+    """Clip URLs from a request body, either a "videos" list or a "start"/"end" time code range."""
+    if data.get("start") and data.get("end"):
+        return TimelapseModel.urls_for_range(data["start"], data["end"])
+    return data.get("videos", [])
+
+def requested_speed(data):
+    """The speed factor of a request body, 2.5 by default, raising ValueError unless it is above 0."""
+    return TimelapseModel.check_speed(data.get("speed", 2.5))
+
+def requested_page(args):
+    """The offset and limit query parameters, raising ValueError unless offset >= 0 and limit > 0."""
+    try:
+        offset = int(args.get("offset", 0))
+        limit = args.get("limit")
+        limit = None if limit is None else int(limit)
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0:
+        raise ValueError("offset must be 0 or more")
+    if limit is not None and limit <= 0:
+        raise ValueError("limit must be above 0")
+    return offset, limit
+
 class TimelapseAPI:
     class _Generate(Resource):
         def post(self):
             data = request.get_json()
-            video_urls = data.get("videos", [])
+            try:
+                video_urls = requested_videos(data)
+                speed = requested_speed(data)
+            except ValueError as e:
+                return {"error": str(e)}, 400
 
             if not video_urls:
                 return {"error": "No videos provided"}, 400
 
             try:
-                output_path = TimelapseModel.generate(video_urls)
-                return send_file(output_path, download_name="timelapse.mp4", mimetype="video/mp4")
+                output_path = TimelapseModel.generate(video_urls, speed)
+                return send_file(output_path, download_name="timelapse.mp4", mimetype="video/mp4", conditional=True)
             except Exception as e:
                 return {"error": str(e)}, 500
 
+    class _Jobs(Resource):
+        def post(self):
+            """Submit a timelapse render, returns a job id to poll instead of waiting on the render."""
+            data = request.get_json()
+            try:
+                video_urls = requested_videos(data)
+                speed = requested_speed(data)
+            except ValueError as e:
+                return {"error": str(e)}, 400
+
+            if not video_urls:
+                return {"error": "No videos provided"}, 400
+
+            job = TimelapseModel.submit(video_urls, speed)
+            return job, 200 if job["status"] == "done" else 202
+
+    class _Job(Resource):
+        def get(self, job_id):
+            """Poll the status of a render job."""
+            job = TimelapseModel.status(job_id)
+            if job["status"] == "unknown":
+                return {"error": "Job not found"}, 404
+            return job, 200
+
+    class _JobResult(Resource):
+        def get(self, job_id):
+            """Download the rendered timelapse once the job is done."""
+            job = TimelapseModel.status(job_id)
+            if job["status"] != "done":
+                return job, 404 if job["status"] == "unknown" else 409
+            resp = send_file(TimelapseModel.output_path(job_id), download_name="timelapse.mp4", mimetype="video/mp4",
+                             conditional=True, etag=True, max_age=IMMUTABLE_MAX_AGE)
+            return immutable(resp)
+
     api.add_resource(_Generate, '/')
+    api.add_resource(_Jobs, '/jobs')
+    api.add_resource(_Job, '/jobs/<string:job_id>')
+    api.add_resource(_JobResult, '/jobs/<string:job_id>/result')
 
     @timelapse_api.route('/proxy_video')
     def proxy_video():
@@ -34,40 +106,79 @@ class TimelapseAPI:
             return {"error": "Invalid or unauthorized URL"}, 400
 
         try:
-            resp = requests.get(url, stream=True, timeout=10)
-            return Response(resp.iter_content(8192), content_type=resp.headers.get("Content-Type", "video/mp4"))
+            path, upstream = VideoProxyCache.fetch(url)
         except Exception as e:
             return {"error": str(e)}, 500
+        if path is None and upstream is None:
+            return {"error": "Video not available upstream"}, 502
+
+        if upstream is not None:
+            # first view, streamed as it downloads and cached for the next viewers
+            resp = Response(VideoProxyCache.stream(url, upstream), mimetype="video/mp4")
+            if upstream.headers.get("Content-Length"):
+                resp.headers["Content-Length"] = upstream.headers["Content-Length"]
+            return resp
+
+        # Served from disk, so seeking uses byte ranges and repeat views revalidate with a 304
+        return send_file(path, mimetype="video/mp4", conditional=True, etag=True, max_age=PROXY_MAX_AGE)
         
     @timelapse_api.route('/history')
     def get_stored_videos():
-        folder = os.path.join(os.path.dirname(__file__), '..', 'data', 'videos')  # <- use relative path
-        folder = os.path.abspath(folder)  # 
-        files = sorted([f for f in os.listdir(folder) if f.endswith(".mp4")])
-        videos = []
+        """
+        List archived minute clips, oldest first.
 
-        for f in files:
-            timestamp = f.replace(".mp4", "")
-            try:
-                dt_obj = datetime.strptime(timestamp, "%Y_%m_%d_%H_%M")
-                videos.append({
-                    "timeLabel": dt_obj.strftime("%H:%M"),
-                    "timeCode": timestamp,
-                    "url": f"/api/timelapse/local_video?file={f}"
-                })
-            except:
-                continue
-
-        return jsonify(videos)
+        Query parameters (all optional):
+        - start, end: time codes (YYYY_MM_DD_HH_MM, or a prefix such as YYYY_MM_DD) bounding the range
+        - offset, limit: pagination, the total match count is returned in X-Total-Count
+        """
+        try:
+            offset, limit = requested_page(request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        archive = VideoArchive.get_instance()
+        codes, total = archive.range(request.args.get("start"), request.args.get("end"), offset, limit)
+
+        videos = [{
+            "timeLabel": f"{code[11:13]}:{code[14:16]}",
+            "timeCode": code,
+            "url": f"/api/timelapse/local_video?file={code}.mp4"
+        } for code in codes]
+
+        resp = jsonify(videos)
+        resp.headers["X-Total-Count"] = str(total)
+        return resp
+
+    @timelapse_api.route('/history/hourly')
+    def get_hourly_videos():
+        """List the hourly condensed clips made by retention, with the same parameters as /history."""
+        try:
+            offset, limit = requested_page(request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        archive = VideoArchive.get_instance(HOURLY_DIR, HOUR_FILE)
+        codes, total = archive.range(request.args.get("start"), request.args.get("end"), offset, limit)
+
+        videos = [{
+            "timeLabel": f"{code[11:13]}:00",
+            "timeCode": code,
+            "url": f"/api/timelapse/local_video?file=hourly/{code}.mp4"
+        } for code in codes]
+
+        resp = jsonify(videos)
+        resp.headers["X-Total-Count"] = str(total)
+        return resp
     
     @timelapse_api.route('/local_video')
     def local_video():
         file = request.args.get("file")
-        folder = os.path.join(os.path.dirname(__file__), '..', 'data', 'videos')
-        folder = os.path.abspath(folder)
-        full_path = os.path.join(folder, file)
-
-        if not os.path.isfile(full_path):
+        if not file:
             return {"error": "File not found"}, 404
 
-        return send_file(full_path, mimetype="video/mp4")
\ No newline at end of file
+        # send_from_directory rejects paths outside the archive, and answers Range and
+        # If-None-Match/If-Modified-Since requests with 206 and 304 responses
+        try:
+            resp = send_from_directory(ARCHIVE_DIR, file, mimetype="video/mp4",
+                                       conditional=True, etag=True, max_age=IMMUTABLE_MAX_AGE)
+        except Exception:
+            return {"error": "File not found"}, 404
+        return immutable(resp)
\ No newline at end of file
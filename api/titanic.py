@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_restful import Api, Resource
 from model.titanic import TitanicModel
+from api.batch_predict import read_records, stream_results
 
 titanic_api = Blueprint('titanic_api', __name__, url_prefix='/api/titanic')
 api = Api(titanic_api)
@@ -8,8 +9,22 @@ api = Api(titanic_api)
 class TitanicAPI:
     class _Predict(Resource):
         def post(self):
-            data = request.get_json()
             required_fields = ['pclass', 'sex', 'age', 'sibsp', 'parch', 'fare', 'embarked', 'alone']
+
+            # a JSON list or CSV upload is scored as one batch, results stream back in input order
+            records, error = read_records(required_fields)
+            if error:
+                return error
+            if records is not None:
+                try:
+                    results = TitanicModel.get_instance().predict_batch(records)
+                except FileNotFoundError as e:
+                    return {"error": str(e)}, 503
+                except ValueError as e:
+                    return {"error": f"Invalid record values: {e}"}, 400
+                return stream_results(results)
+
+            data = request.get_json()
             
             # Validate input
             if not all(field in data for field in required_fields):
@@ -27,7 +42,11 @@ class TitanicAPI:
                 'alone': bool(data['alone'])
             }
             
-            titanicModel = TitanicModel.get_instance()
+            try:
+                titanicModel = TitanicModel.get_instance()
+            except FileNotFoundError as e:
+                # no trained artifact and no dataset to train from
+                return {"error": str(e)}, 503
             response = titanicModel.predict(passenger)
 
             # Ensure response is a JSON-serializable dictionary
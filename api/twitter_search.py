@@ -1,44 +1,219 @@
 import os
+import time
+import threading
 import requests
 from dotenv import load_dotenv
-from model.twitter import BorderTweet
-from __init__ import app
+from model.twitter import BorderTweet, TwitterCursor
+from __init__ import app, db
 
 load_dotenv(dotenv_path='instance/.env')
 
-BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
-SEARCH_URL = "https://api.twitter.com/2/tweets/search/recent"
-HEADERS = {"Authorization": f"Bearer " + BEARER_TOKEN}
+SEARCH_PATH = "/2/tweets/search/recent"
 
-def search_tweets(query="Otay Mesa border wait", max_results=10):
-    params = {
-        "query": query,
-        "max_results": max_results,
-        "tweet.fields": "created_at,author_id,text"
-    }
-    response = requests.get(SEARCH_URL, headers=HEADERS, params=params)
-    if response.status_code != 200:
-        raise Exception(f"Twitter API error {response.status_code}: {response.text}")
-    return response.json().get("data", [])
+# Search queries per border crossing, each query keeps its own since_id in twitter_cursors
+CROSSING_QUERIES = {
+    'otay_mesa': [
+        'Otay Mesa border wait',
+        '"Otay Mesa" (garita OR linea OR fila) -is:retweet',
+        '(#OtayMesa OR #GaritaOtay) -is:retweet',
+    ],
+    'san_ysidro': [
+        'San Ysidro border wait',
+        '"San Ysidro" (garita OR linea OR fila) -is:retweet',
+        '(#SanYsidro OR #GaritaSanYsidro) -is:retweet',
+    ],
+}
 
-def run_border_queries():
-    keywords = ["Otay Mesa border wait"]
+class RateLimited(Exception):
+    """Raised when the rate limit window resets later than TWITTER_MAX_WAIT from now."""
 
+    def __init__(self, reset_at):
+        super().__init__(f"rate limited until {time.strftime('%H:%M:%S', time.localtime(reset_at))}")
+        self.reset_at = reset_at
+
+class TwitterSearch:
+    """
+    Client for the recent search endpoint, pacing its requests by the rate limit headers.
+
+    x-rate-limit-remaining and x-rate-limit-reset are kept from every response. Once no requests
+    remain, the next one waits for the window to reset, or raises RateLimited when that is more
+    than max_wait seconds away.
+    """
+
+    def __init__(self, token, base_url, max_wait):
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Bearer {token}"
+        self.url = base_url.rstrip('/') + SEARCH_PATH
+        self.max_wait = max_wait
+        self.remaining = None
+        self.reset_at = 0
+
+    def _wait_for_window(self):
+        if self.remaining != 0:
+            return
+        wait = self.reset_at - time.time()
+        if wait > self.max_wait:
+            raise RateLimited(self.reset_at)
+        if wait > 0:
+            print(f"⏳ Twitter rate limit reached, waiting {wait:.0f}s")
+            time.sleep(wait)
+        self.remaining = None
+
+    def _track(self, response):
+        headers = response.headers
+        if 'x-rate-limit-remaining' in headers:
+            self.remaining = int(headers['x-rate-limit-remaining'])
+        if 'x-rate-limit-reset' in headers:
+            self.reset_at = int(headers['x-rate-limit-reset'])
+
+    def page(self, query, since_id=None, next_token=None, max_results=100, until_id=None):
+        """
+        Fetch one page of recent tweets matching query, newest first.
+
+        Returns:
+            tuple: (list of tweet dicts, meta dict with newest_id, oldest_id and next_token when there are more pages)
+        """
+        params = {
+            "query": query,
+            # the endpoint accepts 10 to 100 results per page
+            "max_results": min(max(max_results, 10), 100),
+            "tweet.fields": "created_at,author_id,text"
+        }
+        if since_id:
+            params["since_id"] = since_id
+        if until_id:
+            params["until_id"] = until_id
+        if next_token:
+            params["next_token"] = next_token
+
+        # a 429 is retried once, after waiting for the window when it resets soon enough
+        for attempt in range(2):
+            self._wait_for_window()
+            response = self.session.get(self.url, params=params, timeout=15)
+            self._track(response)
+            if response.status_code != 429:
+                break
+            self.remaining = 0
+            if 'x-rate-limit-reset' not in response.headers:
+                self.reset_at = int(time.time()) + 60
+        if response.status_code == 429:
+            raise RateLimited(self.reset_at)
+        if response.status_code != 200:
+            raise Exception(f"Twitter API error {response.status_code}: {response.text[:200]}")
+        body = response.json()
+        return body.get("data", []), body.get("meta", {})
+
+def ingest_query(client, crossing, query, page_size, max_pages):
+    """
+    Store the tweets posted for a query since its last run.
+
+    Pages are followed with next_token up to max_pages, each page is inserted with one statement.
+    The cursor moves to the newest tweet once every page is fetched. A run stopped by max_pages
+    saves the oldest tweet it reached, and the next run resumes below it with the same since_id,
+    so no older tweet is skipped. A failed run is repeated from where the last one stopped, the
+    tweets it already stored are skipped.
+
+    Returns:
+        tuple: (tweets fetched, tweets inserted)
+    """
+    cursor = TwitterCursor.for_search(query, crossing)
+    # a run cut short by max_pages carries on below the oldest tweet it reached
+    newest_id = cursor.pending_id
+    oldest_id = cursor.until_id
+    until_id = cursor.until_id
+    next_token = None
+    fetched = 0
+    inserted = 0
+    for _ in range(max_pages):
+        tweets, meta = client.page(query, cursor.since_id, next_token, page_size, until_id)
+        # the first page holds the newest tweets of the whole result set
+        newest_id = newest_id or meta.get("newest_id")
+        oldest_id = meta.get("oldest_id") or oldest_id
+        fetched += len(tweets)
+        inserted += BorderTweet.insert_page([{
+            'tweet_id': tweet['id'],
+            'author_id': tweet.get('author_id'),
+            'created_at': tweet.get('created_at'),
+            'query': query,
+            'text': tweet.get('text', ''),
+            'score': None
+        } for tweet in tweets])
+        next_token = meta.get("next_token")
+        if not next_token:
+            break
+    if next_token:
+        print(f"⏸️ '{query}': stopped after {max_pages} pages, resuming below {oldest_id} next run")
+        cursor.pause(newest_id, oldest_id, fetched)
+    else:
+        cursor.advance(newest_id, fetched)
+    return fetched, inserted
+
+def search_client():
+    """A TwitterSearch for the configured API, or None when TWITTER_BEARER_TOKEN is not set."""
+    token = os.getenv("TWITTER_BEARER_TOKEN")
+    if not token:
+        return None
+    return TwitterSearch(token, app.config['TWITTER_API_URL'], app.config['TWITTER_MAX_WAIT'])
+
+def run_border_queries(client=None):
+    """
+    Run every query of every crossing once, storing the new tweets.
+
+    Args:
+        client (TwitterSearch, optional): reused between runs so the rate limit state carries over.
+
+    Returns:
+        dict: tweets inserted per query, for the queries that ran
+    """
+    client = client or search_client()
+    if client is None:
+        print("⚠️ TWITTER_BEARER_TOKEN is not set, skipping the Twitter scrape")
+        return {}
+
+    summary = {}
     with app.app_context():
-        for query in keywords:
-            print(f"\n🔎 Query: {query}")
-            try:
-                tweets = search_tweets(query=query, max_results=10)
-                for tweet in tweets:
-                    print(f"@{tweet['author_id']} [{tweet['created_at']}]: {tweet['text'][:120]}...")
-                    tweet_obj = BorderTweet(
-                        tweet_id=tweet['id'],
-                        author_id=tweet['author_id'],
-                        created_at=tweet['created_at'],
-                        query=query,
-                        text=tweet['text'],
-                        score=None
-                    )
-                    tweet_obj.save()
-            except Exception as e:
-                print(f"❌ Failed on query '{query}': {e}")
+        for crossing, queries in CROSSING_QUERIES.items():
+            for query in queries:
+                try:
+                    fetched, inserted = ingest_query(client, crossing, query,
+                                                     app.config['TWITTER_PAGE_SIZE'], app.config['TWITTER_MAX_PAGES'])
+                    summary[query] = inserted
+                    print(f"🔎 {crossing} '{query}': {fetched} fetched, {inserted} new")
+                except RateLimited as e:
+                    print(f"⏳ Twitter {e}, the remaining queries run next time")
+                    return summary
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Failed on query '{query}': {e}")
+    return summary
+
+# Scheduled ingestion, run by the one process holding the background task lock
+_ingester = None
+_ingester_lock = threading.Lock()
+
+def _ingest_loop():
+    client = None
+    while True:
+        started = time.time()
+        try:
+            client = client or search_client()
+            if run_border_queries(client):
+                # score what was just stored, refreshing the hourly signals used by border predictions
+                from model.tweet_scoring import score_tweets
+                score_tweets()
+        except Exception as e:
+            print(f"❌ Twitter ingestion failed: {e}")
+        delay = app.config['TWITTER_INTERVAL'] - (time.time() - started)
+        if client is not None and client.remaining == 0:
+            # the next run would only wait for the window, so start it once the window resets
+            delay = max(delay, client.reset_at - time.time())
+        time.sleep(max(delay, 1))
+
+def start_ingester():
+    """Start the scheduled ingestion thread, once per process, every TWITTER_INTERVAL seconds."""
+    global _ingester
+    with _ingester_lock:
+        if _ingester is None:
+            _ingester = threading.Thread(target=_ingest_loop, name="twitter-ingest", daemon=True)
+            _ingester.start()
+    return _ingester
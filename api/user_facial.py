@@ -2,24 +2,29 @@ import jwt
 from flask import Blueprint, request, jsonify, current_app, Response
 from flask_restful import Api, Resource
 from model.facial_encoding import FaceEncoding
+from model.face_index import FaceIndex
+from model.face_worker import FaceEncoder, FaceEncoderBusy
 from model.user import User
 from __init__ import db
-import face_recognition
-import numpy as np
-import base64
-import io
-from PIL import Image
 
 def get_face_encodings_from_image(base64_str):
-    try:
-        img_bytes = base64.b64decode(base64_str)
-        img = Image.open(io.BytesIO(img_bytes)).convert('RGB')
-        np_img = np.array(img)
-        encodings = face_recognition.face_encodings(np_img)
-        return encodings[0] if encodings else None
-    except Exception as e:
-        print("Encoding Error:", e)
-        return None
+    """Encode the face in a base64 image on the shared worker pool.
+
+    Raises:
+        FaceEncoderBusy: the pool is saturated or the job timed out.
+    """
+    encoder = FaceEncoder.get_instance(
+        slot_dir=current_app.config['FACE_SLOT_DIR'],
+        workers=current_app.config['FACE_WORKERS'],
+        queue_depth=current_app.config['FACE_QUEUE_DEPTH'],
+        timeout=current_app.config['FACE_TIMEOUT'],
+        detect_size=current_app.config['FACE_DETECT_SIZE'],
+        slot_wait=current_app.config['FACE_SLOT_WAIT']
+    )
+    return encoder.encode(base64_str)
+
+def busy_response(e):
+    return {"message": "Facial recognition is busy, try again shortly", "error": str(e)}, 503, {"Retry-After": "2"}
 
 facial_api = Blueprint('facial_api', __name__, url_prefix='/user/facial')
 api = Api(facial_api)
@@ -38,7 +43,10 @@ class FacialAPI:
             if not user:
                 return {"message": "User not found"}, 404
 
-            encoding = get_face_encodings_from_image(image_data)
+            try:
+                encoding = get_face_encodings_from_image(image_data)
+            except FaceEncoderBusy as e:
+                return busy_response(e)
             if encoding is None:
                 return {"message": "No face detected"}, 400
 
@@ -47,6 +55,7 @@ class FacialAPI:
             if existing_face:
                 # Update existing encoding
                 existing_face.encoding_array = encoding
+                face_entry = existing_face
             else:
                 # Create new encoding
                 face_entry = FaceEncoding(uid=uid, encoding_array=encoding)
@@ -54,6 +63,9 @@ class FacialAPI:
             
             db.session.commit()
 
+            # Keep the in-memory index in step with what was stored
+            FaceIndex.get_instance().upsert(uid, face_entry.decode_face())
+
             return {"message": f"Face registered for {uid}", "success": True}, 200
 
     class _RecognizeFace(Resource):
@@ -64,22 +76,16 @@ class FacialAPI:
                 if not image_data:
                     return {"message": "Missing image data"}, 400
 
-                encoding = get_face_encodings_from_image(image_data)
+                try:
+                    encoding = get_face_encodings_from_image(image_data)
+                except FaceEncoderBusy as e:
+                    return busy_response(e)
                 if encoding is None:
                     return {"message": "No face detected"}, 400
 
-                known_faces = FaceEncoding.query.all()
-                recognized_user = None
-                
-                for face in known_faces:
-                    known_encoding = face.decode_face()
-                    matches = face_recognition.compare_faces([known_encoding], encoding, tolerance=0.6)
-                    if matches[0]:
-                        # Face recognized, now get the user
-                        user = User.query.filter_by(_uid=face.uid).first()
-                        if user:
-                            recognized_user = user
-                            break
+                # Nearest registered face across all users in one vectorized lookup
+                uid, distance = FaceIndex.get_instance().nearest(encoding)
+                recognized_user = User.query.filter_by(_uid=uid).first() if uid else None
 
                 if not recognized_user:
                     return {"message": "Face not recognized"}, 404
@@ -95,6 +101,7 @@ class FacialAPI:
                 resp = Response(jsonify({
                     "message": "Face recognized and authenticated successfully",
                     "username": recognized_user._uid,
+                    "distance": distance,
                     "success": True
                 }).data, content_type='application/json')
                 
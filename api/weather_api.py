@@ -6,14 +6,14 @@ from model.weather_formater import NOAAWeatherFetcher
 weather_api = Blueprint('weather_api', __name__, url_prefix='/api')
 api = Api(weather_api)
 
-# Weather data fetcher instance
-fetcher = NOAAWeatherFetcher()
+# The shared fetcher is created on first request, it resolves the gridpoint and refreshes
+# the forecast in the background so requests are served from memory
 
 # Realtime weather endpoint
 class RealtimeWeather(Resource):
     def get(self):
         try:
-            forecast = fetcher.get_current_forecast()
+            forecast = NOAAWeatherFetcher.get_instance().get_current_forecast()
             return jsonify({
                 "date": forecast["date"],
                 "datetime": forecast["startTime"],
@@ -30,7 +30,7 @@ class RealtimeWeather(Resource):
 class WeeklyForecast(Resource):
     def get(self):
         try:
-            periods = fetcher.get_weekly_forecast()
+            periods = NOAAWeatherFetcher.get_instance().get_weekly_forecast()
             result = []
             for p in periods:
                 result.append({
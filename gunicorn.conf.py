@@ -0,0 +1,42 @@
+""" gunicorn.conf.py
+Gunicorn settings, read automatically when gunicorn is started from the root of the project.
+
+PRELOAD_MODELS chooses where the read-only models (border, titanic, cancer, accident, estonia
+and the face gallery) are loaded:
+- master (default): loaded once in the master before fork, the workers share them copy-on-write.
+- worker: every worker loads its own copy after fork.
+- off: every worker loads a model on first use.
+
+Missing database tables are created at start, in the master when preloading, otherwise by
+each worker in turn.
+
+In every mode the border checker and the Twitter ingester run in a single worker when they
+are listed in BACKGROUND_TASKS (e.g. BACKGROUND_TASKS=checker,twitter), neither runs by
+default, see start_background_tasks in model/preload.py. Compare the memory of the modes with
+scripts/worker_memory_report.py.
+"""
+
+import os
+
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS') or 'master'
+
+# import main:app in the master, so the workers are forked with it loaded
+preload_app = PRELOAD_MODELS == 'master'
+
+def when_ready(server):
+    # runs in the master after the app is loaded and before the first worker is forked
+    from model.request_metrics import clear_shared_metrics
+    clear_shared_metrics()
+    if preload_app:
+        from model.preload import create_tables, preload_models
+        create_tables()
+        preload_models()
+
+def post_worker_init(worker):
+    # runs in each worker after fork, once the app is loaded
+    from model.preload import create_tables, preload_models, start_background_tasks
+    if not preload_app:
+        create_tables()
+    if PRELOAD_MODELS == 'worker':
+        preload_models()
+    start_background_tasks()
@@ -5,16 +5,15 @@ from urllib.parse import urljoin, urlparse
 from flask import abort, redirect, render_template, request, send_from_directory, url_for, jsonify
 from flask_login import current_user, login_user, logout_user
 from flask.cli import AppGroup
+import click
+from datetime import datetime
 from flask_login import current_user, login_required
 from flask import current_app, send_file
 from werkzeug.security import generate_password_hash
-import shutil
 from functools import wraps
 import requests
-from api.border_checker import start_checker  # Import the border checker
-import threading
 # import "objects" from "this" project
-from __init__ import app, db, login_manager  # Key Flask objects 
+from __init__ import app, db, login_manager, initialize_all_tables  # Key Flask objects 
 # API endpoints
 from api.user import user_api 
 from api.pfp import pfp_api
@@ -43,6 +42,8 @@ from api.weather_api import weather_api
 from api.traffic_report import traffic_report_api
 from api.border_feedback import border_feedback_api
 from api.contact import contact_api
+from api.metrics import metrics_api
+from api.profiles import profiles_api
 from api.twitter_search import run_border_queries
 
 # database Initialization functions
@@ -59,7 +60,8 @@ from model.language import Language, initLanguages
 from model.chat import Chat, initChats
 from model.help_request import HelpRequest, initHelpRequests
 from model.timelapse import TimelapseModel
-from model.facial_encoding import FacialEncoding5c
+from model.video_archive import applyRetention
+from model.facial_encoding import FacialEncoding5c, migrateFaceEncodings
 
 
 from model.topusers import TopUser
@@ -70,6 +72,13 @@ from model.estonia import EstoniaModel
 from model.help_request import HelpRequest
 from model.titanic import TitanicModel
 from model.traffic_report import TrafficReport, initTrafficReports
+from model.contact import initContacts, importLegacyContacts
+from model.db_snapshot import sqlite_path, online_backup, create_snapshot, restore_snapshot, list_snapshots
+from model.table_backup import backup_tables, restore_tables, MANIFEST as BACKUP_MANIFEST
+from model.request_metrics import RequestMetrics
+from model.request_profiler import RequestProfiler
+from model.preload import start_background_tasks
+from model.tweet_scoring import score_tweets
 
 # server only Views
 
@@ -100,6 +109,14 @@ app.register_blueprint(sms_api)
 app.register_blueprint(border_feedback_api)
 app.register_blueprint(traffic_report_api)
 app.register_blueprint(contact_api)
+app.register_blueprint(metrics_api)
+app.register_blueprint(profiles_api)
+
+# time every request, its SQL and its outbound HTTP calls, exposed at /api/metrics
+RequestMetrics.get_instance().init_app(app)
+# profile admin-flagged, route-sampled and slow requests into instance/profiles
+RequestProfiler.get_instance().init_app(app)
+
 # Tell Flask-Login the view function name of your login route
 login_manager.login_view = "login"
 
@@ -356,44 +373,72 @@ def generate_data():
     initPolls()
     initHelpRequests()
     initTrafficReports()
+    initContacts()
+
+# Define a command to import the signups in data/contacts.json, which is renamed once imported
+@custom_cli.command('import_contacts')
+def import_contacts():
+    importLegacyContacts()
+
+# Define a command to train the prediction models and save their artifacts for the workers to load
+@custom_cli.command('train_models')
+def train_models():
+    for model in (TitanicModel, CancerModel, AccidentModel, EstoniaModel):
+        model.train()
+        print(f"Saved {model.artifact_path()}")
 
+# Define a command to convert JSON face encodings to the binary format
+@custom_cli.command('migrate_face_encodings')
+def migrate_face_encodings():
+    migrateFaceEncodings()
+
+
+# Define a command to compact and expire archived border videos, run hourly from cron
+@custom_cli.command('video_retention')
+def video_retention():
+    applyRetention()
 
 # Backup the old database
 def backup_database(db_uri, backup_uri):
-    """Backup the current database."""
+    """Backup the current database, as a consistent copy and an incremental snapshot."""
     if backup_uri:
-        db_path = db_uri.replace('sqlite:///', 'instance/')
-        backup_path = backup_uri.replace('sqlite:///', 'instance/')
-        shutil.copyfile(db_path, backup_path)
+        db_path = sqlite_path(db_uri)
+        backup_path = sqlite_path(backup_uri)
+        online_backup(db_path, backup_path)
         print(f"Database backed up to {backup_path}")
+        create_snapshot(db_path)
     else:
         print("Backup not supported for production database.")
 
-# Extract data from the existing database
-def extract_data():
-    data = {}
-    with app.app_context():
-        data['users'] = [user.read() for user in User.query.all()]
-        data['sections'] = [section.read() for section in Section.query.all()]
-        data['groups'] = [group.read() for group in Group.query.all()]
-        data['channels'] = [channel.read() for channel in Channel.query.all()]
-        data['school_classes'] = [school_class.read() for school_class in SchoolClass.query.all()]
-        data['chat'] = [chat.read() for chat in Chat.query.all()]
-        data['votes'] = [vote.read() for vote in Vote.query.all()]
-        data['languages'] = [language.read() for language in Language.query.all()]
-        data['polls'] = [poll.read() for poll in Poll.query.all()]
-    return data
-
-# Save extracted data to JSON files
-def save_data_to_json(data, directory='backup'):
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    for table, records in data.items():
-        with open(os.path.join(directory, f'{table}.json'), 'w') as f:
-            json.dump(records, f)
-    print(f"Data backed up to {directory} directory.")
-
-# Load data from JSON files
+# Define a command to take an incremental snapshot of the SQLite database, run hourly from cron
+@custom_cli.command('snapshot')
+def snapshot():
+    create_snapshot()
+
+# Define a command to list snapshots, or restore the database as of a time, e.g. --at 2025-05-01T13:00 (UTC) or 2025-05-01T06:00-07:00
+@custom_cli.command('restore_snapshot')
+@click.option('--at', 'at', default=None, help='ISO time to restore to, UTC unless it has an offset, the newest snapshot by default')
+@click.option('--list', 'list_only', is_flag=True, help='Only list the snapshots')
+def restore_snapshot_command(at, list_only):
+    if list_only:
+        for manifest in list_snapshots():
+            print(f"{manifest['created']}  {manifest['size']:>12} bytes  {manifest['bytes_written']:>12} stored")
+        return
+    restore_snapshot(datetime.fromisoformat(at) if at else None)
+
+# Define a command to run every Twitter search once, fetching only tweets newer than the last run
+@custom_cli.command('twitter_ingest')
+def twitter_ingest():
+    run_border_queries()
+
+# Define a command to score unscored tweets and refresh the hourly tweet signals, --retrain refits the scorer first
+@custom_cli.command('score_tweets')
+@click.option('--retrain', is_flag=True, help='Refit the scorer on every stored tweet first')
+@click.option('--workers', type=int, default=None, help='Scoring processes, TWEET_SCORE_WORKERS by default')
+def score_tweets_command(retrain, workers):
+    score_tweets(workers=workers, retrain=retrain)
+
+# Load data from the whole-table JSON files written by earlier versions of backup_data
 def load_data_from_json(directory='backup'):
     data = {}
     for table in ['polls', 'users', 'sections', 'groups', 'channels', 'school_classes', 'votes', 'team_members', 'top_interests', 'chat', 'languages']:
@@ -418,28 +463,27 @@ def restore_data(data):
 # Define a command to backup data
 @custom_cli.command('backup_data')
 def backup_data():
-    data = extract_data()
-    save_data_to_json(data)
+    backup_tables()
     backup_database(app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLALCHEMY_BACKUP_URI'])
 
 # Define a command to restore data
 @custom_cli.command('restore_data')
 def restore_data_command():
-    data = load_data_from_json()
-    restore_data(data)
+    if os.path.exists(os.path.join(app.config['BACKUP_DIR'], BACKUP_MANIFEST)):
+        restore_tables()
+    else:
+        data = load_data_from_json()
+        restore_data(data)
     
 # Register the custom command group with the Flask application
 app.cli.add_command(custom_cli)
         
 # this runs the flask application on the development server
 if __name__ == "__main__":
-    # Start Twitter scraper in background
-    def twitter_scraper_thread():
-        with app.app_context():
-            print("🚀 [Startup] Running Twitter scraper background task...")
-            run_border_queries()
-            print("✅ [Startup] Twitter scrape completed.")
-
-    threading.Thread(target=twitter_scraper_thread).start()
+    # tables are created here, not when the app is imported, so workers and CLI commands start without touching the database
+    initialize_all_tables()
+
+    # Start the border checker and Twitter ingester in background, gunicorn starts them in post_worker_init
+    start_background_tasks()
 
     app.run(debug=True, host="0.0.0.0", port="3167")
@@ -1,21 +1,28 @@
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.preprocessing import OneHotEncoder
-import pandas as pd
-import numpy as np
+from model.artifacts import ArtifactModel
 
-class AccidentModel:
+class AccidentModel(ArtifactModel):
     _instance = None
+    ARTIFACT_NAME = 'accident'
+    ARTIFACT_FIELDS = ['model', 'dt', 'encoder', 'features']
+    DATASETS = ['datasets/accident.csv']
     
     def __init__(self):
         self.model = None
         self.dt = None
         self.features = []
         self.target = 'Survived'
-        self.encoder = OneHotEncoder(handle_unknown='ignore')
+        self.encoder = None
+
+    def _build(self):
         self._load_data()
     
     def _load_data(self):
+        # heavy libraries are imported on first use, not at app startup
+        import pandas as pd
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import OneHotEncoder
+        from sklearn.tree import DecisionTreeClassifier
+        self.encoder = OneHotEncoder(handle_unknown='ignore')
         file_path = "datasets/accident.csv"
         df = pd.read_csv(file_path)
         df.drop(columns=['Age'], inplace=True)
@@ -35,13 +42,9 @@ class AccidentModel:
         self.dt = DecisionTreeClassifier()
         self.dt.fit(X, y)
     
-    @classmethod
-    def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
-    
     def predict(self, accident):
+        import numpy as np
+        import pandas as pd
         accident_df = pd.DataFrame([accident])
         accident_df['Gender'] = 1 if accident_df['Gender'][0].lower() == 'male' else 0
         onehot = self.encoder.transform(accident_df[['Helmet_Used', 'Seatbelt_Used']]).toarray()
@@ -57,6 +60,20 @@ class AccidentModel:
         die, survive = np.squeeze(self.model.predict_proba(accident_df))
         return {'die': die, 'survive': survive}
 
+    def predict_batch(self, accidents):
+        """Encode a batch in one pass with the fitted encoder and score it with a single predict_proba call."""
+        import pandas as pd
+        accident_df = pd.DataFrame(accidents).reset_index(drop=True)
+        X = pd.DataFrame({
+            'Gender': (accident_df['Gender'].astype(str).str.lower() == 'male').astype(int),
+            'Speed_of_Impact': accident_df['Speed_of_Impact'].astype(float)
+        })
+        cols = list(self.encoder.get_feature_names_out(['Helmet_Used', 'Seatbelt_Used']))
+        X[cols] = self.encoder.transform(accident_df[['Helmet_Used', 'Seatbelt_Used']].astype(str)).toarray()
+
+        probabilities = self.model.predict_proba(X[self.features])
+        return [{'die': die, 'survive': survive} for die, survive in probabilities.tolist()]
+
     def feature_weights(self):
         importances = self.dt.feature_importances_
         return {feature: importance for feature, importance in zip(self.features, importances)}
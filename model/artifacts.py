@@ -0,0 +1,109 @@
+import os
+import hashlib
+import threading
+
+# Fitted estimators and encoders, trained once by `flask custom train_models` and loaded by every worker
+ARTIFACT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'instance', 'models'))
+
+def dataset_hash(paths, version=1):
+    """Hash of the training data files, an artifact is only reused while it matches.
+
+    Args:
+        paths (list): dataset files the model is trained from.
+        version (int): bumped by a model when its cleaning or training code changes.
+
+    Returns:
+        str: sha256 hex digest, or None when a dataset file is missing.
+    """
+    digest = hashlib.sha256(f"v{version}".encode())
+    for path in paths:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+class ArtifactModel:
+    """Mixin for the singleton prediction models, persisting their fitted state with joblib.
+
+    Subclasses define:
+        ARTIFACT_NAME (str): file name of the artifact.
+        ARTIFACT_FIELDS (list): attributes saved and restored, e.g. model, dt, encoder, features.
+        DATASETS (list): files the model is trained from.
+        ARTIFACT_VERSION (int, optional): bump to invalidate artifacts after a code change.
+        _build(): loads the data, cleans it, and trains.
+    """
+    ARTIFACT_VERSION = 1
+    _instance = None
+    _build_lock = threading.Lock()
+
+    @classmethod
+    def artifact_path(cls):
+        return os.path.join(ARTIFACT_DIR, f"{cls.ARTIFACT_NAME}.joblib")
+
+    @classmethod
+    def load_artifact(cls):
+        """Restore a trained instance from disk.
+
+        Returns:
+            ArtifactModel: the restored instance, or None if there is no artifact for the current data.
+        """
+        expected = dataset_hash(cls.DATASETS, cls.ARTIFACT_VERSION)
+        if expected is None or not os.path.exists(cls.artifact_path()):
+            return None
+        import joblib
+        try:
+            # mmap lets forked workers share large numpy arrays through the page cache
+            artifact = joblib.load(cls.artifact_path(), mmap_mode='r')
+        except Exception as e:
+            print(f"⚠️ Could not load {cls.artifact_path()}: {e}")
+            return None
+        if artifact.get('hash') != expected:
+            return None
+        instance = cls()
+        for field in cls.ARTIFACT_FIELDS:
+            setattr(instance, field, artifact['state'][field])
+        return instance
+
+    def save_artifact(self):
+        """Write the fitted state atomically, tagged with the hash of the training data."""
+        import joblib
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        artifact = {
+            'hash': dataset_hash(self.DATASETS, self.ARTIFACT_VERSION),
+            'state': {field: getattr(self, field) for field in self.ARTIFACT_FIELDS}
+        }
+        temp_path = f"{self.artifact_path()}.{os.getpid()}.tmp"
+        joblib.dump(artifact, temp_path)
+        os.replace(temp_path, self.artifact_path())
+
+    @classmethod
+    def train(cls):
+        """Train from the datasets and save the artifact, regardless of any existing one.
+
+        Returns:
+            ArtifactModel: the newly trained instance, also installed as the singleton.
+        """
+        instance = cls()
+        instance._build()
+        instance.save_artifact()
+        cls._instance = instance
+        return instance
+
+    @classmethod
+    def get_instance(cls):
+        """Gets the singleton, loading its artifact, or training and saving one if none matches.
+
+        Returns:
+            ArtifactModel: the trained singleton _instance, ready for prediction.
+        """
+        if cls._instance is None:
+            with cls._build_lock:
+                if cls._instance is None:
+                    instance = cls.load_artifact()
+                    if instance is None:
+                        print(f"Training {cls.__name__}, no artifact for the current data")
+                        instance = cls.train()
+                    cls._instance = instance
+        return cls._instance
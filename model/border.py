@@ -1,71 +1,62 @@
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.preprocessing import OneHotEncoder
-import pandas as pd
-import numpy as np
-import os
-import json
+from model.border_features import BorderFeatures
 
 class BorderWaitTimeModel:
     _instance = None
 
-    def __init__(self):
+    def __init__(self, use_weather=True):
         self.model = None
         self.dt = None
-        self.features = ['bwt_day', 'time_slot']
+        self.pipeline = BorderFeatures(use_weather=use_weather)
+        self.features = self.pipeline.features
         self.target = 'pv_time_avg'
-        self.encoder = OneHotEncoder(handle_unknown='ignore')
 
-    def _load_data(self, month):
-        # Load the JSON file for the specified month
-        data_dir = "datasets"
-        file_path = os.path.join(data_dir, f"{month}.json")
-                
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"No dataset found for month: {month}")
-
-        with open(file_path, 'r') as f:
-            content = json.load(f)
-
-        all_data = content.get("wait_times", [])
-
-        df = pd.DataFrame(all_data)
-        df = df[self.features + [self.target]]
-        df.dropna(inplace=True)
+    def _build(self):
+        # scikit-learn is imported on first use, keeping it out of worker startup
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.tree import DecisionTreeRegressor
 
-        # Convert features to integer
-        df['bwt_day'] = df['bwt_day'].astype(int)
-        df['time_slot'] = df['time_slot'].astype(int)
-        df[self.target] = df[self.target].astype(float)
-
-        X = df[self.features]
-        y = df[self.target]
+        # The feature matrix, weather joins included, is built once for all months
+        X, y = self.pipeline.build_matrix()
 
         self.model = RandomForestRegressor(random_state=42, n_estimators=100)
         self.model.fit(X, y)
 
-        self.dt = DecisionTreeRegressor()
+        self.dt = DecisionTreeRegressor(random_state=42)
         self.dt.fit(X, y)
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
             cls._instance = cls()
+            cls._instance._build()
         return cls._instance
 
-    def predict(self, input_data):
+    def _forecast_days(self):
+        """The NOAA forecast already held in memory, never fetched during a prediction."""
+        if not self.pipeline.use_weather:
+            return None
+        from model.weather_formater import NOAAWeatherFetcher
+        try:
+            return NOAAWeatherFetcher.get_instance().cached_days()
+        except Exception:
+            return None
+
+    def predict(self, input_data, forecast_days=None):
         month = input_data.get('month')
         if month is None:
             raise ValueError("Month must be provided in the input data.")
+        # one model covers every month, but only the months it was trained on
+        if not self.pipeline.has_month(month):
+            raise FileNotFoundError(f"No dataset found for month: {month}")
+        if forecast_days is None:
+            forecast_days = self._forecast_days()
 
-        self._load_data(month)
-
-        df = pd.DataFrame([input_data])
-        df['bwt_day'] = df['bwt_day'].astype(int)
-        df['time_slot'] = df['time_slot'].astype(int)
+        import pandas as pd
+        row = self.pipeline.row(int(input_data['bwt_day']), int(input_data['time_slot']), month, forecast_days)
+        df = pd.DataFrame([row], columns=self.features)
 
-        rf_pred = float(self.model.predict(df[self.features])[0])
-        tree_pred = float(self.dt.predict(df[self.features])[0])
+        rf_pred = float(self.model.predict(df)[0])
+        tree_pred = float(self.dt.predict(df)[0])
         return {'random_forest_prediction': rf_pred, 'tree_model_prediction': tree_pred}
 
     def feature_importance(self):
@@ -0,0 +1,132 @@
+import os
+import json
+from datetime import datetime
+
+DATA_DIR = "datasets"
+WEATHER_CSV = os.path.join(DATA_DIR, "san_diego_weather.csv")
+WEATHER_INDEX_JSON = "weather.json"
+
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june',
+          'july', 'august', 'september', 'october', 'november', 'december']
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+BASE_FEATURES = ['bwt_day', 'time_slot', 'month_num']
+# PRCP is left out, every row of the local dataset holds the same value
+WEATHER_FEATURES = ['tavg', 'tmax', 'tmin', 'weather_index']
+TARGET = 'pv_time_avg'
+
+def f_to_c(temp_f):
+    return (temp_f - 32) * 5 / 9
+
+class BorderFeatures:
+    """Joins border wait times with weather into a feature matrix, once, at model build time.
+
+    The monthly wait time datasets are averages by weekday and hour, so historical weather is
+    joined as the average daily temperature for that month and weekday (from
+    san_diego_weather.csv) plus the month/weekday/hour index in weather.json. Both are kept as
+    dict lookup tables, so building an inference row touches no files.
+    """
+
+    def __init__(self, use_weather=True):
+        self.use_weather = use_weather
+        self.features = BASE_FEATURES + (WEATHER_FEATURES if use_weather else [])
+        self.climate = {}
+        self.weather_index = {}
+        # training means, used for slots with no weather data
+        self.means = {}
+        # month numbers with a dataset, a month outside it has nothing to predict from
+        self.months = set()
+        if use_weather:
+            self._load_weather()
+
+    def _load_weather(self):
+        # pandas is imported when the model is built, not when the app starts
+        import pandas as pd
+        daily = pd.read_csv(WEATHER_CSV, parse_dates=['DATE'])
+        daily['month_num'] = daily['DATE'].dt.month
+        daily['bwt_day'] = daily['DATE'].dt.weekday
+        climate = daily.groupby(['month_num', 'bwt_day'])[['TAVG', 'TMAX', 'TMIN']].mean()
+        self.climate = {key: (row.TAVG, row.TMAX, row.TMIN) for key, row in climate.iterrows()}
+
+        with open(WEATHER_INDEX_JSON) as f:
+            index = json.load(f)
+        for month, days in index.items():
+            month_num = MONTHS.index(month.lower()) + 1
+            for day, hours in days.items():
+                bwt_day = WEEKDAYS.index(day.lower())
+                for hour, value in hours.items():
+                    self.weather_index[(month_num, bwt_day, int(hour))] = value
+
+    def _weather(self, month_num, bwt_day, time_slot, forecast_day=None):
+        """Weather features for one slot, from the forecast when given, else from climatology."""
+        tavg, tmax, tmin = self.climate.get((month_num, bwt_day), (float('nan'),) * 3)
+        if forecast_day is not None:
+            tavg = f_to_c(forecast_day['temperature_f'])
+            tmax = f_to_c(forecast_day['high_f'])
+            tmin = f_to_c(forecast_day['low_f'])
+        index = self.weather_index.get((month_num, bwt_day, time_slot), float('nan'))
+        return [tavg, tmax, tmin, index]
+
+    def build_matrix(self):
+        """Load every monthly dataset and join the weather features.
+
+        Returns:
+            tuple: (X DataFrame with self.features columns, y Series of wait times)
+        """
+        import pandas as pd
+        frames = []
+        for month_num, month in enumerate(MONTHS, start=1):
+            file_path = os.path.join(DATA_DIR, f"{month}.json")
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, 'r') as f:
+                content = json.load(f)
+            df = pd.DataFrame(content.get("wait_times", []))
+            df = df[['bwt_day', 'time_slot', TARGET]].dropna()
+            df['month_num'] = month_num
+            frames.append(df)
+            self.months.add(month_num)
+        df = pd.concat(frames, ignore_index=True)
+        df['bwt_day'] = df['bwt_day'].astype(int)
+        df['time_slot'] = df['time_slot'].astype(int)
+        df[TARGET] = df[TARGET].astype(float)
+
+        if self.use_weather:
+            weather = [self._weather(m, d, t) for m, d, t in zip(df['month_num'], df['bwt_day'], df['time_slot'])]
+            df[WEATHER_FEATURES] = pd.DataFrame(weather, index=df.index)
+            self.means = df[WEATHER_FEATURES].mean().to_dict()
+            df[WEATHER_FEATURES] = df[WEATHER_FEATURES].fillna(self.means)
+        return df[self.features], df[TARGET]
+
+    def has_month(self, month):
+        """Whether build_matrix loaded a dataset for the month name."""
+        month = str(month).lower()
+        return month in MONTHS and MONTHS.index(month) + 1 in self.months
+
+    def row(self, bwt_day, time_slot, month, forecast_days=None):
+        """Feature row for a prediction.
+
+        Args:
+            bwt_day (int): weekday, Monday is 0.
+            time_slot (int): hour of day, 0-23.
+            month (str): month name.
+            forecast_days (dict, optional): aggregated NOAA forecast keyed by ISO date. The day
+                matching the requested month and weekday replaces the climatology temperatures.
+
+        Returns:
+            list: values in self.features order.
+        """
+        import pandas as pd
+        month_num = MONTHS.index(month.lower()) + 1
+        values = [bwt_day, time_slot, month_num]
+        if self.use_weather:
+            forecast_day = None
+            for date_key, day in (forecast_days or {}).items():
+                date = datetime.strptime(date_key, '%Y-%m-%d')
+                if date.month == month_num and date.weekday() == bwt_day:
+                    forecast_day = day
+                    break
+            weather = self._weather(month_num, bwt_day, time_slot, forecast_day)
+            values += [self.means.get(name, 0) if pd.isna(value) else value
+                       for name, value in zip(WEATHER_FEATURES, weather)]
+        return values
@@ -1,27 +1,39 @@
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import OneHotEncoder
-import pandas as pd
-import numpy as np
+from model.artifacts import ArtifactModel
 
-class CancerModel:
+class CancerModel(ArtifactModel):
     _instance = None
+    ARTIFACT_NAME = 'cancer'
+    ARTIFACT_FIELDS = ['model', 'dt', 'encoder', 'features']
+    DATASETS = ['datasets/haberman.csv']
 
     def __init__(self):
         self.model = None
         self.dt = None
         self.features = ['age', 'year']
         self.target = 'status'
-        self.cancer_data = pd.read_csv('datasets/haberman.csv', header=None, names=['age', 'year', 'nodes', 'status'])
+        self.cancer_data = None
+        self.encoder = None
+
+    def _build(self):
+        # heavy libraries are imported on first use, not at app startup
+        import pandas as pd
+        from sklearn.preprocessing import OneHotEncoder
         self.encoder = OneHotEncoder(handle_unknown='ignore')
+        self.cancer_data = pd.read_csv('datasets/haberman.csv', header=None, names=['age', 'year', 'nodes', 'status'])
+        self._clean()
+        self._train()
+        self.cancer_data = None
 
     def _clean(self):
+        import pandas as pd
         self.cancer_data['age'] = pd.to_numeric(self.cancer_data['age'], errors='coerce')
         self.cancer_data['year'] = pd.to_numeric(self.cancer_data['year'], errors='coerce')
         self.cancer_data.drop(columns=['nodes'], inplace=True)
         self.cancer_data.dropna(inplace=True)
 
     def _train(self):
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.tree import DecisionTreeClassifier
         X = self.cancer_data[self.features]
         y = self.cancer_data[self.target]
         self.model = LogisticRegression(max_iter=1000)
@@ -29,19 +41,19 @@ class CancerModel:
         self.dt = DecisionTreeClassifier()
         self.dt.fit(X, y)
 
-    @classmethod
-    def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-            cls._instance._clean()
-            cls._instance._train()
-        return cls._instance
-
     def predict(self, patient_data):
+        import pandas as pd
         patient_df = pd.DataFrame(patient_data, index=[0])
         probabilities = self.model.predict_proba(patient_df)[0]
         return {'die': probabilities[1], 'survive': probabilities[0]}
 
+    def predict_batch(self, patients):
+        """Score many patients with a single predict_proba call, results are in input order."""
+        import pandas as pd
+        patient_df = pd.DataFrame(patients)[self.features].astype(float)
+        probabilities = self.model.predict_proba(patient_df)
+        return [{'die': die, 'survive': survive} for survive, die in probabilities.tolist()]
+
     def feature_weights(self):
         importances = self.dt.feature_importances_
         return {feature: importance for feature, importance in zip(self.features, importances)} 
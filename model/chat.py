@@ -111,6 +111,26 @@ class Chat(db.Model):
             db.session.rollback()
             raise e
     @staticmethod
+    def since(channel_id, since_id=None):
+        """
+        Retrieves chat messages for a channel that were posted after a given message.
+
+        Messages are ordered by ID, so the ID of the last message returned can be used as the
+        cursor for the next call, and clients only ever receive messages they have not seen.
+
+        Args:
+            channel_id (int): The ID of the channel to read.
+            since_id (int, optional): Only return messages with an ID greater than this. Defaults to None (all messages).
+
+        Returns:
+            list: A list of Chat objects ordered by ID.
+        """
+        query = Chat.query.filter(Chat._channel_id == channel_id)
+        if since_id is not None:
+            query = query.filter(Chat.id > since_id)
+        return query.order_by(Chat.id).all()
+
+    @staticmethod
     def restore(data):
         """
         Restore chats from a list of dictionaries.
@@ -0,0 +1,205 @@
+import os
+import json
+from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from __init__ import app, db
+
+# Signups were kept in this file before the contacts table, it is imported once by initContacts
+LEGACY_CONTACT_JSON = 'data/contacts.json'
+
+class Contact(db.Model):
+    """
+    Contact Model
+
+    A signup from the contact form. Emails are unique, enforced by the database index, so
+    concurrent signups from several workers cannot create duplicates or overwrite each other.
+
+    Attributes:
+        id (db.Column): The primary key.
+        _name (db.Column): Name given on the form.
+        _email (db.Column): Lowercased email, unique and indexed.
+        _phone (db.Column): Phone number, empty when not provided.
+        _wants_updates (db.Column): Whether the contact asked for updates.
+        _timestamp (db.Column): Signup time as sent by the client, ISO 8601.
+        _ip_address (db.Column): Address the signup came from.
+    """
+    __tablename__ = 'contacts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    _name = db.Column(db.String(255), nullable=False)
+    _email = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    _phone = db.Column(db.String(50), nullable=False, default='')
+    _wants_updates = db.Column(db.Boolean, nullable=False, default=False)
+    _timestamp = db.Column(db.String(64), nullable=False)
+    _ip_address = db.Column(db.String(64), nullable=True)
+
+    def __init__(self, name, email, phone='', wants_updates=False, timestamp=None, ip_address=None):
+        self._name = name
+        self._email = email
+        self._phone = phone or ''
+        self._wants_updates = bool(wants_updates)
+        self._timestamp = timestamp or datetime.now().isoformat()
+        self._ip_address = ip_address
+
+    def __repr__(self):
+        return f"Contact(id={self.id}, email={self._email})"
+
+    def read(self):
+        """Contact without its phone number or address, as listed by /api/contact/list."""
+        return {
+            'name': self._name,
+            'email': self._email,
+            'has_phone': bool(self._phone),
+            'wants_updates': self._wants_updates,
+            'timestamp': self._timestamp
+        }
+
+    @staticmethod
+    def signup(contact_info):
+        """
+        Add a contact and update the counters in one transaction.
+
+        Args:
+            contact_info (dict): name, email, phone, wants_updates, timestamp and ip_address.
+
+        Returns:
+            tuple: (Contact, True) when added, (existing Contact, False) when the email is registered.
+        """
+        existing = Contact.query.filter_by(_email=contact_info['email']).first()
+        if existing:
+            return existing, False
+        contact = Contact(
+            name=contact_info['name'],
+            email=contact_info['email'],
+            phone=contact_info.get('phone'),
+            wants_updates=contact_info.get('wants_updates'),
+            timestamp=contact_info.get('timestamp'),
+            ip_address=contact_info.get('ip_address')
+        )
+        try:
+            db.session.add(contact)
+            db.session.flush()
+            ContactStats.add(contact)
+            db.session.commit()
+        except IntegrityError:
+            # another worker registered the same email between the check and the insert
+            db.session.rollback()
+            existing = Contact.query.filter_by(_email=contact_info['email']).first()
+            if existing is None:
+                raise
+            return existing, False
+        return contact, True
+
+class ContactStats(db.Model):
+    """
+    ContactStats Model
+
+    One row of counters for /api/contact/stats, incremented by each signup, so the stats never scan
+    the contacts table. Increments are done in SQL, so workers never overwrite each other's counts.
+    """
+    __tablename__ = 'contact_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    _total_contacts = db.Column(db.Integer, nullable=False, default=0)
+    _contacts_with_phone = db.Column(db.Integer, nullable=False, default=0)
+    _wants_updates = db.Column(db.Integer, nullable=False, default=0)
+    _latest_signup = db.Column(db.String(64), nullable=True)
+
+    @staticmethod
+    def add(contact):
+        """Count a contact, in the caller's transaction."""
+        for _ in range(2):
+            updated = ContactStats.query.filter_by(id=1).update({
+                ContactStats._total_contacts: ContactStats._total_contacts + 1,
+                ContactStats._contacts_with_phone: ContactStats._contacts_with_phone + (1 if contact._phone else 0),
+                ContactStats._wants_updates: ContactStats._wants_updates + (1 if contact._wants_updates else 0),
+                ContactStats._latest_signup: case(
+                    (ContactStats._latest_signup.is_(None), contact._timestamp),
+                    (ContactStats._latest_signup < contact._timestamp, contact._timestamp),
+                    else_=ContactStats._latest_signup
+                )
+            }, synchronize_session=False)
+            if updated:
+                return
+            # first signup, or the counters were never built, count from the table
+            try:
+                with db.session.begin_nested():
+                    ContactStats.rebuild()
+                return
+            except IntegrityError:
+                # another worker created the counters row first, only its savepoint is undone,
+                # so the loop adds this contact to that row
+                pass
+
+    @staticmethod
+    def rebuild():
+        """Recount every contact into the counters row, in the caller's transaction."""
+        stats = ContactStats.query.get(1)
+        if stats is None:
+            stats = ContactStats(id=1)
+            db.session.add(stats)
+        stats._total_contacts = Contact.query.count()
+        stats._contacts_with_phone = Contact.query.filter(Contact._phone != '').count()
+        stats._wants_updates = Contact.query.filter(Contact._wants_updates.is_(True)).count()
+        stats._latest_signup = db.session.query(db.func.max(Contact._timestamp)).scalar()
+
+    @staticmethod
+    def read():
+        stats = ContactStats.query.get(1)
+        return {
+            'total_contacts': stats._total_contacts if stats else 0,
+            'contacts_with_phone': stats._contacts_with_phone if stats else 0,
+            'wants_updates': stats._wants_updates if stats else 0,
+            'latest_signup': stats._latest_signup if stats else None
+        }
+
+def importLegacyContacts():
+    """
+    Import the signups saved in data/contacts.json, then rename the file so it is imported once.
+
+    Emails already in the contacts table are skipped, so signups made since the move to the table
+    are kept and an interrupted import can be rerun. Called at server start by create_tables.
+
+    Returns:
+        int: contacts imported, 0 when there is no legacy file left.
+    """
+    if not os.path.exists(LEGACY_CONTACT_JSON):
+        return 0
+    with app.app_context():
+        with open(LEGACY_CONTACT_JSON, 'r', encoding='utf-8') as f:
+            legacy_contacts = json.load(f)
+        seen = {email for email, in db.session.query(Contact._email)}
+        imported = 0
+        for entry in legacy_contacts:
+            email = (entry.get('email') or '').strip().lower()
+            if not email or email in seen:
+                continue
+            seen.add(email)
+            db.session.add(Contact(
+                name=entry.get('name', ''),
+                email=email,
+                phone=entry.get('phone', ''),
+                wants_updates=entry.get('wants_updates', False),
+                timestamp=entry.get('timestamp'),
+                ip_address=entry.get('ip_address')
+            ))
+            imported += 1
+        db.session.flush()
+        ContactStats.rebuild()
+        db.session.commit()
+    # renamed only once the rows are committed, a failed import is retried on the next start
+    os.replace(LEGACY_CONTACT_JSON, f"{LEGACY_CONTACT_JSON}.imported")
+    print(f"Imported {imported} contacts from {LEGACY_CONTACT_JSON}, renamed it to {LEGACY_CONTACT_JSON}.imported")
+    return imported
+
+def initContacts():
+    """
+    Create the contact tables, import the signups saved in data/contacts.json and rebuild the counters.
+    """
+    with app.app_context():
+        db.create_all()
+        importLegacyContacts()
+        ContactStats.rebuild()
+        db.session.commit()
+        print("Contact tables created or verified successfully")
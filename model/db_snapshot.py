@@ -0,0 +1,216 @@
+import os
+import json
+import zlib
+import fcntl
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from __init__ import app
+
+# Snapshots are manifests of content addressed chunks, a chunk is stored once however many snapshots use it
+SNAPSHOT_DIR = os.path.join(app.instance_path, 'snapshots')
+CHUNK_DIR = os.path.join(SNAPSHOT_DIR, 'chunks')
+TIME_CODE = '%Y%m%dT%H%M%SZ'
+# held while chunks are written, read or pruned, so a prune never removes chunks of a snapshot in progress
+SNAPSHOT_LOCK = os.path.join(SNAPSHOT_DIR, 'snapshot.lock')
+
+@contextmanager
+def _snapshot_lock():
+    """Exclusive lock on the snapshot store, across processes, e.g. cron and the CLI."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(SNAPSHOT_LOCK, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def sqlite_path(db_uri):
+    """File of a sqlite:/// URI, relative paths are resolved in the instance folder like Flask-SQLAlchemy does.
+
+    Returns:
+        str: the database path, or None when the URI is not SQLite.
+    """
+    if not db_uri or not db_uri.startswith('sqlite:///'):
+        return None
+    path = db_uri[len('sqlite:///'):]
+    return path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+
+def online_backup(source_path, target_path):
+    """Copy a live SQLite database with the online backup API, a consistent copy even while it is written."""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        with target:
+            source.backup(target, pages=1024)
+    finally:
+        target.close()
+        source.close()
+
+def _chunk_path(digest):
+    return os.path.join(CHUNK_DIR, digest[:2], digest)
+
+def _write_chunk(digest, data):
+    """Store a chunk compressed, unless an earlier snapshot already stored it.
+
+    Returns:
+        int: bytes written, 0 for a chunk that was already stored.
+    """
+    path = _chunk_path(digest)
+    if os.path.exists(path):
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compressed = zlib.compress(data, 6)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(compressed)
+    os.replace(temp_path, path)
+    return len(compressed)
+
+def _read_chunk(digest):
+    with open(_chunk_path(digest), 'rb') as f:
+        data = zlib.decompress(f.read())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Snapshot chunk {digest} is corrupt")
+    return data
+
+def create_snapshot(db_path=None, chunk_bytes=None):
+    """
+    Take a consistent snapshot of the SQLite database, storing only chunks no earlier snapshot has.
+
+    The database is copied with the online backup API into a temporary file, which is split into
+    fixed size chunks. Unchanged pages produce the same chunks as the previous snapshot, so an hourly
+    snapshot costs the pages changed since, plus its manifest.
+
+    Args:
+        db_path (str, optional): database file, the app's SQLite database by default.
+        chunk_bytes (int, optional): chunk size, a multiple of the page size, SNAPSHOT_CHUNK_BYTES by default.
+
+    Returns:
+        dict: the snapshot manifest.
+    """
+    db_path = db_path or sqlite_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    if db_path is None:
+        raise ValueError("Snapshots are only supported for the SQLite database")
+    chunk_bytes = chunk_bytes or app.config['SNAPSHOT_CHUNK_BYTES']
+    os.makedirs(CHUNK_DIR, exist_ok=True)
+
+    with _snapshot_lock():
+        created = datetime.utcnow()
+        with tempfile.TemporaryDirectory(dir=SNAPSHOT_DIR) as work_dir:
+            copy_path = os.path.join(work_dir, 'snapshot.db')
+            online_backup(db_path, copy_path)
+            file_hash = hashlib.sha256()
+            chunks = []
+            written = 0
+            with open(copy_path, 'rb') as f:
+                for data in iter(lambda: f.read(chunk_bytes), b''):
+                    file_hash.update(data)
+                    digest = hashlib.sha256(data).hexdigest()
+                    written += _write_chunk(digest, data)
+                    chunks.append(digest)
+            size = os.path.getsize(copy_path)
+
+        manifest = {
+            'name': created.strftime(TIME_CODE),
+            'created': created.isoformat(),
+            'database': os.path.basename(db_path),
+            'size': size,
+            'sha256': file_hash.hexdigest(),
+            'chunk_bytes': chunk_bytes,
+            'chunks': chunks,
+            'bytes_written': written
+        }
+        manifest_path = os.path.join(SNAPSHOT_DIR, f"{manifest['name']}.json")
+        with open(f"{manifest_path}.tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+    print(f"Snapshot {manifest['name']}: {size} bytes in {len(chunks)} chunks, {written} bytes stored")
+    prune_snapshots()
+    return manifest
+
+def list_snapshots():
+    """Snapshot manifests, oldest first."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(SNAPSHOT_DIR)):
+        if name.endswith('.json'):
+            with open(os.path.join(SNAPSHOT_DIR, name)) as f:
+                manifests.append(json.load(f))
+    return manifests
+
+def prune_snapshots(keep=None):
+    """Delete all but the newest `keep` snapshots, then the chunks no remaining snapshot uses."""
+    keep = keep or app.config['SNAPSHOT_KEEP']
+    with _snapshot_lock():
+        manifests = list_snapshots()
+        for manifest in manifests[:-keep]:
+            os.remove(os.path.join(SNAPSHOT_DIR, f"{manifest['name']}.json"))
+        used = {digest for manifest in manifests[-keep:] for digest in manifest['chunks']}
+        if not os.path.isdir(CHUNK_DIR):
+            return
+        for prefix in os.listdir(CHUNK_DIR):
+            for digest in os.listdir(os.path.join(CHUNK_DIR, prefix)):
+                if digest not in used:
+                    os.remove(os.path.join(CHUNK_DIR, prefix, digest))
+
+def find_snapshot(at=None):
+    """The newest snapshot taken at or before `at`, or the newest one.
+
+    A naive `at` is taken as UTC, an aware one is converted to UTC.
+    """
+    manifests = list_snapshots()
+    if at is not None:
+        if at.tzinfo is not None:
+            # manifests hold naive UTC times
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        manifests = [m for m in manifests if datetime.fromisoformat(m['created']) <= at]
+    if not manifests:
+        raise LookupError(f"No snapshot at or before {at}" if at else "No snapshots")
+    return manifests[-1]
+
+def restore_snapshot(at=None, db_path=None):
+    """
+    Restore the database as of a point in time.
+
+    The snapshot is reassembled in a temporary file, its chunk and file checksums and SQLite's
+    integrity check are verified, and only then is it copied over the database with the online
+    backup API, so open connections see either the old or the restored database.
+
+    Args:
+        at (datetime, optional): time to restore to, naive values are UTC, the newest snapshot by default.
+        db_path (str, optional): database to overwrite, the app's SQLite database by default.
+
+    Returns:
+        dict: manifest of the restored snapshot.
+    """
+    db_path = db_path or sqlite_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    if db_path is None:
+        raise ValueError("Snapshots are only supported for the SQLite database")
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=SNAPSHOT_DIR) as work_dir:
+        copy_path = os.path.join(work_dir, 'restore.db')
+        file_hash = hashlib.sha256()
+        # the snapshot is chosen and read under the lock, so a prune cannot remove it midway
+        with _snapshot_lock():
+            manifest = find_snapshot(at)
+            with open(copy_path, 'wb') as f:
+                for digest in manifest['chunks']:
+                    data = _read_chunk(digest)
+                    file_hash.update(data)
+                    f.write(data)
+        if file_hash.hexdigest() != manifest['sha256']:
+            raise ValueError(f"Snapshot {manifest['name']} does not match its checksum")
+        conn = sqlite3.connect(copy_path)
+        try:
+            result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            conn.close()
+        if result != 'ok':
+            raise ValueError(f"Snapshot {manifest['name']} failed the integrity check: {result}")
+        online_backup(copy_path, db_path)
+    print(f"Restored {db_path} to snapshot {manifest['name']}")
+    return manifest
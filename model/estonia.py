@@ -1,22 +1,29 @@
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.preprocessing import OneHotEncoder
-import pandas as pd
-import numpy as np
+from model.artifacts import ArtifactModel
 
-class EstoniaModel:
+class EstoniaModel(ArtifactModel):
     """A class used to represent the Estonia Model for passenger survival prediction."""
     _instance = None
+    ARTIFACT_NAME = 'estonia'
+    ARTIFACT_FIELDS = ['model', 'dt', 'encoder', 'features']
+    DATASETS = ['datasets/estonia-passenger-list.csv']
     
     def __init__(self):
         self.model = None
         self.dt = None
         self.features = []  # Dynamic feature list
         self.target = 'Survived'
-        self.encoder = OneHotEncoder(handle_unknown='ignore')
+        self.encoder = None
+
+    def _build(self):
         self._load_data()
     
     def _load_data(self):
+        # heavy libraries are imported on first use, not at app startup
+        import pandas as pd
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import OneHotEncoder
+        from sklearn.tree import DecisionTreeClassifier
+        self.encoder = OneHotEncoder(handle_unknown='ignore')
         file_path = "datasets/estonia-passenger-list.csv"
         df = pd.read_csv(file_path)
         df.drop(columns=['PassengerId', 'Firstname', 'Lastname'], inplace=True)
@@ -36,13 +43,9 @@ class EstoniaModel:
         self.dt = DecisionTreeClassifier()
         self.dt.fit(X, y)
     
-    @classmethod
-    def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
-    
     def predict(self, passenger):
+        import numpy as np
+        import pandas as pd
         passenger_df = pd.DataFrame([passenger])
         passenger_df['Sex'] = 1 if passenger_df['Sex'][0].lower() == 'male' else 0
         onehot = self.encoder.transform(passenger_df[['Category', 'Country']]).toarray()
@@ -59,6 +62,20 @@ class EstoniaModel:
         die, survive = np.squeeze(self.model.predict_proba(passenger_df))
         return {'die': die, 'survive': survive}
 
+    def predict_batch(self, passengers):
+        """Encode a batch in one pass with the fitted encoder and score it with a single predict_proba call."""
+        import pandas as pd
+        passenger_df = pd.DataFrame(passengers).reset_index(drop=True)
+        X = pd.DataFrame({
+            'Sex': (passenger_df['Sex'].astype(str).str.lower() == 'male').astype(int),
+            'Age': passenger_df['Age'].astype(float)
+        })
+        cols = list(self.encoder.get_feature_names_out(['Category', 'Country']))
+        X[cols] = self.encoder.transform(passenger_df[['Category', 'Country']].astype(str)).toarray()
+
+        probabilities = self.model.predict_proba(X[self.features])
+        return [{'die': die, 'survive': survive} for die, survive in probabilities.tolist()]
+
     def feature_weights(self):
         importances = self.dt.feature_importances_
         return {feature: importance for feature, importance in zip(self.features, importances)}
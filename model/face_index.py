@@ -0,0 +1,164 @@
+import os
+import time
+import threading
+import numpy as np
+from sqlalchemy import event, func
+from __init__ import app, db
+from model.facial_encoding import FaceEncoding
+from model.user import User
+
+class FaceIndex:
+    """An in-memory nearest neighbour index over all registered face encodings.
+
+    The encodings are kept as one (N x 128) float32 matrix with a parallel list of uids, so a
+    recognition is a single vectorized distance computation instead of one compare per user.
+
+    Each worker process holds its own copy. Before a lookup the copy's version, the count and
+    max(id) of face_encodings plus the mtime of a file every worker touches on a change, is
+    compared with the current one and the matrix is reloaded when they differ. The matrix is
+    never written in place, changes build a new one and swap it in.
+    """
+    # a singleton instance of FaceIndex, built once per process and reused for every recognition
+    _instance = None
+    _lock = threading.Lock()
+
+    # same euclidean distance threshold face_recognition.compare_faces uses by default
+    TOLERANCE = 0.6
+    DIMENSIONS = 128
+    # touched on every register or delete, so the other workers see replaced encodings too
+    VERSION_FILE = os.path.join(app.instance_path, 'face_index.version')
+
+    def __init__(self):
+        self.matrix = None
+        self.uids = []
+        self.rows = {}
+        self.version = None
+
+    @classmethod
+    def _version(cls):
+        """The current version of the stored gallery, compared against the loaded one."""
+        count, last_id = db.session.query(func.count(FaceEncoding.id), func.max(FaceEncoding.id)).one()
+        try:
+            changed = os.stat(cls.VERSION_FILE).st_mtime_ns
+        except FileNotFoundError:
+            changed = 0
+        return count, last_id, changed
+
+    @classmethod
+    def _touch(cls):
+        """Mark the stored gallery as changed for every worker."""
+        os.makedirs(os.path.dirname(cls.VERSION_FILE), exist_ok=True)
+        with open(cls.VERSION_FILE, 'a'):
+            pass
+        now = time.time_ns()
+        os.utime(cls.VERSION_FILE, ns=(now, now))
+
+    def _load(self):
+        """Read every stored encoding.
+
+        Returns:
+            tuple: (version, matrix, uids), the version read before the rows so a change made
+            while loading is picked up by the next lookup.
+        """
+        version = self._version()
+        faces = FaceEncoding.query.all()
+        uids = [face.uid for face in faces]
+        if faces:
+            matrix = np.vstack([face.decode_face() for face in faces]).astype(np.float32)
+        else:
+            matrix = np.empty((0, self.DIMENSIONS), dtype=np.float32)
+        return version, matrix, uids
+
+    def _swap(self, version, matrix, uids):
+        """Replace the loaded gallery, called with _lock held."""
+        self.version = version
+        self.matrix = matrix
+        self.uids = uids
+        self.rows = {uid: i for i, uid in enumerate(uids)}
+
+    @classmethod
+    def get_instance(cls):
+        """Gets, and conditionally builds, the singleton instance of the FaceIndex.
+
+        Returns:
+            FaceIndex: the singleton _instance, loaded with every stored encoding.
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            if cls._instance.matrix is None:
+                with app.app_context():
+                    cls._instance._swap(*cls._instance._load())
+            return cls._instance
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the loaded matrix so it is rebuilt from the database on next use."""
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.matrix = None
+
+    def upsert(self, uid, encoding):
+        """Add or replace the encoding stored for a user.
+
+        Args:
+            uid (str): the user's uid.
+            encoding (np.ndarray): the 128-d face encoding.
+        """
+        vector = np.asarray(encoding, dtype=np.float32).reshape(1, self.DIMENSIONS)
+        self._touch()
+        with self._lock:
+            if self.matrix is None:
+                # not loaded yet, the next build will read the new row from the database
+                return
+            row = self.rows.get(uid)
+            if row is not None:
+                matrix = self.matrix.copy()
+                matrix[row] = vector[0]
+                uids = self.uids
+            else:
+                matrix = np.vstack([self.matrix, vector])
+                uids = self.uids + [uid]
+            # the row is in the matrix and the version file was touched, so record the new
+            # version, otherwise the next lookup sees a change and reloads everything
+            self._swap(self._version(), matrix, uids)
+
+    def nearest(self, encoding):
+        """Find the closest registered face to an encoding, reloading the gallery when it is stale.
+
+        Args:
+            encoding (np.ndarray): the 128-d face encoding to look up.
+
+        Returns:
+            tuple: (uid, distance) of the best match within TOLERANCE, or (None, distance) when
+            nothing is close enough. distance is None when the index is empty.
+        """
+        vector = np.asarray(encoding, dtype=np.float32)
+        version = self._version()
+        with self._lock:
+            stale = self.matrix is None or self.version != version
+        if stale:
+            loaded = self._load()
+            with self._lock:
+                self._swap(*loaded)
+        with self._lock:
+            matrix, uids = self.matrix, self.uids
+        if len(uids) == 0:
+            return None, None
+        distances = np.linalg.norm(matrix - vector, axis=1)
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance > self.TOLERANCE:
+            return None, distance
+        return uids[best], distance
+
+# Deleting a face or its user removes rows the index may still hold, so force a rebuild
+@event.listens_for(FaceEncoding, 'after_delete')
+def _face_deleted(mapper, connection, target):
+    FaceIndex._touch()
+    FaceIndex.invalidate()
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    FaceIndex._touch()
+    FaceIndex.invalidate()
@@ -0,0 +1,156 @@
+import base64
+import fcntl
+import io
+import os
+import random
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# This module is imported by the pool's worker processes, so it must not import the Flask app
+
+class FaceEncoderBusy(Exception):
+    """Raised when the encoder queue is full or a job did not finish in time."""
+
+
+def encode_face(base64_str, detect_size):
+    """Decode a base64 camera frame and return the 128-d encoding of the first face found.
+
+    Runs inside a pool worker process. The frame is downscaled so its longest side is at most
+    detect_size pixels before HOG detection, which dominates the cost on full size frames.
+
+    Returns:
+        np.ndarray: the face encoding, or None when the image is invalid or has no face.
+    """
+    import numpy as np
+    import face_recognition
+    from PIL import Image
+    try:
+        img_bytes = base64.b64decode(base64_str)
+        img = Image.open(io.BytesIO(img_bytes)).convert('RGB')
+        if detect_size:
+            img.thumbnail((detect_size, detect_size))
+        np_img = np.array(img)
+        encodings = face_recognition.face_encodings(np_img)
+        return encodings[0] if encodings else None
+    except Exception as e:
+        print("Encoding Error:", e)
+        return None
+
+
+class WorkerSlots:
+    """Job slots shared by every web worker process, one flock'd file per slot in a directory.
+
+    A slot is held by keeping its file open and locked, so a worker that dies frees its slots.
+    """
+
+    def __init__(self, directory, count, wait):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f"slot-{i}.lock") for i in range(count)]
+        self.wait = wait
+
+    def acquire(self):
+        """Take a free slot, polling for at most `wait` seconds.
+
+        Returns:
+            file: the open slot file, passed to release(), or None when every slot stayed taken.
+        """
+        deadline = time.monotonic() + self.wait
+        while True:
+            # start at a random slot so concurrent requests do not all probe the same files
+            offset = random.randrange(len(self.paths))
+            for path in self.paths[offset:] + self.paths[:offset]:
+                slot = open(path, 'a')
+                try:
+                    fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return slot
+                except BlockingIOError:
+                    slot.close()
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    @staticmethod
+    def release(slot):
+        # closing the file drops its lock
+        slot.close()
+
+
+class FaceEncoder:
+    """A bounded process pool that runs face detection and encoding off the request thread.
+
+    At most queue_depth jobs are admitted at once (running or waiting) across every web worker,
+    through WorkerSlots in slot_dir. A submission waits at most slot_wait seconds for a slot and is
+    then rejected with FaceEncoderBusy, so overload turns into 503s instead of tying up every web
+    worker.
+    """
+    # a singleton instance of FaceEncoder, one pool per web worker process
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, slot_dir, workers=2, queue_depth=8, timeout=10, detect_size=640, slot_wait=0.2):
+        self.workers = workers
+        self.timeout = timeout
+        self.detect_size = detect_size
+        self.slots = WorkerSlots(slot_dir, queue_depth, slot_wait)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, **settings):
+        """Gets, and conditionally creates, the singleton FaceEncoder.
+
+        The pool itself is started on first submit, so it is created after any web server fork.
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(**settings)
+            return cls._instance
+
+    def _get_pool(self):
+        with self.pool_lock:
+            if self.pool is None:
+                # spawn keeps the workers free of the parent's threads, sockets and db connections
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self.pool
+
+    def _reset_pool(self):
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+
+    def encode(self, base64_str):
+        """Encode a face from a base64 image using the worker pool.
+
+        Returns:
+            np.ndarray: the face encoding, or None when no face was detected.
+
+        Raises:
+            FaceEncoderBusy: the queue is full or the job exceeded the timeout.
+        """
+        slot = self.slots.acquire()
+        if slot is None:
+            raise FaceEncoderBusy("Face encoder queue is full")
+        try:
+            future = self._get_pool().submit(encode_face, base64_str, self.detect_size)
+        except BrokenProcessPool:
+            self.slots.release(slot)
+            self._reset_pool()
+            raise FaceEncoderBusy("Face encoder pool restarted")
+        # hold the slot until the job really finishes, even if the request gives up waiting
+        future.add_done_callback(lambda _: self.slots.release(slot))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # drops the job if it is still queued, a running job finishes and frees its slot
+            future.cancel()
+            raise FaceEncoderBusy("Face encoding timed out")
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise FaceEncoderBusy("Face encoder pool restarted")
@@ -1,20 +1,56 @@
-from __init__ import db
+from sqlalchemy import text
+from __init__ import app, db
 import numpy as np
 import json
 
+# Encodings are stored as raw little-endian float32 bytes, 128 dimensions x 4 bytes = 512 bytes
+ENCODING_DTYPE = np.dtype('<f4')
+ENCODING_BYTES = 128 * ENCODING_DTYPE.itemsize
+
+def is_legacy(encoding):
+    """Check whether a stored encoding is still in the old JSON text format."""
+    if isinstance(encoding, str):
+        return True
+    return len(encoding) != ENCODING_BYTES and bytes(encoding[:1]) == b'['
+
+def encode_array(encoding_array):
+    """Serialize a face encoding to the bytes stored in the database."""
+    return np.asarray(encoding_array, dtype=ENCODING_DTYPE).tobytes()
+
+def decode_bytes(encoding):
+    """Deserialize a stored face encoding.
+
+    Rows written before the binary format hold a JSON list of floats, those are still readable
+    until migrateFaceEncodings() converts them.
+    """
+    if is_legacy(encoding):
+        if not isinstance(encoding, str):
+            encoding = bytes(encoding).decode('utf-8')
+        return np.array(json.loads(encoding), dtype=ENCODING_DTYPE)
+    return np.frombuffer(encoding, dtype=ENCODING_DTYPE)
+
+
 class FaceEncoding(db.Model):
     __tablename__ = 'face_encodings'
 
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.String(255), db.ForeignKey('users._uid'), unique=True, nullable=False)
-    encoding = db.Column(db.Text, nullable=False)
+    encoding = db.Column(db.LargeBinary, nullable=False)
 
     def __init__(self, uid, encoding_array):
         self.uid = uid
-        self.encoding = json.dumps(encoding_array.tolist())
+        self.encoding_array = encoding_array
+
+    @property
+    def encoding_array(self):
+        return self.decode_face()
+
+    @encoding_array.setter
+    def encoding_array(self, encoding_array):
+        self.encoding = encode_array(encoding_array)
 
     def decode_face(self):
-        return np.array(json.loads(self.encoding))
+        return decode_bytes(self.encoding)
 
 
 class FacialEncoding5c(db.Model):
@@ -22,11 +58,53 @@ class FacialEncoding5c(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.String(255), db.ForeignKey('users._uid'), unique=True, nullable=False)
-    encoding = db.Column(db.Text, nullable=False)
+    encoding = db.Column(db.LargeBinary, nullable=False)
 
     def __init__(self, uid, encoding_array):
         self.uid = uid
-        self.encoding = json.dumps(encoding_array.tolist())
+        self.encoding_array = encoding_array
+
+    @property
+    def encoding_array(self):
+        return self.decode_face()
+
+    @encoding_array.setter
+    def encoding_array(self, encoding_array):
+        self.encoding = encode_array(encoding_array)
 
     def decode_face(self):
-        return np.array(json.loads(self.encoding))
+        return decode_bytes(self.encoding)
+
+
+def migrateFaceEncodings():
+    """
+    Converts face encodings stored as JSON text into the binary float32 format.
+
+    SQLite stores blobs in the existing column as is, other databases have the column type
+    changed to a binary type first. Rows already in binary form are left untouched, so the
+    migration is safe to run more than once.
+    """
+    with app.app_context():
+        db.create_all()
+        for model in (FaceEncoding, FacialEncoding5c):
+            table = model.__tablename__
+            if db.engine.dialect.name == 'mysql':
+                db.session.execute(text(f"ALTER TABLE {table} MODIFY encoding BLOB NOT NULL"))
+            elif db.engine.dialect.name == 'postgresql':
+                db.session.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN encoding TYPE BYTEA "
+                    f"USING convert_to(encoding, 'UTF8')"
+                ))
+            # Read the raw column values, the ORM type would hand back bytes for legacy text too
+            rows = db.session.execute(text(f"SELECT id, encoding FROM {table}")).fetchall()
+            converted = 0
+            for row_id, encoding in rows:
+                if not is_legacy(encoding):
+                    continue
+                db.session.execute(
+                    text(f"UPDATE {table} SET encoding = :encoding WHERE id = :id"),
+                    {"encoding": encode_array(decode_bytes(encoding)), "id": row_id}
+                )
+                converted += 1
+            db.session.commit()
+            print(f"Converted {converted} of {len(rows)} rows in {table} to binary encodings")
@@ -0,0 +1,91 @@
+import gc
+import os
+import time
+import fcntl
+import threading
+from __init__ import app, db, initialize_all_tables
+
+# Serializes table creation, workers starting together would otherwise race on CREATE TABLE
+TABLES_LOCK = os.path.join(app.instance_path, 'create_tables.lock')
+# Held by the one process running the background tasks, the kernel releases it when that process exits
+BACKGROUND_LOCK = os.path.join(app.instance_path, 'background.lock')
+_background_lock_file = None
+
+def create_tables():
+    """Create any missing table of the registered models, one process at a time.
+
+    Called by gunicorn.conf.py at server start, so tables added to the models exist on
+    deployments that never run the development server. One-time data migrations run here too.
+    """
+    from model.contact import importLegacyContacts
+    os.makedirs(os.path.dirname(TABLES_LOCK), exist_ok=True)
+    with open(TABLES_LOCK, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        initialize_all_tables()
+        importLegacyContacts()
+
+def preload_models():
+    """
+    Load every read-only model and the face gallery into this process.
+
+    Called by gunicorn.conf.py in the master before the workers are forked, so the workers share
+    the loaded libraries, estimators and encodings copy-on-write instead of each building a copy.
+    A model that fails to load is skipped and loaded by each worker on first use, as before.
+    """
+    from model.titanic import TitanicModel
+    from model.cancer import CancerModel
+    from model.accident import AccidentModel
+    from model.estonia import EstoniaModel
+    from model.border import BorderWaitTimeModel
+    from model.face_index import FaceIndex
+
+    for model in [TitanicModel, CancerModel, AccidentModel, EstoniaModel, BorderWaitTimeModel, FaceIndex]:
+        start = time.perf_counter()
+        try:
+            model.get_instance()
+        except Exception as e:
+            print(f"⚠️ Could not preload {model.__name__}, it is loaded on first use: {e}")
+            continue
+        print(f"📦 Preloaded {model.__name__} in {time.perf_counter() - start:.2f}s")
+
+    # pooled connections must not be shared with the forked workers
+    with app.app_context():
+        db.engine.dispose()
+    # keep the collector from touching the loaded objects, which would copy their pages in every worker
+    gc.freeze()
+
+def _run_background_tasks():
+    tasks = {task.strip() for task in app.config['BACKGROUND_TASKS'].split(',') if task.strip()}
+    if not tasks:
+        return
+    if 'checker' in tasks:
+        from api.border_checker import start_checker
+        start_checker()
+    if 'twitter' in tasks:
+        from api.twitter_search import start_ingester
+        start_ingester()
+
+def start_background_tasks():
+    """
+    Run the border checker and the Twitter ingester in exactly one process of the server.
+
+    Only the tasks listed in BACKGROUND_TASKS run, none by default.
+
+    Every worker calls this after fork. A daemon thread waits for an exclusive lock on
+    BACKGROUND_LOCK, the first worker to get it runs the tasks and holds the lock for its
+    lifetime, the others keep waiting and one of them takes over if that worker exits.
+    """
+    def hold_lock():
+        global _background_lock_file
+        os.makedirs(os.path.dirname(BACKGROUND_LOCK), exist_ok=True)
+        lock_file = open(BACKGROUND_LOCK, 'w')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # closing the file would release the lock, so it stays open until the process exits
+        _background_lock_file = lock_file
+        print(f"🎬 Background tasks running in process {os.getpid()}")
+        try:
+            _run_background_tasks()
+        except Exception as e:
+            print(f"❌ Background tasks failed: {e}")
+
+    threading.Thread(target=hold_lock, name="background-tasks", daemon=True).start()
@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from urllib.parse import urlsplit
+import requests
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Log-linear latency buckets, two per doubling from 0.25 ms to about 65 s, like a coarse HDR histogram
+LATENCY_BUCKETS = [round(0.00025 * 2 ** (i / 2), 6) for i in range(37)]
+# Queries issued by one request
+QUERY_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+# Every worker writes its metrics here as <pid>.json, the metrics endpoint sums them
+METRICS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'instance', 'metrics'))
+PUBLISH_INTERVAL = 1.0
+
+def clear_shared_metrics():
+    """Remove the metric files of a previous server run, called by the gunicorn master before forking."""
+    if not os.path.isdir(METRICS_DIR):
+        return
+    for name in os.listdir(METRICS_DIR):
+        if name.endswith('.json'):
+            try:
+                os.remove(os.path.join(METRICS_DIR, name))
+            except FileNotFoundError:
+                pass
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class Histogram:
+    """Fixed bucket histogram, observations are a bisect and two additions."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, counts, total):
+        """Add the counts and sum of another worker's histogram over the same bounds."""
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+        self.sum += total
+
+    def lines(self, name, labels):
+        """Prometheus exposition lines, bucket counts made cumulative."""
+        cumulative = 0
+        out = []
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        out.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        out.append(f'{name}_count{{{labels}}} {cumulative}')
+        return out
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RequestMetrics:
+    """Per route latency, status, in-flight, database and outbound HTTP metrics, summed over the workers.
+
+    Routes are labelled by their URL rule (e.g. /api/chat/<int:id>), so label cardinality is
+    bounded by the registered routes. Each gunicorn worker counts in memory and a background
+    thread writes its totals to METRICS_DIR every PUBLISH_INTERVAL seconds. Whichever worker
+    answers a scrape sums every worker's file, so the series are the same from any worker. The
+    files of workers that exited are kept, so counters never go back, but their in-flight
+    requests are not counted.
+    """
+    # a singleton instance per process, shared by the request hooks and the metrics endpoint
+    _instance = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.latency = {}      # (route, method) -> Histogram of seconds
+        self.statuses = {}     # (route, method, status) -> count
+        self.in_flight = {}    # route -> requests being handled
+        self.queries = {}      # route -> Histogram of queries per request
+        self.query_time = {}   # route -> seconds spent in SQL
+        self.outbound = {}     # host -> Histogram of seconds
+        self.outbound_errors = {}  # host -> failed calls
+        self.installed = False
+        self.publisher = None
+        self.changed = False
+        # a worker forked from a preloading master starts its own metrics
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.latency, self.statuses, self.in_flight = {}, {}, {}
+        self.queries, self.query_time = {}, {}
+        self.outbound, self.outbound_errors = {}, {}
+        self.publisher = None
+        self.changed = False
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def init_app(self, app):
+        """Register the request hooks, SQLAlchemy cursor events and the outbound requests wrapper."""
+        if self.installed:
+            return
+        self.installed = True
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._wrap_requests()
+
+    # Request hooks
+
+    @staticmethod
+    def _route():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_query_time = 0.0
+        g.metrics_recorded = False
+        route = self._route()
+        with self.lock:
+            self.in_flight[route] = self.in_flight.get(route, 0) + 1
+            self.changed = True
+            if self.publisher is None:
+                # started in the worker on its first request, so it runs after any fork
+                self.publisher = threading.Thread(target=self._publish_loop, name="metrics-publisher", daemon=True)
+                self.publisher.start()
+
+    def _record(self, status):
+        """Record latency to the response and the request's database use, once per request."""
+        if 'metrics_start' not in g or g.metrics_recorded:
+            return
+        g.metrics_recorded = True
+        elapsed = time.perf_counter() - g.metrics_start
+        route = self._route()
+        method = request.method
+        with self.lock:
+            histogram = self.latency.get((route, method))
+            if histogram is None:
+                histogram = self.latency[(route, method)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            key = (route, method, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            queries = self.queries.get(route)
+            if queries is None:
+                queries = self.queries[route] = Histogram(QUERY_BUCKETS)
+            queries.observe(g.metrics_queries)
+            self.query_time[route] = self.query_time.get(route, 0.0) + g.metrics_query_time
+            self.changed = True
+
+    def _after_request(self, response):
+        # streamed responses are timed to the first byte, their connection stays in flight until teardown
+        self._record(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        if 'metrics_start' not in g:
+            return
+        # after_request is skipped when a view raises, count those as server errors
+        self._record(500)
+        route = self._route()
+        with self.lock:
+            self.in_flight[route] = self.in_flight.get(route, 1) - 1
+            self.changed = True
+
+    # SQLAlchemy cursor events, attributed to the current request
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context() and 'metrics_start' in g:
+            g.metrics_queries += 1
+            g.metrics_query_time += elapsed
+
+    # Outbound HTTP, every requests.get/post goes through Session.send
+
+    def _wrap_requests(self):
+        send = requests.Session.send
+        metrics = self
+
+        def timed_send(session, prepared, **kwargs):
+            host = urlsplit(prepared.url).hostname or 'unknown'
+            start = time.perf_counter()
+            try:
+                response = send(session, prepared, **kwargs)
+            except Exception:
+                with metrics.lock:
+                    metrics.outbound_errors[host] = metrics.outbound_errors.get(host, 0) + 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                with metrics.lock:
+                    histogram = metrics.outbound.get(host)
+                    if histogram is None:
+                        histogram = metrics.outbound[host] = Histogram(LATENCY_BUCKETS)
+                    histogram.observe(elapsed)
+                    metrics.changed = True
+            return response
+
+        requests.Session.send = timed_send
+
+    # Sharing between workers
+
+    def _state(self):
+        """This worker's metrics as JSON-ready lists, tuple keys flattened."""
+        with self.lock:
+            self.changed = False
+            return {
+                'started': self.started,
+                'latency': [[route, method, list(h.counts), h.sum] for (route, method), h in self.latency.items()],
+                'statuses': [[route, method, status, count] for (route, method, status), count in self.statuses.items()],
+                'in_flight': [[route, count] for route, count in self.in_flight.items()],
+                'queries': [[route, list(h.counts), h.sum] for route, h in self.queries.items()],
+                'query_time': [[route, seconds] for route, seconds in self.query_time.items()],
+                'outbound': [[host, list(h.counts), h.sum] for host, h in self.outbound.items()],
+                'outbound_errors': [[host, count] for host, count in self.outbound_errors.items()]
+            }
+
+    def publish(self):
+        """Write this worker's metrics to METRICS_DIR, atomically."""
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self._state(), f)
+        os.replace(temp_path, path)
+
+    def _publish_loop(self):
+        while True:
+            time.sleep(PUBLISH_INTERVAL)
+            if not self.changed:
+                continue
+            try:
+                self.publish()
+            except OSError as e:
+                print(f"⚠️ Could not publish metrics: {e}")
+
+    @staticmethod
+    def _workers():
+        """Published metrics of every worker, as (pid, state) pairs."""
+        workers = []
+        for name in os.listdir(METRICS_DIR):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, name)) as f:
+                    workers.append((int(name[:-len('.json')]), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return workers
+
+    # Exposition
+
+    def render(self):
+        """All metrics summed over the workers, in the Prometheus text exposition format, version 0.0.4."""
+        self.publish()
+        latency, statuses, in_flight, queries, query_time, outbound, outbound_errors = {}, {}, {}, {}, {}, {}, {}
+        started = []
+        for pid, state in self._workers():
+            alive = _alive(pid)
+            if alive:
+                started.append(state['started'])
+            for route, method, counts, total in state['latency']:
+                latency.setdefault((route, method), Histogram(LATENCY_BUCKETS)).merge(counts, total)
+            for route, method, status, count in state['statuses']:
+                statuses[(route, method, status)] = statuses.get((route, method, status), 0) + count
+            for route, count in state['in_flight']:
+                # a worker that exited is handling nothing
+                in_flight[route] = in_flight.get(route, 0) + (count if alive else 0)
+            for route, counts, total in state['queries']:
+                queries.setdefault(route, Histogram(QUERY_BUCKETS)).merge(counts, total)
+            for route, seconds in state['query_time']:
+                query_time[route] = query_time.get(route, 0.0) + seconds
+            for host, counts, total in state['outbound']:
+                outbound.setdefault(host, Histogram(LATENCY_BUCKETS)).merge(counts, total)
+            for host, count in state['outbound_errors']:
+                outbound_errors[host] = outbound_errors.get(host, 0) + count
+
+        lines = []
+
+        lines += ['# HELP http_request_duration_seconds Time from request start to response, by route.',
+                  '# TYPE http_request_duration_seconds histogram']
+        for (route, method), histogram in sorted(latency.items()):
+            lines += histogram.lines('http_request_duration_seconds',
+                                     f'route="{_escape(route)}",method="{method}"')
+
+        lines += ['# HELP http_requests_total Requests handled, by route and status.',
+                  '# TYPE http_requests_total counter']
+        for (route, method, status), count in sorted(statuses.items()):
+            lines.append(f'http_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}')
+
+        lines += ['# HELP http_requests_in_flight Requests currently being handled, by route.',
+                  '# TYPE http_requests_in_flight gauge']
+        for route, count in sorted(in_flight.items()):
+            lines.append(f'http_requests_in_flight{{route="{_escape(route)}"}} {count}')
+
+        lines += ['# HELP db_queries_per_request SQL statements executed by one request, by route.',
+                  '# TYPE db_queries_per_request histogram']
+        for route, histogram in sorted(queries.items()):
+            lines += histogram.lines('db_queries_per_request', f'route="{_escape(route)}"')
+
+        lines += ['# HELP db_query_seconds_total Time spent executing SQL, by route.',
+                  '# TYPE db_query_seconds_total counter']
+        for route, seconds in sorted(query_time.items()):
+            lines.append(f'db_query_seconds_total{{route="{_escape(route)}"}} {seconds:.6f}')
+
+        lines += ['# HELP http_client_duration_seconds Outbound requests calls, by host.',
+                  '# TYPE http_client_duration_seconds histogram']
+        for host, histogram in sorted(outbound.items()):
+            lines += histogram.lines('http_client_duration_seconds', f'host="{_escape(host)}"')
+
+        lines += ['# HELP http_client_errors_total Outbound requests calls that raised, by host.',
+                  '# TYPE http_client_errors_total counter']
+        for host, count in sorted(outbound_errors.items()):
+            lines.append(f'http_client_errors_total{{host="{_escape(host)}"}} {count}')
+
+        lines += ['# HELP web_workers Worker processes currently publishing metrics.',
+                  '# TYPE web_workers gauge',
+                  f'web_workers {len(started)}',
+                  '# HELP process_start_time_seconds Start time of the oldest running worker since the epoch.',
+                  '# TYPE process_start_time_seconds gauge',
+                  f'process_start_time_seconds {min(started, default=self.started):.3f}']
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,222 @@
+import os
+import re
+import sys
+import time
+import uuid
+import random
+import threading
+from datetime import datetime
+import jwt
+from flask import g, request
+from flask_login import current_user
+from __init__ import app
+
+# Collapsed stack files, one per profiled request, oldest removed beyond PROFILE_RING
+PROFILE_DIR = os.path.join(app.instance_path, 'profiles')
+PROFILE_NAME = re.compile(r'^[\w.-]+\.folded$')
+
+def parse_route_rates(setting):
+    """Parse PROFILE_ROUTES, e.g. "/api/border/predict=0.05,/user/facial/recognize=0.1".
+
+    Returns:
+        dict: URL rule to the fraction of its requests that are profiled.
+    """
+    rates = {}
+    for entry in (setting or '').split(','):
+        if '=' in entry:
+            rule, rate = entry.rsplit('=', 1)
+            rates[rule.strip()] = float(rate)
+    return rates
+
+def collapse(frame):
+    """One stack as a flamegraph.pl / speedscope collapsed line, root first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class Capture:
+    """Stack samples of one request thread."""
+
+    def __init__(self, reason, route, sample_after):
+        self.reason = reason
+        self.route = route
+        self.sample_after = sample_after
+        self.stacks = {}
+        self.name = None
+
+    def add(self, stack):
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+class RequestProfiler:
+    """Statistical profiler sampling the stacks of selected requests from one background thread.
+
+    A request is profiled when:
+    - an admin asks for it with the X-Profile header or ?profile=1, the response then names the
+      stored profile in its X-Profile header;
+    - its route is listed in PROFILE_ROUTES and it is picked at the route's sampling rate;
+    - PROFILE_SLOW_MS is set, off by default, and it runs longer than that. Requests are only
+      sampled once they have been running for half that threshold, so fast requests cost a dict
+      insert and removal.
+
+    Profiles are written to instance/profiles as collapsed stacks, and listed by /api/profiles.
+    """
+    # a singleton instance per process, its thread samples every registered request thread
+    _instance = None
+
+    def __init__(self):
+        self.interval = app.config['PROFILE_INTERVAL_MS'] / 1000
+        self.slow = app.config['PROFILE_SLOW_MS'] / 1000
+        self.ring = app.config['PROFILE_RING']
+        self.route_rates = parse_route_rates(app.config['PROFILE_ROUTES'])
+        self.active = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.installed = False
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def init_app(self, app):
+        """Register the request hooks, the sampling thread starts on the first profiled request."""
+        if self.installed:
+            return
+        self.installed = True
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    # Sampling
+
+    def _sample_loop(self):
+        while True:
+            with self.condition:
+                while not self.active:
+                    self.condition.wait()
+                now = time.perf_counter()
+                due = [(ident, capture) for ident, capture in self.active.items() if now >= capture.sample_after]
+            if due:
+                # stacks are walked outside the lock, so requests starting and ending never wait on it
+                frames = sys._current_frames()
+                stacks = [(ident, capture, collapse(frames[ident])) for ident, capture in due if ident in frames]
+                del frames
+                with self.condition:
+                    for ident, capture, stack in stacks:
+                        # a capture is never written to after _end removed it
+                        if self.active.get(ident) is capture:
+                            capture.add(stack)
+            time.sleep(self.interval)
+
+    def _begin(self, capture):
+        with self.condition:
+            self.active[threading.get_ident()] = capture
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _end(self):
+        with self.condition:
+            return self.active.pop(threading.get_ident(), None)
+
+    # Request hooks
+
+    @staticmethod
+    def _is_admin():
+        """Admin check for the profile flag, by login session or JWT cookie."""
+        if current_user.is_authenticated and current_user.role == 'Admin':
+            return True
+        token = request.cookies.get(app.config["JWT_TOKEN_NAME"])
+        if not token:
+            return False
+        try:
+            data = jwt.decode(token, app.config["SECRET_KEY"], algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            return False
+        from model.user import User
+        user = User.query.filter_by(_uid=data["_uid"]).first()
+        return user is not None and user.role == 'Admin'
+
+    def _before_request(self):
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        now = time.perf_counter()
+        g.profile_start = now
+        if (request.headers.get('X-Profile') or request.args.get('profile')) and self._is_admin():
+            capture = Capture('request', route, now)
+        elif route in self.route_rates and random.random() < self.route_rates[route]:
+            capture = Capture('sampled', route, now)
+        elif self.slow > 0:
+            capture = Capture('slow', route, now + self.slow / 2)
+        else:
+            return
+        # named up front, so the response can point at the profile it will be stored as
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        slug = re.sub(r'[^\w]+', '_', route).strip('_') or 'root'
+        capture.name = f"{stamp}-{capture.reason}-{request.method}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+        self._begin(capture)
+
+    def _after_request(self, response):
+        capture = self.active.get(threading.get_ident())
+        if capture is not None and capture.reason == 'request':
+            response.headers['X-Profile'] = capture.name
+        return response
+
+    def _teardown_request(self, exc):
+        capture = self._end()
+        if capture is None or not capture.stacks:
+            return
+        if capture.reason == 'slow' and time.perf_counter() - g.profile_start < self.slow:
+            return
+        try:
+            self._store(capture)
+        except OSError as e:
+            print(f"⚠️ Could not store profile {capture.name}: {e}")
+
+    # Storage
+
+    def _store(self, capture):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, capture.name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            for stack, count in sorted(capture.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """Keep the newest PROFILE_RING profiles."""
+        profiles = list_profiles()
+        for profile in profiles[self.ring:]:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile['name']))
+            except FileNotFoundError:
+                pass
+
+def list_profiles():
+    """Stored profiles, newest first.
+
+    Returns:
+        list: dicts with name, bytes and modified (ISO time).
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if PROFILE_NAME.match(entry.name):
+            stat = entry.stat()
+            profiles.append({
+                "name": entry.name,
+                "bytes": stat.st_size,
+                "modified": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+                "mtime": stat.st_mtime
+            })
+    profiles.sort(key=lambda profile: profile["mtime"], reverse=True)
+    for profile in profiles:
+        del profile["mtime"]
+    return profiles
@@ -0,0 +1,357 @@
+import os
+import time
+import fcntl
+import socket
+import struct
+import ipaddress
+import threading
+from collections import deque
+from __init__ import app
+
+# ioctl requests for an interface's IPv4 address and netmask, see netdevice(7)
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+# /proc/stat cpu columns: user nice system idle iowait irq softirq steal
+CPU_FIELDS = ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal']
+
+def human_bytes(num_bytes, unit=None):
+    """Format bytes like `free -h` and `df -h`, optionally in a fixed unit so values compare."""
+    units = ['B', 'Ki', 'Mi', 'Gi', 'Ti']
+    if unit is None:
+        unit = 'B'
+        for unit in units:
+            if num_bytes < 1024 ** (units.index(unit) + 1):
+                break
+    value = num_bytes / 1024 ** units.index(unit)
+    return f"{value:.1f}{unit}" if unit != 'B' else f"{num_bytes}B"
+
+def read_meminfo():
+    """/proc/meminfo as a dict of bytes."""
+    meminfo = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            name, value = line.split(':', 1)
+            fields = value.split()
+            meminfo[name] = int(fields[0]) * (1024 if len(fields) > 1 else 1)
+    return meminfo
+
+def read_cpu_times():
+    """Aggregate cpu jiffies from the first line of /proc/stat."""
+    with open('/proc/stat') as f:
+        fields = f.readline().split()[1:len(CPU_FIELDS) + 1]
+    return dict(zip(CPU_FIELDS, (int(field) for field in fields)))
+
+def read_net_dev():
+    """Per interface (rx_bytes, tx_bytes) counters from /proc/net/dev."""
+    counters = {}
+    with open('/proc/net/dev') as f:
+        for line in f.readlines()[2:]:
+            name, values = line.split(':', 1)
+            fields = values.split()
+            counters[name.strip()] = (int(fields[0]), int(fields[8]))
+    return counters
+
+def htop_bytes(num_bytes):
+    """Format bytes like htop's meters, e.g. 1.23G, 512M, 0K."""
+    for unit, size in (('G', 1024 ** 3), ('M', 1024 ** 2)):
+        if num_bytes >= size:
+            return f"{num_bytes / size:.2f}{unit}"
+    return f"{num_bytes // 1024}K"
+
+def read_tasks():
+    """Counts like htop's Tasks line: user processes, their extra threads, and kernel threads.
+
+    Kernel threads are kthreadd (pid 2) and its children, from the parent pid in /proc/<pid>/stat.
+    """
+    tasks = threads = kernel_threads = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name in parentheses may hold spaces, the fields after it start with the state
+        fields = stat.rsplit(')', 1)[1].split()
+        if entry == '2' or fields[1] == '2':
+            kernel_threads += 1
+        else:
+            tasks += 1
+            threads += int(fields[17]) - 1
+    return tasks, threads, kernel_threads
+
+def read_loadavg():
+    """Load averages and running/total task counts from /proc/loadavg."""
+    with open('/proc/loadavg') as f:
+        load_1, load_5, load_15, tasks, _ = f.read().split()
+    running, total = tasks.split('/')
+    return {
+        "load_avg_1": float(load_1),
+        "load_avg_5": float(load_5),
+        "load_avg_15": float(load_15),
+        "tasks_running": int(running),
+        "tasks_total": int(total)
+    }
+
+def read_uptime():
+    with open('/proc/uptime') as f:
+        return float(f.read().split()[0])
+
+def disk_usage():
+    """Usage of each mounted block device, like `df -h`, from /proc/mounts and os.statvfs."""
+    disks = []
+    seen = set()
+    with open('/proc/mounts') as f:
+        mounts = [line.split()[:2] for line in f]
+    for device, mount_point in mounts:
+        if not device.startswith('/dev/') or device in seen:
+            continue
+        seen.add(device)
+        try:
+            stat = os.statvfs(mount_point.replace('\\040', ' '))
+        except OSError:
+            continue
+        size = stat.f_blocks * stat.f_frsize
+        avail = stat.f_bavail * stat.f_frsize
+        used = size - stat.f_bfree * stat.f_frsize
+        # df rounds use% up, relative to the space available to unprivileged users
+        usable = used + avail
+        disks.append({
+            "filesystem": device,
+            "mounted_on": mount_point,
+            "size": human_bytes(size),
+            "used": human_bytes(used),
+            "avail": human_bytes(avail),
+            "use%": f"{-(-used * 100 // usable) if usable else 0}%",
+            "size_bytes": size,
+            "used_bytes": used,
+            "avail_bytes": avail
+        })
+    return disks
+
+def interface_addresses(interfaces):
+    """IPv4 addresses by ioctl and IPv6 addresses from /proc/net/if_inet6, without running `ip addr`."""
+    addresses = {name: [] for name in interfaces}
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for name in interfaces:
+            request = struct.pack('256s', name.encode()[:15])
+            try:
+                address = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24])
+                netmask = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, request)[20:24])
+            except OSError:
+                continue
+            prefix = ipaddress.IPv4Network(f"0.0.0.0/{netmask}").prefixlen
+            addresses[name].append(f"inet {address}/{prefix}")
+    try:
+        with open('/proc/net/if_inet6') as f:
+            for line in f:
+                hex_address, _, prefix, _, _, name = line.split()
+                if name in addresses:
+                    address = ipaddress.IPv6Address(bytes.fromhex(hex_address))
+                    addresses[name].append(f"inet6 {address}/{int(prefix, 16)}")
+    except FileNotFoundError:
+        pass
+    return addresses
+
+def read_process_memory(pid='self'):
+    """Memory of a process from /proc/<pid>/smaps_rollup, in bytes.
+
+    rss counts every resident page, pss splits each shared page between the processes mapping it,
+    so the pss of a gunicorn master and its workers adds up to their real footprint.
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            parts = value.split()
+            if len(parts) == 2 and parts[1] == 'kB':
+                fields[name] = int(parts[0]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "swap": fields.get("Swap", 0)
+    }
+
+def child_pids(pid):
+    """Pids whose parent is pid, from /proc/<pid>/stat."""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name in parentheses may hold spaces, the state and parent pid follow it
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+class HealthSampler:
+    """Samples CPU and network counters in the background into a ring buffer of recent history.
+
+    Requests read current values directly from /proc and compute rates from the buffered
+    samples, so a health check forks nothing and never waits for a measurement interval.
+    """
+    # a singleton instance per process, started on first use
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, interval=None, history=None, window=None):
+        self.interval = interval or app.config['HEALTH_SAMPLE_INTERVAL']
+        self.window = window or app.config['HEALTH_RATE_WINDOW']
+        self.samples = deque(maxlen=history or app.config['HEALTH_HISTORY'])
+        self.thread = None
+
+    @classmethod
+    def get_instance(cls):
+        """Gets, and conditionally creates, the sampler and starts its thread."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def sample(self):
+        """Take one sample of the cumulative counters and append it to the ring buffer."""
+        sample = {
+            "time": time.monotonic(),
+            "cpu": read_cpu_times(),
+            "net": read_net_dev()
+        }
+        self.samples.append(sample)
+        return sample
+
+    def _sample_loop(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"⚠️ Health sample failed: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        if self.thread is None:
+            self.sample()
+            self.thread = threading.Thread(target=self._sample_loop, name="health-sampler", daemon=True)
+            self.thread.start()
+
+    @staticmethod
+    def _rates(older, newer):
+        """CPU percentages and network throughput between two samples."""
+        deltas = {field: newer["cpu"][field] - older["cpu"].get(field, 0) for field in newer["cpu"]}
+        total = sum(deltas.values()) or 1
+        cpu = {field: round(delta * 100 / total, 1) for field, delta in deltas.items()}
+        cpu["used"] = round(100 - cpu["idle"] - cpu.get("iowait", 0), 1)
+
+        elapsed = newer["time"] - older["time"]
+        network = {}
+        for name, (rx, tx) in newer["net"].items():
+            old_rx, old_tx = older["net"].get(name, (rx, tx))
+            network[name] = {
+                "rx_bytes_per_sec": round((rx - old_rx) / elapsed, 1) if elapsed > 0 else 0.0,
+                "tx_bytes_per_sec": round((tx - old_tx) / elapsed, 1) if elapsed > 0 else 0.0
+            }
+        return cpu, network
+
+    def window_rates(self):
+        """Rates over the last self.window seconds of samples.
+
+        Until two samples exist, CPU is averaged since boot and throughput is reported as zero.
+        """
+        samples = list(self.samples)
+        newer = samples[-1] if samples else self.sample()
+        older = None
+        for candidate in reversed(samples[:-1]):
+            older = candidate
+            if newer["time"] - candidate["time"] >= self.window:
+                break
+        if older is None:
+            older = {"time": newer["time"], "cpu": {}, "net": newer["net"]}
+        return self._rates(older, newer)
+
+    def history(self, limit):
+        """CPU usage and total network throughput for each of the last `limit` sample intervals."""
+        samples = list(self.samples)[-(limit + 1):]
+        points = []
+        for older, newer in zip(samples, samples[1:]):
+            cpu, network = self._rates(older, newer)
+            points.append({
+                "age_sec": round(samples[-1]["time"] - newer["time"], 1),
+                "cpu_used": cpu["used"],
+                "rx_bytes_per_sec": round(sum(net["rx_bytes_per_sec"] for net in network.values()), 1),
+                "tx_bytes_per_sec": round(sum(net["tx_bytes_per_sec"] for net in network.values()), 1)
+            })
+        return points
+
+    def snapshot(self):
+        """Current memory, disk, load and network state, with CPU and throughput rates.
+
+        ram, cpu, disk, network and htop keep the keys and string values of the response parsed
+        from free, top, df, ip addr and htop, the numeric values and rates are in added fields.
+        """
+        meminfo = read_meminfo()
+        total = meminfo["MemTotal"]
+        available = meminfo.get("MemAvailable", meminfo["MemFree"])
+        # all in the unit of the total, so the values can be compared as numbers
+        unit = human_bytes(total)[-2:]
+        cpu, network_rates = self.window_rates()
+        interfaces = sorted(network_rates)
+        addresses = interface_addresses(interfaces)
+        loadavg = read_loadavg()
+        uptime = round(read_uptime())
+        tasks, threads, kernel_threads = read_tasks()
+        swap_total = meminfo.get("SwapTotal", 0)
+        swap_used = swap_total - meminfo.get("SwapFree", 0)
+
+        return {
+            "ram": {
+                "total": human_bytes(total, unit),
+                "used": human_bytes(total - available, unit),
+                "free": human_bytes(meminfo["MemFree"], unit),
+                "available": human_bytes(available, unit),
+                "total_bytes": total,
+                "used_bytes": total - available,
+                "used%": round((total - available) * 100 / total, 1)
+            },
+            # formatted like top's %Cpu(s) line
+            "cpu": {field: f"{cpu[field]:.1f}" for field in ("user", "system", "idle")},
+            "cpu_rates": cpu,
+            "disk": disk_usage(),
+            "network": [{
+                "interface": name,
+                "addresses": [address for address in addresses[name] if address.startswith("inet ")],
+                "addresses6": [address for address in addresses[name] if address.startswith("inet6 ")],
+                **network_rates[name]
+            } for name in interfaces],
+            "htop": {
+                "tasks_total": str(tasks),
+                "tasks_thr": str(threads),
+                "tasks_kthr": str(kernel_threads),
+                "tasks_running": str(loadavg["tasks_running"]),
+                "load_avg_1": f"{loadavg['load_avg_1']:.2f}",
+                "load_avg_5": f"{loadavg['load_avg_5']:.2f}",
+                "load_avg_15": f"{loadavg['load_avg_15']:.2f}",
+                "mem_used": htop_bytes(total - available),
+                "mem_total": htop_bytes(total),
+                "uptime_days": str(uptime // 86400),
+                "uptime_hours": f"{uptime % 86400 // 3600:02d}",
+                "uptime_mins": f"{uptime % 3600 // 60:02d}",
+                "uptime_secs": f"{uptime % 60:02d}",
+                "swap_used": htop_bytes(swap_used),
+                "swap_total": htop_bytes(swap_total)
+            },
+            "system": {
+                **loadavg,
+                "uptime_sec": uptime,
+                "swap_total_bytes": swap_total,
+                "swap_used_bytes": swap_used,
+                "cpu_count": os.cpu_count()
+            },
+            "window_sec": self.window,
+            "samples": len(self.samples)
+        }
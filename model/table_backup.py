@@ -0,0 +1,217 @@
+import os
+import json
+import gzip
+import time
+import base64
+from datetime import datetime, date, time as dt_time
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import inspect, select, types, and_, tuple_, UniqueConstraint
+from __init__ import app, db
+
+# Each table is saved as <name>.jsonl.gz, one row of raw column values per line, listed in manifest.json
+MANIFEST = 'manifest.json'
+
+def _encode(value):
+    """json.dumps fallback for the column types JSON has no literal for."""
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot back up a value of type {type(value).__name__}")
+
+def _decoders(table):
+    """Column name to a function restoring a value written by _encode, for the columns that need one."""
+    decoders = {}
+    for column in table.columns:
+        if isinstance(column.type, types.DateTime):
+            decoders[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, types.Date):
+            decoders[column.name] = date.fromisoformat
+        elif isinstance(column.type, types.Time):
+            decoders[column.name] = dt_time.fromisoformat
+        elif isinstance(column.type, types.LargeBinary):
+            decoders[column.name] = base64.b64decode
+        elif isinstance(column.type, types.Numeric) and column.type.asdecimal:
+            decoders[column.name] = Decimal
+    return decoders
+
+def _existing_tables(engine):
+    """Mapped tables present in the database, parents before the tables referencing them."""
+    names = set(inspect(engine).get_table_names())
+    return [table for table in db.metadata.sorted_tables if table.name in names]
+
+def _backup_table(engine, table, directory, chunk_rows):
+    """Stream one table into a compressed JSONL file with a server side cursor.
+
+    Returns:
+        int: rows written.
+    """
+    path = os.path.join(directory, f"{table.name}.jsonl.gz")
+    temp_path = f"{path}.tmp"
+    rows = 0
+    with engine.connect() as conn, gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(select(table))
+        columns = list(result.keys())
+        for partition in result.partitions():
+            f.write(''.join(json.dumps(dict(zip(columns, row)), default=_encode) + '\n' for row in partition))
+            rows += len(partition)
+    os.replace(temp_path, path)
+    return rows
+
+def backup_tables(directory=None, workers=None, chunk_rows=None):
+    """
+    Back up every mapped table, several tables at a time, without holding a table in memory.
+
+    Args:
+        directory (str, optional): destination, BACKUP_DIR by default.
+        workers (int, optional): tables written in parallel, BACKUP_WORKERS by default.
+        chunk_rows (int, optional): rows fetched per round trip, BACKUP_CHUNK_ROWS by default.
+
+    Returns:
+        dict: the manifest, table name to row count.
+    """
+    directory = directory or app.config['BACKUP_DIR']
+    workers = workers or app.config['BACKUP_WORKERS']
+    chunk_rows = chunk_rows or app.config['BACKUP_CHUNK_ROWS']
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    with app.app_context():
+        engine = db.engine
+        tables = _existing_tables(engine)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {table.name: executor.submit(_backup_table, engine, table, directory, chunk_rows) for table in tables}
+            counts = {name: future.result() for name, future in futures.items()}
+
+    manifest = {
+        'created': datetime.utcnow().isoformat(),
+        'database': engine.dialect.name,
+        'tables': counts
+    }
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Backed up {sum(counts.values())} rows from {len(counts)} tables to {directory} in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+def _unique_keys(table):
+    """Column name tuples of the table's unique constraints and unique indexes, besides the primary key."""
+    primary_keys = tuple(column.name for column in table.primary_key.columns)
+    keys = [tuple(column.name for column in constraint.columns)
+            for constraint in table.constraints if isinstance(constraint, UniqueConstraint)]
+    keys += [tuple(column.name for column in index.columns) for index in table.indexes if index.unique]
+    keys += [(column.name,) for column in table.columns if column.unique]
+    return [key for key in dict.fromkeys(keys) if key and key != primary_keys]
+
+def _delete_conflicts(conn, table, rows):
+    """
+    Delete stored rows holding a unique value of rows under a different primary key.
+
+    A database seeded before the restore, e.g. by db_init, has its own ids for the same users,
+    sections and so on. The backup's rows and the foreign keys pointing at them win.
+    """
+    primary_keys = [column.name for column in table.primary_key.columns]
+    if len(primary_keys) == 1:
+        other_row = table.c[primary_keys[0]].notin_([row[primary_keys[0]] for row in rows])
+    else:
+        other_row = tuple_(*[table.c[name] for name in primary_keys]).notin_(
+            [tuple(row[name] for name in primary_keys) for row in rows])
+    for key in _unique_keys(table):
+        # NULLs never conflict
+        values = [value for value in {tuple(row.get(name) for name in key) for row in rows} if None not in value]
+        if not values:
+            continue
+        if len(key) == 1:
+            matches = table.c[key[0]].in_([value[0] for value in values])
+        else:
+            matches = tuple_(*[table.c[name] for name in key]).in_(values)
+        conn.execute(table.delete().where(matches, other_row))
+
+def _upsert_rows(conn, table, rows, primary_keys):
+    """Update each row by primary key, inserting it when no row matched, for dialects without an upsert."""
+    for row in rows:
+        match = and_(*[table.c[name] == row[name] for name in primary_keys])
+        values = {name: value for name, value in row.items() if name not in primary_keys}
+        if values:
+            found = conn.execute(table.update().where(match).values(**values)).rowcount
+        else:
+            found = conn.execute(select(table.c[primary_keys[0]]).where(match)).first() is not None
+        if not found:
+            conn.execute(table.insert(), row)
+
+def _upsert(conn, table, rows):
+    """Insert rows, updating those whose primary key already exists, in one statement where the dialect allows."""
+    dialect = conn.dialect.name
+    primary_keys = [column.name for column in table.primary_key.columns]
+    if not primary_keys:
+        conn.execute(table.insert(), rows)
+        return
+    _delete_conflicts(conn, table, rows)
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        updates = {column.name: statement.excluded[column.name] for column in table.columns if column.name not in primary_keys}
+        statement = statement.on_conflict_do_update(index_elements=primary_keys, set_=updates) if updates \
+            else statement.on_conflict_do_nothing(index_elements=primary_keys)
+    elif dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        updates = {column.name: statement.inserted[column.name] for column in table.columns if column.name not in primary_keys}
+        statement = statement.on_duplicate_key_update(**updates) if updates else statement.prefix_with('IGNORE')
+    else:
+        _upsert_rows(conn, table, rows, primary_keys)
+        return
+    conn.execute(statement, rows)
+
+def restore_tables(directory=None, batch_rows=None):
+    """
+    Restore a backup_tables directory with bulk upserts, one transaction per table.
+
+    Tables are restored parents first, so foreign keys resolve. Rows are matched by primary key,
+    stored rows sharing another unique value with a restored row (users._uid) are replaced by it.
+
+    Args:
+        directory (str, optional): backup location, BACKUP_DIR by default.
+        batch_rows (int, optional): rows per upsert statement, BACKUP_CHUNK_ROWS by default.
+
+    Returns:
+        dict: table name to rows restored.
+    """
+    directory = directory or app.config['BACKUP_DIR']
+    batch_rows = batch_rows or app.config['BACKUP_CHUNK_ROWS']
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    start = time.perf_counter()
+    counts = {}
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        for table in db.metadata.sorted_tables:
+            if table.name not in manifest['tables']:
+                continue
+            decoders = _decoders(table)
+            columns = {column.name for column in table.columns}
+            counts[table.name] = 0
+            path = os.path.join(directory, f"{table.name}.jsonl.gz")
+            # a table is restored completely or not at all
+            with engine.begin() as conn, gzip.open(path, 'rt', encoding='utf-8') as f:
+                batch = []
+                for line in f:
+                    row = {name: value for name, value in json.loads(line).items() if name in columns}
+                    for name, decode in decoders.items():
+                        if row.get(name) is not None:
+                            row[name] = decode(row[name])
+                    batch.append(row)
+                    if len(batch) >= batch_rows:
+                        _upsert(conn, table, batch)
+                        counts[table.name] += len(batch)
+                        batch = []
+                if batch:
+                    _upsert(conn, table, batch)
+                    counts[table.name] += len(batch)
+    print(f"Restored {sum(counts.values())} rows into {len(counts)} tables in {time.perf_counter() - start:.1f}s")
+    return counts
@@ -1,48 +1,364 @@
 import os
+import re
+import json
+import math
+import time
+import hashlib
 import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta
 import requests
-from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from __init__ import app
+
+# Rendered timelapses are cached by content, so identical requests are served from disk
+CACHE_DIR = os.path.join(app.instance_path, 'timelapse_cache')
+CACHE_MAX_BYTES = app.config['TIMELAPSE_CACHE_BYTES']
+DOWNLOAD_WORKERS = app.config['TIMELAPSE_DOWNLOAD_WORKERS']
+RENDER_WORKERS = app.config['TIMELAPSE_RENDER_WORKERS']
+# a job still marked running after this long belonged to a worker that died
+JOB_TIMEOUT = 30 * 60
+
+MIN_CLIP_BYTES = 50 * 1024
+
+# video_crawler.py archives one clip per minute here, named by its minute timestamp
+ARCHIVE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'videos'))
+ARCHIVE_URL = "https://www.bordertraffic.com/videoclips/free_california-baja_sanysidro-tijuana_passengerlines_0_255_"
+TIME_CODE = "%Y_%m_%d_%H_%M"
+# longest start/end range a timelapse may cover, one clip per minute
+MAX_RANGE = timedelta(hours=24)
+
+def _ffmpeg():
+    """Path of the ffmpeg binary MoviePy uses, falling back to the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+def _stream_signature(path):
+    """The video stream description (codec, pixel format, size) of a clip, or None if unreadable.
+
+    Clips with equal signatures can be joined with stream copy instead of a re-encode.
+    """
+    try:
+        result = subprocess.run([_ffmpeg(), "-hide_banner", "-i", path], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r"Stream #\d+:\d+.*?: Video: ([^,]+), ([^,(]+)[^,]*, (\d+x\d+)", result.stderr)
+    return match.groups() if match else None
+
+def _session():
+    """A keep-alive session sized for the concurrent downloads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
 
 class TimelapseModel:
+    _session = None
+    _executor = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def generate(video_urls, speed=2.5):
-        temp_dir = tempfile.mkdtemp()
-        clips = []
+    def check_speed(speed):
+        """The speed factor as a float.
+
+        Raises:
+            ValueError: unless speed is a finite number greater than 0.
+        """
+        try:
+            speed = float(speed)
+        except (TypeError, ValueError):
+            raise ValueError("speed must be a number")
+        if not math.isfinite(speed) or speed <= 0:
+            raise ValueError("speed must be greater than 0")
+        return speed
+
+    @staticmethod
+    def cache_key(video_urls, speed=2.5):
+        """Content address of a render, identical clip lists and speeds share one output."""
+        payload = json.dumps({"videos": list(video_urls), "speed": TimelapseModel.check_speed(speed)}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def output_path(key):
+        return os.path.join(CACHE_DIR, f"{key}.mp4")
+
+    @staticmethod
+    def _status_path(key):
+        return os.path.join(CACHE_DIR, f"{key}.json")
+
+    @classmethod
+    def _get_session(cls):
+        with cls._lock:
+            if cls._session is None:
+                cls._session = _session()
+            return cls._session
+
+    @classmethod
+    def _download(cls, url, path):
+        """Download one clip, returning its path or None if it is missing or too small."""
+        try:
+            response = cls._get_session().get(url, stream=True, timeout=30)
+            if response.status_code != 200:
+                print(f"⚠️ Skipped (status {response.status_code}): {url}")
+                return None
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    f.write(chunk)
+            size = os.path.getsize(path)
+            if size < MIN_CLIP_BYTES:
+                print(f"⚠️ Skipped small file ({size} bytes): {path}")
+                return None
+            print(f"✅ Downloaded: {path} ({size} bytes)")
+            return path
+        except Exception as e:
+            print(f"❌ Error loading {url}: {e}")
+            return None
+
+    @classmethod
+    def fetch_clips(cls, video_urls, temp_dir, keep_order=False):
+        """Download all clips concurrently, returning the usable local paths in request order.
+
+        With keep_order, failed downloads are returned as None so results line up with video_urls.
+        """
+        paths = [os.path.join(temp_dir, f"clip_{i}.mp4") for i in range(len(video_urls))]
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            results = list(pool.map(cls._download, video_urls, paths))
+        if keep_order:
+            return results
+        return [path for path in results if path]
+
+    @staticmethod
+    def urls_for_range(start, end):
+        """Clip URLs for every minute from start to end inclusive.
+
+        Args:
+            start (str): first minute as a time code, YYYY_MM_DD_HH_MM.
+            end (str): last minute as a time code.
+
+        Returns:
+            list: the archive URLs, oldest first.
 
-        for i, url in enumerate(video_urls):
-            try:
-                response = requests.get(url, stream=True, headers={
-                    "User-Agent": "Mozilla/5.0"
-                })
-                if response.status_code != 200:
-                    print(f"⚠️ Skipped (status {response.status_code}): {url}")
-                    continue
+        Raises:
+            ValueError: for malformed time codes, end before start, or a range over MAX_RANGE.
+        """
+        start_dt = datetime.strptime(start, TIME_CODE)
+        end_dt = datetime.strptime(end, TIME_CODE)
+        if end_dt < start_dt:
+            raise ValueError("end must not be before start")
+        if end_dt - start_dt > MAX_RANGE:
+            raise ValueError(f"range must not exceed {MAX_RANGE.total_seconds() / 3600:g} hours")
+        minutes = int((end_dt - start_dt).total_seconds() // 60) + 1
+        return [f"{ARCHIVE_URL}{(start_dt + timedelta(minutes=i)).strftime(TIME_CODE)}.mp4" for i in range(minutes)]
 
-                temp_path = os.path.join(temp_dir, f"clip_{i}.mp4")
-                with open(temp_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+    @staticmethod
+    def local_path(url):
+        """The archived copy of a clip URL, or None when the crawler has not saved it."""
+        if not url.startswith(ARCHIVE_URL):
+            return None
+        name = url[len(ARCHIVE_URL):]
+        if not re.fullmatch(r"\d{4}(_\d{2}){4}\.mp4", name):
+            return None
+        path = os.path.join(ARCHIVE_DIR, name)
+        if os.path.exists(path) and os.path.getsize(path) >= MIN_CLIP_BYTES:
+            return path
+        return None
+
+    @classmethod
+    def resolve_clips(cls, video_urls, temp_dir):
+        """Local paths for all clips, reading the archive first and downloading only the missing ones.
 
-                size = os.path.getsize(temp_path)
-                if size < 50 * 1024:
-                    print(f"⚠️ Skipped small file ({size} bytes): {temp_path}")
-                    continue
+        Returns:
+            list: usable clip paths in request order.
+        """
+        paths = [cls.local_path(url) for url in video_urls]
+        missing = [i for i, path in enumerate(paths) if path is None]
+        if missing:
+            print(f"📦 {len(video_urls) - len(missing)} clips from archive, fetching {len(missing)}")
+            fetched = cls.fetch_clips([video_urls[i] for i in missing], temp_dir, keep_order=True)
+            for i, path in zip(missing, fetched):
+                paths[i] = path
+        return [path for path in paths if path]
 
-                print(f"✅ Downloaded: {temp_path} ({size} bytes)")
+    @staticmethod
+    def concat_copy(clip_paths, output_path, speed=2.5):
+        """Join same-codec clips and speed them up without decoding.
 
-                # ✅ Speed up the clip
-                clip = VideoFileClip(temp_path).fx(vfx.speedx, speed)
-                clips.append(clip)
+        The concat demuxer copies the packets and -itsscale rescales their timestamps, so the
+        work is proportional to file size rather than to frames decoded and encoded.
 
-            except Exception as e:
-                print(f"❌ Error loading {url}: {e}")
-                continue
+        Returns:
+            bool: True on success, False when the clips differ or ffmpeg fails.
+
+        Raises:
+            ValueError: when speed is not greater than 0.
+        """
+        speed = TimelapseModel.check_speed(speed)
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            signatures = set(pool.map(_stream_signature, clip_paths))
+        if len(signatures) != 1 or None in signatures:
+            return False
+        list_path = output_path + ".txt"
+        with open(list_path, "w") as f:
+            for path in clip_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        command = [
+            _ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+            "-itsscale", str(1 / speed),
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-map", "0:v", "-c", "copy", "-an", "-movflags", "+faststart",
+            output_path
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=600)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️ Stream copy failed, re-encoding: {e}")
+            return False
+        finally:
+            os.remove(list_path)
+        if result.returncode != 0 or not os.path.exists(output_path):
+            print(f"⚠️ Stream copy failed, re-encoding: {result.stderr.strip()[-500:]}")
+            return False
+        return True
+
+    @staticmethod
+    def render(clip_paths, output_path, speed=2.5):
+        """Speed up and concatenate local clips into output_path."""
+        from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
+
+        clips = []
+        try:
+            for path in clip_paths:
+                try:
+                    # ✅ Speed up the clip
+                    clips.append(VideoFileClip(path).fx(vfx.speedx, speed))
+                except Exception as e:
+                    print(f"❌ Error loading {path}: {e}")
+            if not clips:
+                raise ValueError("No valid clips found to generate timelapse.")
+            final = concatenate_videoclips(clips, method="compose")
+            final.write_videofile(output_path, codec="libx264", audio=False)
+        finally:
+            for clip in clips:
+                clip.close()
 
-        if not clips:
-            raise ValueError("No valid clips found to generate timelapse.")
+    @classmethod
+    def generate(cls, video_urls, speed=2.5):
+        """Render a timelapse, or return the cached render of the same clips and speed.
 
-        final = concatenate_videoclips(clips, method="compose")
-        output_path = os.path.join(temp_dir, "timelapse.mp4")
-        final.write_videofile(output_path, codec="libx264", audio=False)
+        Returns:
+            str: path of the rendered mp4 in the cache directory.
+        """
+        key = cls.cache_key(video_urls, speed)
+        output_path = cls.output_path(key)
+        if os.path.exists(output_path):
+            # mark as recently used for LRU eviction
+            os.utime(output_path)
+            return output_path
 
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=CACHE_DIR) as temp_dir:
+            clip_paths = cls.resolve_clips(video_urls, temp_dir)
+            if not clip_paths:
+                raise ValueError("No valid clips found to generate timelapse.")
+            partial_path = os.path.join(temp_dir, "timelapse.mp4")
+            if not cls.concat_copy(clip_paths, partial_path, speed):
+                cls.render(clip_paths, partial_path, speed)
+            # publish atomically so readers never see a half written file
+            os.replace(partial_path, output_path)
+        cls.evict()
         return output_path
+
+    @staticmethod
+    def evict(max_bytes=None):
+        """Delete least recently used renders until the cache fits in max_bytes."""
+        max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        if not os.path.isdir(CACHE_DIR):
+            return
+        entries = []
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith(".mp4"):
+                stat = os.stat(os.path.join(CACHE_DIR, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= max_bytes:
+                break
+            key = name[:-len(".mp4")]
+            for path in (TimelapseModel.output_path(key), TimelapseModel._status_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    # Job queue: job state lives next to the cached output, keyed by the cache key, so any web
+    # worker can answer a poll for a job submitted to another worker.
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS)
+            return cls._executor
+
+    @classmethod
+    def _write_status(cls, key, status, error=None):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = cls._status_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"status": status, "error": error, "updated": time.time()}, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def status(cls, key):
+        """Get the state of a job.
+
+        Returns:
+            dict: status is one of done, queued, running, failed or unknown.
+        """
+        # job ids are sha256 hex digests, anything else could escape the cache directory
+        if not re.fullmatch(r"[0-9a-f]{64}", key):
+            return {"job_id": key, "status": "unknown"}
+        if os.path.exists(cls.output_path(key)):
+            return {"job_id": key, "status": "done"}
+        try:
+            with open(cls._status_path(key)) as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"job_id": key, "status": "unknown"}
+        if state["status"] in ("queued", "running") and time.time() - state["updated"] > JOB_TIMEOUT:
+            return {"job_id": key, "status": "failed", "error": "Job timed out"}
+        return {"job_id": key, "status": state["status"], "error": state.get("error")}
+
+    @classmethod
+    def _run_job(cls, key, video_urls, speed):
+        cls._write_status(key, "running")
+        try:
+            cls.generate(video_urls, speed)
+            os.remove(cls._status_path(key))
+        except Exception as e:
+            cls._write_status(key, "failed", str(e))
+
+    @classmethod
+    def submit(cls, video_urls, speed=2.5):
+        """Queue a render in the background, reusing the cached output or an in-flight job.
+
+        Returns:
+            dict: the job status, including job_id used to poll and fetch the result.
+        """
+        key = cls.cache_key(video_urls, speed)
+        state = cls.status(key)
+        if state["status"] in ("done", "queued", "running"):
+            return state
+        cls._write_status(key, "queued")
+        cls._get_executor().submit(cls._run_job, key, list(video_urls), speed)
+        return {"job_id": key, "status": "queued"}
@@ -1,20 +1,44 @@
 ## Python Titanic Model, prepared for a titanic.py file
 
 # Import the required libraries for the TitanicModel class
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-import pandas as pd
-import numpy as np
-import seaborn as sns
-
-class TitanicModel:
+# scikit-learn, pandas and numpy are imported inside the methods using them, keeping them out of app startup
+import os
+from model.artifacts import ArtifactModel
+
+# vendored copy of seaborn's titanic dataset, so training works offline
+TITANIC_CSV = 'datasets/titanic.csv'
+
+def load_titanic_data():
+    """Load the titanic dataset from datasets/, saving seaborn's copy there the first time it is missing.
+
+    Raises:
+        FileNotFoundError: when the file is missing and seaborn's copy cannot be downloaded.
+    """
+    import pandas as pd
+    if os.path.exists(TITANIC_CSV):
+        return pd.read_csv(TITANIC_CSV)
+    try:
+        import seaborn as sns
+        data = sns.load_dataset('titanic')
+    except Exception as e:
+        raise FileNotFoundError(f"{TITANIC_CSV} is missing and seaborn's copy could not be downloaded: {e}")
+    # written atomically, so concurrent first loads never read a partial file
+    os.makedirs(os.path.dirname(TITANIC_CSV), exist_ok=True)
+    temp_path = f"{TITANIC_CSV}.{os.getpid()}.tmp"
+    data.to_csv(temp_path, index=False)
+    os.replace(temp_path, TITANIC_CSV)
+    print(f"Saved seaborn's titanic dataset to {TITANIC_CSV}, commit it to vendor it")
+    return data
+
+class TitanicModel(ArtifactModel):
     """A class used to represent the Titanic Model for passenger survival prediction.
     """
     # a singleton instance of TitanicModel, created to train the model only once, while using it for prediction multiple times
     _instance = None
+    # fitted state persisted by `flask custom train_models`, reused while the dataset is unchanged
+    ARTIFACT_NAME = 'titanic'
+    ARTIFACT_FIELDS = ['model', 'dt', 'encoder', 'features']
+    DATASETS = [TITANIC_CSV]
     
     # constructor, used to initialize the TitanicModel
     def __init__(self):
@@ -24,13 +48,24 @@ class TitanicModel:
         # define ML features and target
         self.features = ['pclass', 'sex', 'age', 'sibsp', 'parch', 'fare', 'alone']
         self.target = 'survived'
-        # load the titanic dataset
-        self.titanic_data = sns.load_dataset('titanic')
-        # one-hot encoder used to encode 'embarked' column
+        # the titanic dataset, loaded only when training
+        self.titanic_data = None
+        # one-hot encoder used to encode 'embarked' column, created when training or loaded from the artifact
+        self.encoder = None
+
+    # load, clean and train, used when there is no saved artifact for the current dataset
+    def _build(self):
+        from sklearn.preprocessing import OneHotEncoder
         self.encoder = OneHotEncoder(handle_unknown='ignore')
+        self.titanic_data = load_titanic_data()
+        self._clean()
+        self._train()
+        # the training data is not needed for prediction
+        self.titanic_data = None
 
     # clean the titanic dataset, prepare it for training
     def _clean(self):
+        import pandas as pd
         # Drop unnecessary columns
         self.titanic_data.drop(['alive', 'who', 'adult_male', 'class', 'embark_town', 'deck'], axis=1, inplace=True)
 
@@ -56,6 +91,8 @@ class TitanicModel:
 
     # train the titanic model, using logistic regression as key model, and decision tree to show feature importance
     def _train(self):
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.tree import DecisionTreeClassifier
         # split the data into features and target
         X = self.titanic_data[self.features]
         y = self.titanic_data[self.target]
@@ -72,19 +109,14 @@ class TitanicModel:
         
     @classmethod
     def get_instance(cls):
-        """ Gets, and conditionaly cleans and builds, the singleton instance of the TitanicModel.
+        """ Gets, and conditionaly loads or builds, the singleton instance of the TitanicModel.
         The model is used for analysis on titanic data and predictions on the survival of theoritical passengers.
         
         Returns:
             TitanicModel: the singleton _instance of the TitanicModel, which contains data and methods for prediction.
         """        
-        # check for instance, if it doesn't exist, create it
-        if cls._instance is None:
-            cls._instance = cls()
-            cls._instance._clean()
-            cls._instance._train()
-        # return the instance, to be used for prediction
-        return cls._instance
+        # load the saved artifact, or clean and train if there is none for the current dataset
+        return super().get_instance()
 
     def predict(self, passenger):
         """ Predict the survival probability of a passenger.
@@ -103,6 +135,8 @@ class TitanicModel:
         Returns:
            dictionary : contains die and survive probabilities 
         """
+        import numpy as np
+        import pandas as pd
         # clean the passenger data
         passenger_df = pd.DataFrame(passenger, index=[0])
         passenger_df['sex'] = passenger_df['sex'].apply(lambda x: 1 if x == 'male' else 0)
@@ -117,7 +151,36 @@ class TitanicModel:
         die, survive = np.squeeze(self.model.predict_proba(passenger_df))
         # return the survival probabilities as a dictionary
         return {'die': die, 'survive': survive}
-    
+
+    def predict_batch(self, passengers):
+        """ Predict the survival probability of many passengers at once.
+        The batch is encoded in one pass with the fitted encoder and scored with a single predict_proba call.
+
+        Args:
+            passengers (DataFrame or list): passengers with the same keys as predict, one per row or dict.
+
+        Returns:
+           list : one dictionary of die and survive probabilities per passenger, in input order
+        """
+        import pandas as pd
+        passenger_df = pd.DataFrame(passengers).reset_index(drop=True)
+        X = pd.DataFrame({
+            'pclass': passenger_df['pclass'].astype(int),
+            'sex': (passenger_df['sex'].astype(str).str.lower() == 'male').astype(int),
+            'age': passenger_df['age'].astype(float),
+            'sibsp': passenger_df['sibsp'].astype(int),
+            'parch': passenger_df['parch'].astype(int),
+            'fare': passenger_df['fare'].astype(float),
+            # JSON sends booleans, CSV uploads send text
+            'alone': passenger_df['alone'].astype(str).str.lower().isin(['true', '1', 'yes']).astype(int)
+        })
+        embarked = passenger_df[['embarked']].astype(str).apply(lambda col: col.str.upper())
+        cols = ['embarked_' + str(val) for val in self.encoder.categories_[0]]
+        X[cols] = self.encoder.transform(embarked).toarray()
+
+        probabilities = self.model.predict_proba(X[self.features])
+        return [{'die': die, 'survive': survive} for die, survive in probabilities.tolist()]
+
     def feature_weights(self):
         """Get the feature weights
         The weights represent the relative importance of each feature in the prediction model.
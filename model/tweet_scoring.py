@@ -0,0 +1,133 @@
+import time
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from sqlalchemy import update, func
+from __init__ import app, db
+from model.twitter import BorderTweet, TwitterCursor, TweetSignal
+
+# Tweets are scored by model/tweet_worker.py, here they are read, written back and aggregated
+
+def _unscored_batches(batch_size):
+    """Unscored tweets in id order, batch_size at a time, as (ids, texts, hours) lists."""
+    last_id = 0
+    while True:
+        rows = db.session.query(BorderTweet.id, BorderTweet.text, BorderTweet.created_at) \
+            .filter(BorderTweet.score.is_(None), BorderTweet.id > last_id) \
+            .order_by(BorderTweet.id).limit(batch_size).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield [row.id for row in rows], [row.text or '' for row in rows], {(row.created_at or '')[:13] for row in rows}
+
+def _write_scores(ids, scores):
+    """Write a batch of scores back with one bulk UPDATE by primary key."""
+    db.session.execute(update(BorderTweet), [{'id': id, 'score': float(score)} for id, score in zip(ids, scores)])
+    db.session.commit()
+
+def load_scorer(retrain=False):
+    """
+    The saved tweet scorer, retrained on every stored tweet when asked or once the tweets have doubled.
+
+    Returns:
+        TweetScorer: the scorer, also saved for the pool workers to load.
+    """
+    from model.tweet_worker import TweetScorer
+    scorer = TweetScorer.get_instance()
+    total = db.session.query(func.count(BorderTweet.id)).scalar()
+    if retrain or total >= max(2 * scorer.trained_on, TweetScorer.MIN_LABELED):
+        texts = [text or '' for text, in db.session.query(BorderTweet.text)]
+        scorer = TweetScorer()
+        trained = scorer.fit(texts)
+        print(f"🧠 Tweet scorer {'trained' if trained else 'kept to the lexicon'} on {len(texts)} tweets")
+        scorer.save_artifact()
+        TweetScorer._instance = scorer
+    return scorer
+
+def update_signals(hours):
+    """Recompute the per crossing signal of the given UTC hours from their scored tweets."""
+    hours = sorted(hour for hour in hours if hour)
+    hour = func.substr(BorderTweet.created_at, 1, 13)
+    rows = []
+    # bounded IN lists, a backfill can touch many hours
+    for start in range(0, len(hours), 500):
+        rows += [{'crossing': crossing, 'hour': tweet_hour, 'tweets': tweets, 'score': float(score)}
+                 for crossing, tweet_hour, tweets, score in db.session.query(
+                     TwitterCursor.crossing, hour, func.count(BorderTweet.id), func.avg(BorderTweet.score))
+                 .join(TwitterCursor, TwitterCursor.search == BorderTweet.query)
+                 .filter(BorderTweet.score.isnot(None), hour.in_(hours[start:start + 500]))
+                 .group_by(TwitterCursor.crossing, hour)]
+    TweetSignal.record(rows)
+    return len(rows)
+
+def score_tweets(batch_size=None, workers=None, retrain=False):
+    """
+    Score every unscored tweet and refresh the hourly signals of the hours they were posted in.
+
+    Batches are read by id, scored in a process pool of TWEET_SCORE_WORKERS (in process when 1)
+    and written back as each one finishes, with at most two batches per worker in flight.
+
+    Returns:
+        int: number of tweets scored.
+    """
+    from model.tweet_worker import init_worker, score_batch
+    batch_size = batch_size or app.config['TWEET_SCORE_BATCH']
+    workers = workers or app.config['TWEET_SCORE_WORKERS']
+    with app.app_context():
+        scorer = load_scorer(retrain)
+        start = time.perf_counter()
+        scored = 0
+        hours = set()
+        batches = _unscored_batches(batch_size)
+        if workers <= 1:
+            for ids, texts, batch_hours in batches:
+                _write_scores(ids, scorer.score(texts))
+                scored += len(ids)
+                hours |= batch_hours
+        else:
+            # spawn keeps the workers free of the parent's threads, sockets and db connections
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=init_worker) as pool:
+                pending = set()
+                for ids, texts, batch_hours in batches:
+                    pending.add(pool.submit(score_batch, ids, texts))
+                    hours |= batch_hours
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            ids, scores = future.result()
+                            _write_scores(ids, scores)
+                            scored += len(ids)
+                for future in pending:
+                    ids, scores = future.result()
+                    _write_scores(ids, scores)
+                    scored += len(ids)
+        signals = update_signals(hours)
+        elapsed = time.perf_counter() - start
+        if scored:
+            print(f"✅ Scored {scored} tweets in {elapsed:.2f}s ({scored / elapsed:.0f} tweets/sec), {signals} hourly signals updated")
+        return scored
+
+def tweet_adjustment(crossing, now=None):
+    """
+    Congestion reported in tweets over the last TWEET_SIGNAL_HOURS, as a factor for a wait prediction.
+
+    The factor ranges from 1 - TWEET_SIGNAL_WEIGHT when tweets say the crossing is clear to
+    1 + TWEET_SIGNAL_WEIGHT when they say it is jammed.
+
+    Returns:
+        dict: crossing, tweets, score and factor, or None with fewer than TWEET_SIGNAL_MIN_TWEETS tweets.
+    """
+    now = now or datetime.utcnow()
+    since = (now - timedelta(hours=app.config['TWEET_SIGNAL_HOURS'] - 1)).strftime('%Y-%m-%dT%H')
+    signals = TweetSignal.query.filter(TweetSignal.crossing == crossing, TweetSignal.hour >= since).all()
+    tweets = sum(signal.tweets for signal in signals)
+    if tweets < app.config['TWEET_SIGNAL_MIN_TWEETS']:
+        return None
+    score = sum(signal.score * signal.tweets for signal in signals) / tweets
+    return {
+        "crossing": crossing,
+        "tweets": tweets,
+        "score": round(score, 3),
+        "factor": round(1 + app.config['TWEET_SIGNAL_WEIGHT'] * (2 * score - 1), 3)
+    }
@@ -0,0 +1,120 @@
+import re
+import numpy as np
+from model.artifacts import ArtifactModel
+
+# This module is imported by the scoring pool's worker processes, so it must not import the Flask app
+
+# Phrase weights, positive for a congested crossing, negative for a clear one, English and Spanish
+LEXICON = {
+    'long line': 2.0, 'long lines': 2.0, 'long wait': 2.0, 'backed up': 2.0, 'stuck': 2.0,
+    'packed': 1.5, 'delay': 1.5, 'delays': 1.5, 'closed': 1.5, 'hours': 1.5, 'forever': 1.5,
+    'slow': 1.0, 'traffic': 1.0, 'crowded': 1.0, 'busy': 1.0,
+    'fila larga': 2.0, 'filas largas': 2.0, 'atorado': 2.0, 'horas': 1.5, 'cerrada': 1.5,
+    'lento': 1.0, 'lenta': 1.0, 'tráfico': 1.0, 'trafico': 1.0, 'llena': 1.0,
+    'no line': -2.0, 'no wait': -2.0, 'no traffic': -2.0, 'empty': -2.0, 'smooth': -1.5,
+    'fast': -1.5, 'quick': -1.5, 'moving': -1.0, 'clear': -1.0, 'open': -0.5,
+    'sin fila': -2.0, 'vacía': -2.0, 'vacia': -2.0, 'rápido': -1.5, 'rapido': -1.5,
+    'fluido': -1.5, 'avanza': -1.0, 'abierta': -0.5,
+}
+# longest phrases first, so "no line" wins over "line" style overlaps
+PHRASES = re.compile(r'\b(' + '|'.join(re.escape(phrase) for phrase in sorted(LEXICON, key=len, reverse=True)) + r')\b')
+# a reported wait, e.g. "90 min", "2 hrs", "1 hora"
+WAIT = re.compile(r'\b(\d{1,3})\s*(min|mins|minutes|minutos|h|hr|hrs|hour|hours|hora|horas)\b')
+
+def lexicon_raw(texts):
+    """Summed phrase weights of each text, plus a term for any wait time it reports.
+
+    Returns:
+        np.ndarray: one float per text, 0 when nothing in it is known.
+    """
+    raw = np.zeros(len(texts), dtype=np.float64)
+    for i, text in enumerate(texts):
+        text = (text or '').lower()
+        total = sum(LEXICON[phrase] for phrase in PHRASES.findall(text))
+        for amount, unit in WAIT.findall(text):
+            minutes = int(amount) * (1 if unit.startswith('m') else 60)
+            # an hour or more reads as congested, 20 minutes or less as clear
+            total += 2.0 if minutes >= 60 else -1.5 if minutes <= 20 else 0.5
+        raw[i] = total
+    return raw
+
+class TweetScorer(ArtifactModel):
+    """
+    Congestion score of border tweets, from 0 for a clear crossing to 1 for a jammed one.
+
+    The keyword lexicon scores every tweet. Once trained, a TF-IDF logistic regression adds a
+    second opinion: it learns from the tweets the lexicon is confident about, so it also scores
+    tweets whose words the lexicon does not know. The score is the mean of the two.
+    """
+    _instance = None
+    ARTIFACT_NAME = 'tweet_scorer'
+    ARTIFACT_FIELDS = ['vectorizer', 'model', 'trained_on']
+    # trained from the database, not from files, bump when LEXICON changes
+    DATASETS = []
+    ARTIFACT_VERSION = 1
+    # confident lexicon labels needed before the linear model is trained
+    MIN_LABELED = 50
+
+    def __init__(self):
+        self.vectorizer = None
+        self.model = None
+        self.trained_on = 0
+
+    def _build(self):
+        # no tweets to learn from here, the lexicon scores alone until fit() is run
+        pass
+
+    def fit(self, texts):
+        """
+        Train the linear model on the tweets the lexicon labels with confidence.
+
+        Returns:
+            bool: whether the model was trained, False while there are too few labeled tweets of each kind.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        self.trained_on = len(texts)
+        raw = lexicon_raw(texts)
+        confident = np.abs(raw) >= 1.0
+        labels = raw[confident] > 0
+        if confident.sum() < self.MIN_LABELED or labels.all() or not labels.any():
+            return False
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=2, max_features=50000,
+                                     sublinear_tf=True, strip_accents='unicode')
+        try:
+            X = vectorizer.fit_transform([text for text, keep in zip(texts, confident) if keep])
+        except ValueError:
+            # no term appears in two tweets
+            return False
+        model = LogisticRegression(max_iter=1000, class_weight='balanced')
+        model.fit(X, labels)
+        self.vectorizer, self.model = vectorizer, model
+        return True
+
+    def score(self, texts):
+        """
+        Score a batch of tweet texts in one vectorized pass.
+
+        Returns:
+            np.ndarray: one congestion score in [0, 1] per text.
+        """
+        lexicon = 1.0 / (1.0 + np.exp(-lexicon_raw(texts)))
+        if self.model is None:
+            return lexicon
+        learned = self.model.predict_proba(self.vectorizer.transform(texts))[:, 1]
+        return (lexicon + learned) / 2
+
+# Pool side, each worker process loads the saved scorer once
+_scorer = None
+
+def init_worker():
+    global _scorer
+    _scorer = TweetScorer.load_artifact() or TweetScorer()
+
+def score_batch(ids, texts):
+    """Score one batch in a pool worker.
+
+    Returns:
+        tuple: (ids, list of float scores in the same order)
+    """
+    return ids, _scorer.score(texts).tolist()
@@ -1,3 +1,4 @@
+from datetime import datetime
 from __init__ import db
 
 class BorderTweet(db.Model):
@@ -23,6 +24,152 @@ class BorderTweet(db.Model):
         return f"<BorderTweet {self.tweet_id}>"
 
     def save(self):
-        if not BorderTweet.query.filter_by(tweet_id=self.tweet_id).first():
-            db.session.add(self)
+        """Store the tweet unless its tweet_id is already stored, returns whether it was added."""
+        # the query column shadows Model.query, so the session is queried directly
+        if db.session.query(BorderTweet).filter_by(tweet_id=self.tweet_id).first():
+            return False
+        db.session.add(self)
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def insert_page(rows):
+        """
+        Insert a page of tweets in one statement, skipping tweet_ids already stored.
+
+        A tweet matched by several queries is kept once, with the first query that found it.
+        Databases without an insert-or-ignore statement store the rows one at a time.
+
+        Args:
+            rows (list): dicts with tweet_id, author_id, created_at, query and text.
+
+        Returns:
+            int: number of tweets inserted.
+        """
+        if not rows:
+            return 0
+        table = BorderTweet.__table__
+        dialect = db.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table).on_conflict_do_nothing(index_elements=['tweet_id'])
+        elif dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(table).prefix_with('IGNORE')
+        else:
+            return sum(BorderTweet(**row).save() for row in rows)
+        result = db.session.execute(statement, rows)
+        db.session.commit()
+        # executemany reports the total affected rows, ignored conflicts are not counted
+        return max(result.rowcount, 0)
+
+class TwitterCursor(db.Model):
+    """
+    Ingestion state of one search query, so each run only asks for tweets newer than the last.
+
+    Attributes:
+        search (db.Column): The search query, the primary key, matching BorderTweet.query.
+        crossing (db.Column): Border crossing the query is about, e.g. san_ysidro.
+        since_id (db.Column): Newest tweet id seen for the query, sent as since_id on the next run.
+        pending_id (db.Column): Newest tweet id of a run cut short by TWITTER_MAX_PAGES, since_id once it completes.
+        until_id (db.Column): Oldest tweet id that cut short run reached, the next run resumes below it.
+        last_run (db.Column): UTC time the query last ran.
+        fetched (db.Column): Tweets returned for the query, over all runs.
+    """
+    __tablename__ = "twitter_cursors"
+
+    search = db.Column(db.String(512), primary_key=True)
+    crossing = db.Column(db.String(64), nullable=False)
+    since_id = db.Column(db.String(32), nullable=True)
+    pending_id = db.Column(db.String(32), nullable=True)
+    until_id = db.Column(db.String(32), nullable=True)
+    last_run = db.Column(db.DateTime, nullable=True)
+    fetched = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, search, crossing):
+        self.search = search
+        self.crossing = crossing
+        self.fetched = 0
+
+    def __repr__(self):
+        return f"TwitterCursor(search={self.search}, since_id={self.since_id})"
+
+    @staticmethod
+    def for_search(search, crossing):
+        """The cursor of a query, created the first time the query runs."""
+        cursor = db.session.get(TwitterCursor, search)
+        if cursor is None:
+            cursor = TwitterCursor(search, crossing)
+            db.session.add(cursor)
             db.session.commit()
+        return cursor
+
+    def advance(self, newest_id, fetched):
+        """Record a completed run, since_id only moves forward."""
+        # tweet ids are snowflakes, numerically ordered by time
+        if newest_id and (self.since_id is None or int(newest_id) > int(self.since_id)):
+            self.since_id = newest_id
+        self.pending_id = None
+        self.until_id = None
+        self.fetched += fetched
+        self.last_run = datetime.utcnow()
+        db.session.commit()
+
+    def pause(self, newest_id, oldest_id, fetched):
+        """Record a run cut short with older pages left, since_id stays until they are fetched."""
+        self.pending_id = newest_id
+        self.until_id = oldest_id
+        self.fetched += fetched
+        self.last_run = datetime.utcnow()
+        db.session.commit()
+
+class TweetSignal(db.Model):
+    """
+    Hourly congestion signal of a border crossing, aggregated from scored tweets.
+
+    Attributes:
+        crossing (db.Column): Border crossing, from the TwitterCursor of the tweets' query.
+        hour (db.Column): UTC hour the tweets were posted in, e.g. 2025-05-01T13.
+        tweets (db.Column): Scored tweets posted in the hour.
+        score (db.Column): Mean congestion score of those tweets, 0 clear to 1 jammed.
+    """
+    __tablename__ = "tweet_signals"
+
+    crossing = db.Column(db.String(64), primary_key=True)
+    hour = db.Column(db.String(13), primary_key=True)
+    tweets = db.Column(db.Integer, nullable=False, default=0)
+    score = db.Column(db.Float, nullable=False, default=0.5)
+
+    def __repr__(self):
+        return f"TweetSignal(crossing={self.crossing}, hour={self.hour}, score={self.score})"
+
+    def read(self):
+        return {"crossing": self.crossing, "hour": self.hour, "tweets": self.tweets, "score": self.score}
+
+    @staticmethod
+    def record(rows):
+        """Insert or replace the signal of each (crossing, hour) in rows, in one statement."""
+        if not rows:
+            return
+        table = TweetSignal.__table__
+        dialect = db.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=['crossing', 'hour'],
+                set_={'tweets': statement.excluded.tweets, 'score': statement.excluded.score})
+        elif dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(table)
+            statement = statement.on_duplicate_key_update(tweets=statement.inserted.tweets, score=statement.inserted.score)
+        else:
+            raise NotImplementedError(f"Tweet signals do not support {dialect}")
+        db.session.execute(statement, rows)
+        db.session.commit()
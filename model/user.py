@@ -27,6 +27,45 @@ def default_year():
         current_year += 1
     return current_year 
 
+def password_hash_method(algorithm=None, iterations=None):
+    """
+    Builds the Werkzeug hash method string for the configured password policy.
+
+    The method is expanded the way Werkzeug records it in the stored hash, so it can be compared
+    with a stored prefix: pbkdf2 carries its digest and iteration count (e.g. pbkdf2:sha256:600000),
+    scrypt its n, r and p parameters (e.g. scrypt:32768:8:1).
+
+    Args:
+        algorithm (str, optional): Overrides PASSWORD_HASH_ALGORITHM.
+        iterations (int, optional): Overrides PASSWORD_HASH_ITERATIONS.
+
+    Returns:
+        str: The method string to pass to generate_password_hash.
+    """
+    algorithm = algorithm or app.config["PASSWORD_HASH_ALGORITHM"]
+    iterations = iterations or app.config["PASSWORD_HASH_ITERATIONS"]
+    parts = algorithm.split(":")
+    if parts[0] == "pbkdf2":
+        # Werkzeug's defaults for the parts left out
+        parts += ["sha256", str(iterations)][len(parts) - 1:]
+    elif parts[0] == "scrypt":
+        parts += [str(2 ** 15), "8", "1"][len(parts) - 1:]
+    return ":".join(parts)
+
+def password_needs_rehash(pwhash):
+    """
+    Checks whether a stored hash was made with parameters other than the current policy.
+
+    Args:
+        pwhash (str): The stored password hash, formatted as method$salt$hash.
+
+    Returns:
+        bool: True if the hash should be regenerated with the current policy.
+    """
+    method, _, rest = pwhash.partition("$")
+    salt = rest.partition("$")[0]
+    return method != password_hash_method() or len(salt) != app.config["PASSWORD_SALT_LENGTH"]
+
 """ Database Models """
 
 ''' Tutorial: https://www.sqlalchemy.org/library.html#tutorials, try to get into Python shell and follow along '''
@@ -273,11 +312,15 @@ class User(db.Model, UserMixin):
         """
         if not password or password == "":
             password=app.config["DEFAULT_PASSWORD"]
-        self._password = generate_password_hash(password, "pbkdf2:sha256", salt_length=10)
+        self._password = generate_password_hash(password, password_hash_method(), salt_length=app.config["PASSWORD_SALT_LENGTH"])
 
     def is_password(self, password):
         """
         Checks if the provided password matches the user's stored password.
+
+        On a match, a hash made with an outdated policy is transparently replaced with one
+        using the current algorithm and iterations, as this is the only time the plain
+        password is available.
         
         Args:
             password (str): The password to check.
@@ -285,7 +328,15 @@ class User(db.Model, UserMixin):
         Returns:
             bool: True if the password matches, False otherwise.
         """
-        return check_password_hash(self._password, password)
+        if not check_password_hash(self._password, password):
+            return False
+        if self.id is not None and password_needs_rehash(self._password):
+            self.set_password(password)
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+        return True
 
     def __str__(self):
         """
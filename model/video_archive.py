@@ -0,0 +1,267 @@
+import os
+import re
+import bisect
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+import pytz
+from __init__ import app
+from model.timelapse import TimelapseModel, ARCHIVE_DIR, TIME_CODE
+
+# Hourly condensed clips made from compacted minutes, named YYYY_MM_DD_HH.mp4
+HOURLY_DIR = os.path.join(ARCHIVE_DIR, 'hourly')
+HOUR_CODE = "%Y_%m_%d_%H"
+# the crawler names clips by the camera's local time
+PACIFIC = pytz.timezone("America/Los_Angeles")
+
+MINUTE_FILE = re.compile(r"(\d{4}_\d{2}_\d{2}_\d{2}_\d{2})\.mp4")
+HOUR_FILE = re.compile(r"(\d{4}_\d{2}_\d{2}_\d{2})\.mp4")
+
+class VideoArchive:
+    """A sorted in-memory index of the clips in an archive folder.
+
+    Time codes sort chronologically as strings, so range queries are two bisects on a sorted
+    list. The index is rebuilt only when the folder's modification time changes, which happens
+    when the crawler adds a clip or retention removes one.
+    """
+    # one index per folder, shared by all requests in a process
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, folder, pattern):
+        self.folder = folder
+        self.pattern = pattern
+        self.codes = []
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, folder=ARCHIVE_DIR, pattern=MINUTE_FILE):
+        """Gets, and conditionally creates, the index for an archive folder.
+
+        Returns:
+            VideoArchive: the index for folder, refreshed if the folder changed.
+        """
+        with cls._lock:
+            if folder not in cls._instances:
+                cls._instances[folder] = cls(folder, pattern)
+            instance = cls._instances[folder]
+        instance.refresh()
+        return instance
+
+    def refresh(self):
+        """Rescan the folder if it changed since the last scan."""
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            self.codes, self.mtime = [], None
+            return
+        if mtime == self.mtime:
+            return
+        with self.lock:
+            codes = []
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    match = self.pattern.fullmatch(entry.name)
+                    if match and entry.is_file():
+                        codes.append(match.group(1))
+            codes.sort()
+            self.codes, self.mtime = codes, mtime
+
+    def range(self, start=None, end=None, offset=0, limit=None):
+        """Time codes between start and end inclusive, oldest first.
+
+        Args:
+            start (str, optional): first time code, defaults to the oldest clip.
+            end (str, optional): last time code, defaults to the newest clip.
+            offset (int): number of matching clips to skip.
+            limit (int, optional): maximum number of clips to return.
+
+        Returns:
+            tuple: (list of time codes for the page, total number of matching clips)
+        """
+        codes = self.codes
+        lo = bisect.bisect_left(codes, start) if start else 0
+        # "~" sorts after digits and "_", so a shorter end such as an hour code covers the whole hour
+        hi = bisect.bisect_right(codes, end + "~") if end else len(codes)
+        total = max(hi - lo, 0)
+        lo += offset
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return codes[lo:hi], total
+
+    def path(self, code):
+        return os.path.join(self.folder, f"{code}.mp4")
+
+
+def applyRetention(now=None):
+    """
+    Compacts old minute clips into hourly clips and deletes clips past their retention age.
+
+    - Minutes older than VIDEO_COMPACT_AFTER_HOURS are joined into one sped up clip per hour.
+    - Minute clips older than VIDEO_RAW_RETENTION_DAYS are deleted, once their hour is compacted.
+    - Hourly clips older than VIDEO_HOURLY_RETENTION_DAYS are deleted.
+
+    Ages are measured in Pacific time, which the clips are named in.
+
+    Args:
+        now (datetime, optional): the current time, naive values are taken as Pacific time.
+    """
+    now = now or datetime.now(PACIFIC)
+    if now.tzinfo is None:
+        now = PACIFIC.localize(now)
+
+    def code_before(delta, code_format):
+        # normalize moves the offset across a DST change, so the time code is the wall clock then
+        return PACIFIC.normalize(now.astimezone(PACIFIC) - delta).strftime(code_format)
+
+    compact_before = code_before(timedelta(hours=app.config['VIDEO_COMPACT_AFTER_HOURS']), TIME_CODE)
+    raw_before = code_before(timedelta(days=app.config['VIDEO_RAW_RETENTION_DAYS']), TIME_CODE)
+    hourly_before = code_before(timedelta(days=app.config['VIDEO_HOURLY_RETENTION_DAYS']), HOUR_CODE)
+    os.makedirs(HOURLY_DIR, exist_ok=True)
+
+    minutes = VideoArchive.get_instance()
+    hours = VideoArchive.get_instance(HOURLY_DIR, HOUR_FILE)
+
+    # Group compactable minutes by hour, skipping hours already condensed
+    by_hour = {}
+    for code in minutes.range(end=compact_before)[0]:
+        by_hour.setdefault(code[:13], []).append(code)
+    compacted = 0
+    for hour, codes in sorted(by_hour.items()):
+        # the hour that contains compact_before may still be filling up
+        if hour == compact_before[:13] or os.path.exists(hours.path(hour)):
+            continue
+        output_path = hours.path(hour)
+        partial_path = output_path + ".part.mp4"
+        clip_paths = [minutes.path(code) for code in codes]
+        try:
+            if not TimelapseModel.concat_copy(clip_paths, partial_path, app.config['VIDEO_COMPACT_SPEED']):
+                TimelapseModel.render(clip_paths, partial_path, app.config['VIDEO_COMPACT_SPEED'])
+            os.replace(partial_path, output_path)
+            compacted += 1
+        except Exception as e:
+            print(f"❌ Could not compact {hour}: {e}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    deleted = 0
+    kept = set()
+    for archive, before in ((minutes, raw_before), (hours, hourly_before)):
+        for code in archive.range(end=before)[0]:
+            # a minute is only dropped once its hour is condensed, or the hour itself has expired
+            if archive is minutes and code[:13] > hourly_before and not os.path.exists(hours.path(code[:13])):
+                kept.add(code[:13])
+                continue
+            try:
+                os.remove(archive.path(code))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    if kept:
+        print(f"⚠️ Kept expired minutes of {len(kept)} hours that are not compacted yet")
+    print(f"Compacted {compacted} hours, deleted {deleted} expired clips")
+
+
+# Upstream clips fetched for /api/timelapse/proxy_video, keyed by a hash of the URL
+PROXY_DIR = os.path.join(app.instance_path, 'video_proxy_cache')
+# a partial download older than this was left by a worker that died, another request takes it over
+STALE_PART_SECONDS = 120
+
+class VideoProxyCache:
+    """A disk cache of upstream clips, so a clip watched by many viewers is fetched once.
+
+    Clips the crawler already archived are served from the archive without any upstream request.
+    On a miss the upstream body is streamed to the viewer while it is written to the cache. The
+    request that creates the clip's .part file is the one caching it, concurrent viewers of the same
+    clip, in any worker, stream from upstream without writing, so nobody waits on a download.
+    """
+
+    @staticmethod
+    def path(url):
+        return os.path.join(PROXY_DIR, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".mp4")
+
+    @classmethod
+    def fetch(cls, url):
+        """The clip at url, from disk when archived or cached, otherwise opened upstream.
+
+        Returns:
+            tuple: (path, None) for a clip on disk, (None, response) for an upstream response to
+            pass to stream(), or (None, None) when upstream does not have the clip.
+        """
+        local = TimelapseModel.local_path(url)
+        if local:
+            return local, None
+        path = cls.path(url)
+        if os.path.exists(path):
+            os.utime(path)
+            return path, None
+        response = TimelapseModel._get_session().get(url, stream=True, timeout=30)
+        if response.status_code != 200:
+            response.close()
+            return None, None
+        return None, response
+
+    @staticmethod
+    def _claim(temp_path):
+        """Open the clip's partial file for writing, or None when another request is downloading it."""
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(temp_path) < STALE_PART_SECONDS:
+                    return None
+                os.remove(temp_path)
+                fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except OSError:
+                return None
+        return os.fdopen(fd, 'wb')
+
+    @classmethod
+    def stream(cls, url, response):
+        """Yield the upstream body of a clip, saving it to the cache once it is complete.
+
+        A viewer that disconnects early leaves nothing in the cache.
+        """
+        os.makedirs(PROXY_DIR, exist_ok=True)
+        path = cls.path(url)
+        temp_path = path + ".part"
+        f = cls._claim(temp_path)
+        complete = False
+        try:
+            for chunk in response.iter_content(chunk_size=65536):
+                if f is not None:
+                    f.write(chunk)
+                yield chunk
+            complete = True
+        finally:
+            response.close()
+            if f is not None:
+                f.close()
+                if complete:
+                    os.replace(temp_path, path)
+                elif os.path.exists(temp_path):
+                    os.remove(temp_path)
+        if f is not None:
+            cls.evict()
+
+    @staticmethod
+    def evict(max_bytes=None):
+        """Delete least recently used clips until the cache fits in VIDEO_PROXY_CACHE_BYTES."""
+        max_bytes = app.config['VIDEO_PROXY_CACHE_BYTES'] if max_bytes is None else max_bytes
+        entries = []
+        with os.scandir(PROXY_DIR) as files:
+            for entry in files:
+                if entry.name.endswith(".mp4"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
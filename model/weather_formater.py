@@ -1,77 +1,219 @@
+import os
+import json
+import time
+import threading
 import requests
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from __init__ import app
+
+# Resolved gridpoint URLs and the last good forecast survive restarts, so startup needs no network
+STATE_FILE = os.path.join(app.instance_path, 'noaa_weather.json')
+# Refresh bounds when NOAA's Expires header is missing, very short, or the fetch failed
+MIN_REFRESH = 5 * 60
+DEFAULT_REFRESH = 30 * 60
+RETRY_REFRESH = 60
+USER_AGENT = "(CrossWise border wait times, weather)"
 
 class NOAAWeatherFetcher:
+    # a singleton instance of NOAAWeatherFetcher, refreshed in the background and read by requests
+    _instance = None
+    _lock = threading.Lock()
+
     def __init__(self, lat=32.7157, lon=-117.1611):
         self.lat = lat
         self.lon = lon
-        self.gridpoint_url = self._get_gridpoint_url()
+        self._gridpoint_url = None
+        self.periods = None
+        self.expires = 0
+        self.fetched = None
+        self.lock = threading.Lock()
+        self.thread = None
+        # aggregated days and the periods list they were computed from
+        self._days = None
+        self._days_source = None
+        self._load_state()
+
+    @classmethod
+    def get_instance(cls):
+        """Gets, and conditionally creates, the shared fetcher and starts its refresh thread."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    @property
+    def _state_key(self):
+        return f"{self.lat},{self.lon}"
+
+    def _load_state(self):
+        try:
+            with open(STATE_FILE) as f:
+                state = json.load(f).get(self._state_key, {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self._gridpoint_url = state.get("gridpoint_url")
+        self.periods = state.get("periods")
+        self.fetched = state.get("fetched")
+        # a persisted forecast is served, but refreshed as soon as possible
+        self.expires = 0
+
+    def _save_state(self):
+        try:
+            with open(STATE_FILE) as f:
+                states = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            states = {}
+        states[self._state_key] = {
+            "gridpoint_url": self._gridpoint_url,
+            "periods": self.periods,
+            "fetched": self.fetched
+        }
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        temp_path = f"{STATE_FILE}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(states, f)
+        os.replace(temp_path, STATE_FILE)
+
+    @property
+    def gridpoint_url(self):
+        """The forecast URL for this location, resolved from /points on first use only."""
+        if self._gridpoint_url is None:
+            self._gridpoint_url = self._get_gridpoint_url()
+            self._save_state()
+        return self._gridpoint_url
 
     def _get_gridpoint_url(self):
         url = f"https://api.weather.gov/points/{self.lat},{self.lon}"
-        resp = requests.get(url, timeout=10)
+        resp = requests.get(url, timeout=10, headers={"User-Agent": USER_AGENT})
         resp.raise_for_status()
         return resp.json()["properties"]["forecast"]
 
-    def get_weekly_forecast(self):
-        resp = requests.get(self.gridpoint_url, timeout=10)
+    def _expires_at(self, resp):
+        """When the forecast should be refetched, honoring NOAA's Expires header."""
+        now = time.time()
+        try:
+            expires = parsedate_to_datetime(resp.headers["Expires"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            expires = now + DEFAULT_REFRESH
+        return max(expires, now + MIN_REFRESH)
+
+    def refresh(self):
+        """Fetch the forecast from NOAA into the cache.
+
+        Raises:
+            requests.RequestException: NOAA could not be reached, the cache is left unchanged.
+        """
+        resp = requests.get(self.gridpoint_url, timeout=10, headers={"User-Agent": USER_AGENT})
         resp.raise_for_status()
-        raw_periods = resp.json()["properties"]["periods"]
+        periods = resp.json()["properties"]["periods"]
+        with self.lock:
+            self.periods = periods
+            self.expires = self._expires_at(resp)
+            self.fetched = datetime.utcnow().isoformat()
+        self._save_state()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                if time.time() >= self.expires:
+                    self.refresh()
+                delay = max(self.expires - time.time(), MIN_REFRESH)
+            except Exception as e:
+                print(f"⚠️ NOAA forecast refresh failed, serving cached data: {e}")
+                delay = RETRY_REFRESH
+            time.sleep(delay)
 
-        forecast = []
+    def start(self):
+        """Start the background refresh thread, once per process."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._refresh_loop, name="noaa-weather", daemon=True)
+            self.thread.start()
+
+    def get_periods(self):
+        """The cached forecast periods, fetched inline only when nothing has been cached yet.
+
+        Stale periods are returned as is when NOAA is unavailable.
+        """
+        if self.periods is None:
+            self.refresh()
+        return self.periods
+
+    def _aggregate(self, raw_periods):
+        """Group forecast periods into one entry per date in a single pass.
+
+        Returns:
+            dict: entries keyed by ISO date, in forecast order.
+        """
+        days = {}
         for period in raw_periods:
             temp = period.get("temperature")
             is_daytime = period.get("isDaytime", True)
             start_time = period.get("startTime")
-            name = period.get("name")
-            forecast_text = period.get("shortForecast", "N/A")
-            precip = period.get("probabilityOfPrecipitation", {}).get("value", 0) or 0
-
-            # Convert to ISO date
-            date_obj = datetime.fromisoformat(start_time)
-            date_key = date_obj.strftime('%Y-%m-%d')
-
-            # Check if the entry for the date already exists
-            existing = next((f for f in forecast if f["date"] == date_key), None)
-
-            if existing:
-                if is_daytime and temp > existing["high_f"]:
-                    existing["high_f"] = temp
-                if not is_daytime and temp < existing["low_f"]:
-                    existing["low_f"] = temp
-                existing["temps"].append(temp)
-                existing["precip"].append(precip)
-            else:
-                forecast.append({
-                    "name": name,
+            precip = (period.get("probabilityOfPrecipitation") or {}).get("value", 0) or 0
+
+            # startTime is ISO 8601 in local time, so its first 10 characters are the local date
+            date_key = start_time[:10]
+
+            day = days.get(date_key)
+            if day is None:
+                days[date_key] = day = {
+                    "name": period.get("name"),
                     "startTime": start_time,
                     "date": date_key,
-                    "short_forecast": forecast_text,
-                    "high_f": temp if is_daytime else float('-inf'),
-                    "low_f": temp if not is_daytime else float('inf'),
-                    "temps": [temp],
-                    "precip": [precip],
-                    "isDaytime": is_daytime
-                })
+                    "short_forecast": period.get("shortForecast", "N/A"),
+                    "high_f": None,
+                    "low_f": None,
+                    "isDaytime": is_daytime,
+                    "temp_sum": 0,
+                    "precip_sum": 0,
+                    "count": 0
+                }
+            if is_daytime and (day["high_f"] is None or temp > day["high_f"]):
+                day["high_f"] = temp
+            if not is_daytime and (day["low_f"] is None or temp < day["low_f"]):
+                day["low_f"] = temp
+            day["temp_sum"] += temp
+            day["precip_sum"] += precip
+            day["count"] += 1
 
         # Finalize entries
-        for entry in forecast:
-            entry["temperature_f"] = round(sum(entry["temps"]) / len(entry["temps"]))
-            entry["precip_chance"] = round(sum(entry["precip"]) / len(entry["precip"]))
-            if entry["low_f"] == float('inf'):
-                entry["low_f"] = entry["temperature_f"]
-            if entry["high_f"] == float('-inf'):
-                entry["high_f"] = entry["temperature_f"]
-            del entry["temps"]
-            del entry["precip"]
-
-        return forecast
+        for day in days.values():
+            count = day.pop("count")
+            day["temperature_f"] = round(day.pop("temp_sum") / count)
+            day["precip_chance"] = round(day.pop("precip_sum") / count)
+            if day["low_f"] is None:
+                day["low_f"] = day["temperature_f"]
+            if day["high_f"] is None:
+                day["high_f"] = day["temperature_f"]
+        return days
+
+    def _get_days(self):
+        """The aggregated forecast, recomputed only when a refresh replaced the periods."""
+        periods = self.get_periods()
+        with self.lock:
+            if self._days_source is not periods:
+                self._days = self._aggregate(periods)
+                self._days_source = periods
+            return self._days
+
+    def cached_days(self):
+        """The aggregated forecast keyed by ISO date if one is in memory, without fetching.
+
+        Returns:
+            dict: aggregated days, or None when no forecast has been loaded yet.
+        """
+        if self.periods is None:
+            return None
+        return self._get_days()
+
+    def get_weekly_forecast(self):
+        return list(self._get_days().values())
 
     def get_current_forecast(self):
-        periods = self.get_weekly_forecast()
-        now = datetime.utcnow().date()
-        for p in periods:
-            forecast_date = datetime.fromisoformat(p["startTime"]).date()
-            if forecast_date == now:
-                return p
-        return periods[0]
+        days = self._get_days()
+        today = datetime.utcnow().date().isoformat()
+        if today in days:
+            return days[today]
+        return next(iter(days.values()))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+""" border_weather_benchmark.py
+Compares the border wait time predictor with and without weather features.
+
+For each feature set this reports:
+- cross-validated mean absolute error (minutes) of the random forest
+- time to build the feature matrix and train
+- single prediction latency, as served by /api/border/predict
+
+Usage: Run from the terminal as such:
+
+Goto the scripts directory:
+> cd scripts; ./border_weather_benchmark.py
+
+Or run from the root of the project:
+> scripts/border_weather_benchmark.py --folds 5 --predictions 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the directory containing the model package to the Python path, datasets are read relative to it
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+os.chdir(ROOT)
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold, cross_val_score
+from model.border import BorderWaitTimeModel
+
+def benchmark(use_weather, folds, predictions):
+    start = time.perf_counter()
+    model = BorderWaitTimeModel(use_weather=use_weather)
+    model._build()
+    build_time = time.perf_counter() - start
+
+    X, y = model.pipeline.build_matrix()
+    scores = cross_val_score(
+        RandomForestRegressor(random_state=42, n_estimators=100), X, y,
+        cv=KFold(n_splits=folds, shuffle=True, random_state=42),
+        scoring='neg_mean_absolute_error'
+    )
+
+    # forecast_days={} keeps the benchmark offline, climatology is used for every row
+    inputs = [{'bwt_day': i % 7, 'time_slot': i % 24, 'month': 'january'} for i in range(predictions)]
+    start = time.perf_counter()
+    for input_data in inputs:
+        model.predict(input_data, forecast_days={})
+    latency = (time.perf_counter() - start) / predictions
+
+    return -scores.mean(), scores.std(), build_time, latency
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark weather features for border wait predictions.')
+    parser.add_argument('--folds', type=int, default=5, help='Cross validation folds')
+    parser.add_argument('--predictions', type=int, default=200, help='Single predictions timed per model')
+    args = parser.parse_args()
+
+    print(f"{'features':<12}{'MAE (min)':>12}{'± std':>8}{'build (s)':>12}{'predict (ms)':>14}")
+    for use_weather in (False, True):
+        mae, std, build_time, latency = benchmark(use_weather, args.folds, args.predictions)
+        label = 'weather' if use_weather else 'baseline'
+        print(f"{label:<12}{mae:>12.2f}{std:>8.2f}{build_time:>12.2f}{latency * 1000:>14.2f}")
+
+if __name__ == "__main__":
+    main()
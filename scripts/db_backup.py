@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 """ db_backup.py
-Backs up the current database and saves the data to JSON files.
+Backs up the current database, streaming each table to a compressed JSONL file in backup/
 
 Usage: Run from the terminal as such:
 
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 """ db_restore.py
-Restores the database from JSON files.
+Restores the database from the backup/ directory, with bulk upserts (older JSON backups are still read).
 
 Usage: Run from the terminal as such:
 
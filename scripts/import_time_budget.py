@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+""" import_time_budget.py
+Fails when the cold start of the app regresses.
+
+Runs `python -X importtime -c "import main"` from the root of the project, which is the import
+a gunicorn worker and every `flask custom` command pays, and reports the slowest modules. The
+check fails if the total import time is over budget, or if a heavy library (scikit-learn, pandas,
+plotly, the Google client, ...) is imported at startup instead of on first use.
+
+Usage: Run from the terminal as such:
+
+Goto the scripts directory:
+> cd scripts; ./import_time_budget.py
+
+Or run from the root of the project, with a custom budget and number of runs:
+> scripts/import_time_budget.py --budget-ms 1500 --runs 5 --top 25
+
+Exits 1 when the budget is exceeded, so it can run in CI before deploying.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# libraries only used by some endpoints, each must stay out of `import main`
+FORBIDDEN = [
+    'sklearn',
+    'pandas',
+    'scipy',
+    'joblib',
+    'plotly',
+    'seaborn',
+    'moviepy',
+    'face_recognition',
+    'dlib',
+    'googleapiclient',
+    'google.oauth2',
+]
+
+def import_times(root, python=sys.executable):
+    """Import main once in a fresh interpreter.
+
+    Returns:
+        dict: cumulative import time in microseconds of every imported module
+    """
+    result = subprocess.run([python, '-X', 'importtime', '-c', 'import main'],
+                            cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(f"❌ import main failed with exit code {result.returncode}")
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        times[module] = max(times.get(module, 0), int(cumulative))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the import time of the app against a budget.')
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('IMPORT_BUDGET_MS', 2000)),
+                        help='maximum import time of main in milliseconds')
+    parser.add_argument('--runs', type=int, default=3, help='imports to run, the fastest one is reported')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest modules to list')
+    args = parser.parse_args()
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    # the fastest run is the least disturbed by the page cache and other processes
+    times = min((import_times(root) for _ in range(max(1, args.runs))), key=lambda t: t.get('main', 0))
+    total_ms = times.get('main', 0) / 1000
+
+    # top level packages only, their cumulative time includes their submodules
+    packages = {module: us for module, us in times.items() if '.' not in module and module != 'main'}
+    print(f"Slowest imports of main ({len(times)} modules):")
+    for module, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{us / 1000:>10.1f} ms  {module}")
+
+    failed = False
+    heavy = sorted(module for module in times
+                   if any(module == name or module.startswith(name + '.') for name in FORBIDDEN))
+    if heavy:
+        roots = sorted({name for name in FORBIDDEN for module in heavy if module == name or module.startswith(name + '.')})
+        print(f"❌ Heavy libraries imported at startup: {', '.join(roots)}, import them where they are used")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"❌ import main took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"✅ import main took {total_ms:.1f} ms, within the {args.budget_ms:.0f} ms budget")
+
+if __name__ == "__main__":
+    main()
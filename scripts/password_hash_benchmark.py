@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+""" password_hash_benchmark.py
+Measures password hashing throughput for candidate hashing policies.
+
+Each candidate is timed in a single process to report hashes/sec per core, which bounds both
+login throughput (one hash per login) and bulk seeding time (one hash per user). The per-core
+rate times the number of gunicorn workers is the ceiling on logins per second.
+
+Usage: Run from the terminal as such:
+
+Goto the scripts directory:
+> cd scripts; ./password_hash_benchmark.py
+
+Or run from the root of the project, with custom candidates and sample count:
+> scripts/password_hash_benchmark.py --methods pbkdf2:sha256:260000 pbkdf2:sha256:600000 --samples 20
+
+Set the chosen policy with PASSWORD_HASH_ALGORITHM and PASSWORD_HASH_ITERATIONS in .env.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:100000',
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+    'scrypt:32768:8:1',
+]
+
+def time_method(method, samples, salt_length=10):
+    """Time hashing and verifying a password with one method in the current process.
+
+    Returns:
+        tuple: (hashes per second, milliseconds per hash, milliseconds per verify)
+    """
+    password = 'benchmark-Password1!'
+    # warm up, so the first call's setup cost is not counted
+    pwhash = generate_password_hash(password, method, salt_length=salt_length)
+
+    start = time.perf_counter()
+    for _ in range(samples):
+        pwhash = generate_password_hash(password, method, salt_length=salt_length)
+    hash_time = (time.perf_counter() - start) / samples
+
+    start = time.perf_counter()
+    for _ in range(samples):
+        check_password_hash(pwhash, password)
+    verify_time = (time.perf_counter() - start) / samples
+
+    return 1 / hash_time, hash_time * 1000, verify_time * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark password hashing policies.')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help='Werkzeug hash method strings to compare')
+    parser.add_argument('--samples', type=int, default=10, help='Hashes timed per method')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Processes used for the all-core figure')
+    args = parser.parse_args()
+
+    print(f"{'method':<26}{'hash/s/core':>12}{'ms/hash':>10}{'ms/verify':>11}{f'hash/s x{args.processes}':>14}")
+    for method in args.methods:
+        try:
+            per_core, hash_ms, verify_ms = time_method(method, args.samples)
+        except (ValueError, AttributeError) as e:
+            print(f"{method:<26} unsupported: {e}")
+            continue
+        # run one timing per process at once to see how throughput scales across cores
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            results = list(pool.map(time_method, [method] * args.processes, [args.samples] * args.processes))
+        all_cores = sum(result[0] for result in results)
+        print(f"{method:<26}{per_core:>12.1f}{hash_ms:>10.1f}{verify_ms:>11.1f}{all_cores:>14.1f}")
+
+if __name__ == "__main__":
+    main()
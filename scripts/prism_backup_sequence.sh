@@ -1,20 +1,10 @@
 #!/bin/bash
+# Hourly backup from cron: streamed table backup, consistent database copy and incremental snapshot.
+# Dependencies are installed at deploy time, not on every run.
 
-cd /home/ubuntu/prism_backend
+cd /home/ubuntu/prism_backend || exit 1
 
-# Verify the installation and check the Python version
-python --version
-
-# Create a virtual environment if it doesn't exist
-if [ ! -d "venv" ]; then
-    python -m venv venv
-fi
-
-# Activate the virtual environment
+# Activate the virtual environment created at deploy time
 source venv/bin/activate
 
-# Install the required Python packages
-pip install -r requirements.txt
-
-cd /home/ubuntu/prism_backend
-./scripts/db_backup.py
\ No newline at end of file
+./scripts/db_backup.py
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+""" tweet_scoring_benchmark.py
+Measures tweet scoring throughput in tweets/sec.
+
+Synthetic border tweets are scored with the keyword lexicon alone, with the lexicon plus the
+TF-IDF linear model in one process, and with the full scorer in a process pool, the way
+`flask custom score_tweets` runs it. No database or network is used.
+
+Usage: Run from the terminal as such:
+
+Goto the scripts directory:
+> cd scripts; ./tweet_scoring_benchmark.py
+
+Or run from the root of the project, with a custom tweet count, batch size and pool sizes:
+> scripts/tweet_scoring_benchmark.py --tweets 200000 --batch 1000 --workers 1 2 4
+
+Set the pool size with TWEET_SCORE_WORKERS and the batch size with TWEET_SCORE_BATCH in .env.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the directory containing main.py to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import model.artifacts
+from model.tweet_worker import TweetScorer, LEXICON, lexicon_raw, init_worker, score_batch
+
+PLACES = ['San Ysidro', 'Otay Mesa', 'la garita', 'the border', 'SENTRI', 'ready lane', 'pedestrian west']
+FILLER = ['right now', 'this morning', 'today', 'again', 'ugh', 'heads up', 'fyi', 'ahorita', 'hoy', 'otra vez']
+
+def synthetic_tweets(count, seed=42):
+    """Tweets mixing a place, lexicon phrases, a reported wait and filler words."""
+    rng = random.Random(seed)
+    phrases = list(LEXICON)
+    tweets = []
+    for _ in range(count):
+        words = [rng.choice(PLACES)] + rng.sample(phrases, rng.randint(0, 3)) + rng.sample(FILLER, 2)
+        if rng.random() < 0.5:
+            words.append(f"{rng.randint(5, 180)} min")
+        rng.shuffle(words)
+        tweets.append(' '.join(words))
+    return tweets
+
+def throughput(label, count, seconds):
+    print(f"{label:<36} {count / seconds:>12,.0f} tweets/sec  ({seconds:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tweet scoring throughput.')
+    parser.add_argument('--tweets', type=int, default=100000, help='synthetic tweets to score')
+    parser.add_argument('--batch', type=int, default=1000, help='tweets per batch, as TWEET_SCORE_BATCH')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='pool sizes to measure')
+    args = parser.parse_args()
+
+    tweets = synthetic_tweets(args.tweets)
+    batches = [tweets[i:i + args.batch] for i in range(0, len(tweets), args.batch)]
+
+    start = time.perf_counter()
+    scorer = TweetScorer()
+    scorer.fit(tweets)
+    print(f"Trained on {len(tweets)} tweets in {time.perf_counter() - start:.2f}s, "
+          f"{len(scorer.vectorizer.vocabulary_) if scorer.vectorizer else 0} terms")
+
+    start = time.perf_counter()
+    for batch in batches:
+        lexicon_raw(batch)
+    throughput('lexicon, 1 process', len(tweets), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for batch in batches:
+        scorer.score(batch)
+    throughput('lexicon + tf-idf model, 1 process', len(tweets), time.perf_counter() - start)
+
+    # the pool workers load the scorer from the artifact directory, point it at a scratch copy
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        model.artifacts.ARTIFACT_DIR = artifact_dir
+        scorer.save_artifact()
+        for workers in args.workers:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_benchmark_worker, initargs=(artifact_dir,)) as pool:
+                # warm the workers up, so process start and model loading are not timed
+                list(pool.map(score_batch, [[0]] * workers, [['warm up']] * workers))
+                start = time.perf_counter()
+                ids = [list(range(len(batch))) for batch in batches]
+                scored = sum(len(scores) for _, scores in pool.map(score_batch, ids, batches))
+                throughput(f'lexicon + tf-idf model, {workers} workers', scored, time.perf_counter() - start)
+
+def _init_benchmark_worker(artifact_dir):
+    model.artifacts.ARTIFACT_DIR = artifact_dir
+    init_worker()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+""" twitter_stub_server.py
+A local stand-in for the Twitter/X recent search endpoint, to test ingestion without a token or quota.
+
+Serves GET /2/tweets/search/recent like the real API: query, max_results, since_id and next_token
+are honored, pages are newest first with meta.newest_id and meta.next_token, and every response
+carries x-rate-limit-limit, -remaining and -reset headers. Once the limit of a window is used up,
+requests get 429 until it resets. Tweets are generated for each query at --rate per minute, so
+repeated runs see new tweets.
+
+Usage: Run from the terminal as such:
+
+Goto the scripts directory:
+> cd scripts; ./twitter_stub_server.py
+
+Or run from the root of the project, with a tight rate limit to exercise the waiting:
+> scripts/twitter_stub_server.py --port 3169 --limit 5 --window 30
+
+Then point the ingester at it:
+> TWITTER_API_URL=http://127.0.0.1:3169 TWITTER_BEARER_TOKEN=stub flask custom twitter_ingest
+"""
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# snowflake ids carry milliseconds since this epoch in their top bits, so they sort by time
+TWITTER_EPOCH_MS = 1288834974657
+WORDS = ['wait', 'line', 'garita', 'sentri', 'ready lane', 'traffic', 'slow', 'moving', 'closed', 'open']
+
+class StubTwitter:
+    """Generated tweets and the rate limit state, shared by the request threads."""
+
+    def __init__(self, rate, history, limit, window):
+        self.interval_ms = 60000 / rate
+        self.history_ms = history * 60000
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.window_end = 0
+        self.used = 0
+
+    def consume(self):
+        """Count a request against the window, returns (allowed, remaining, reset epoch seconds)."""
+        with self.lock:
+            now = time.time()
+            if now >= self.window_end:
+                self.window_end = int(now) + self.window
+                self.used = 0
+            if self.used >= self.limit:
+                return False, 0, self.window_end
+            self.used += 1
+            return True, self.limit - self.used, self.window_end
+
+    def tweets(self, query):
+        """Every tweet of the query in the history, newest first."""
+        seed = zlib.crc32(query.encode())
+        now_ms = int(time.time() * 1000)
+        # one tweet per interval, offset per query so queries get different ids
+        step = int(self.interval_ms)
+        newest = now_ms - (now_ms - seed % step) % step
+        tweets = []
+        for at_ms in range(newest, now_ms - self.history_ms, -step):
+            tweet_id = ((at_ms - TWITTER_EPOCH_MS) << 22) | (seed & 0x3fffff)
+            words = ' '.join(WORDS[(tweet_id >> (4 * i)) % len(WORDS)] for i in range(3))
+            tweets.append({
+                'id': str(tweet_id),
+                'author_id': str(1000 + tweet_id % 97),
+                'created_at': datetime.fromtimestamp(at_ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'text': f"{query}: {words} {tweet_id % 120} min"
+            })
+        return tweets
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, body, remaining, reset):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('x-rate-limit-limit', str(stub.limit))
+            self.send_header('x-rate-limit-remaining', str(remaining))
+            self.send_header('x-rate-limit-reset', str(reset))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/2/tweets/search/recent':
+                self.send_error(404)
+                return
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                self.send_json(401, {'title': 'Unauthorized', 'status': 401}, stub.limit, int(time.time()))
+                return
+            allowed, remaining, reset = stub.consume()
+            if not allowed:
+                self.send_json(429, {'title': 'Too Many Requests', 'status': 429}, remaining, reset)
+                return
+
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if 'query' not in params:
+                self.send_json(400, {'title': 'Invalid Request', 'detail': 'query is required'}, remaining, reset)
+                return
+            max_results = min(max(int(params.get('max_results', 10)), 10), 100)
+            since_id = int(params.get('since_id', 0))
+            offset = int(params.get('next_token', 0))
+
+            matched = [tweet for tweet in stub.tweets(params['query']) if int(tweet['id']) > since_id]
+            page = matched[offset:offset + max_results]
+            meta = {'result_count': len(page)}
+            if page:
+                # like the real API, newest_id is the newest of the whole result set on every page
+                meta['newest_id'] = matched[0]['id']
+                meta['oldest_id'] = page[-1]['id']
+            if offset + max_results < len(matched):
+                meta['next_token'] = str(offset + max_results)
+            body = {'meta': meta}
+            if page:
+                body['data'] = page
+            self.send_json(200, body, remaining, reset)
+
+        def log_message(self, format, *args):
+            print(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local stub of the Twitter/X recent search API.')
+    parser.add_argument('--port', type=int, default=3169)
+    parser.add_argument('--rate', type=float, default=2, help='tweets per minute generated for each query')
+    parser.add_argument('--history', type=int, default=24 * 60, help='minutes of tweets available to search')
+    parser.add_argument('--limit', type=int, default=180, help='requests allowed per rate limit window')
+    parser.add_argument('--window', type=int, default=15 * 60, help='seconds in a rate limit window')
+    args = parser.parse_args()
+
+    stub = StubTwitter(args.rate, args.history, args.limit, args.window)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(stub))
+    print(f"🐦 Stub recent search on http://127.0.0.1:{args.port}/2/tweets/search/recent")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stub server stopped")
+
+if __name__ == "__main__":
+    main()
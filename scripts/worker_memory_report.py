@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+""" worker_memory_report.py
+Reports the RSS and PSS of a gunicorn master and each of its workers.
+
+RSS counts every page a process has resident, shared or not, so it overstates the cost of workers
+sharing preloaded models. PSS splits each shared page between the processes mapping it, so the
+PSS of the master and workers adds up to what the server really uses.
+
+Usage: Run from the terminal as such:
+
+Goto the scripts directory:
+> cd scripts; ./worker_memory_report.py
+
+This starts gunicorn twice on a spare port, with each worker loading its own models
+(PRELOAD_MODELS=worker, before) and with the models loaded in the master before fork
+(PRELOAD_MODELS=master, after), and compares the two once their memory has settled.
+
+Or report a running server, from the root of the project:
+> scripts/worker_memory_report.py --pid $(pgrep -o -f "gunicorn main:app")
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# Add the directory containing main.py to the Python path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+from model.system_health import read_process_memory, child_pids, human_bytes
+
+def server_memory(master_pid):
+    """Memory of the master and each worker.
+
+    Returns:
+        list: (pid, role, memory dict) for the master then each worker
+    """
+    rows = [(master_pid, 'master', read_process_memory(master_pid))]
+    for pid in child_pids(master_pid):
+        try:
+            rows.append((pid, 'worker', read_process_memory(pid)))
+        except OSError:
+            # a worker exiting between listing and reading
+            continue
+    return rows
+
+def print_report(title, rows):
+    print(f"\n{title}")
+    print(f"{'pid':>8} {'role':<7} {'rss':>10} {'pss':>10} {'shared':>10} {'private':>10}")
+    for pid, role, memory in rows:
+        print(f"{pid:>8} {role:<7} {human_bytes(memory['rss'], 'Mi'):>10} {human_bytes(memory['pss'], 'Mi'):>10} "
+              f"{human_bytes(memory['shared'], 'Mi'):>10} {human_bytes(memory['private'], 'Mi'):>10}")
+    rss = sum(memory['rss'] for _, _, memory in rows)
+    pss = sum(memory['pss'] for _, _, memory in rows)
+    print(f"{'':>8} {'total':<7} {human_bytes(rss, 'Mi'):>10} {human_bytes(pss, 'Mi'):>10}")
+    return pss
+
+def measure(mode, workers, port, timeout):
+    """Start gunicorn with PRELOAD_MODELS=mode and report its memory once it stops growing.
+
+    Returns:
+        int: total PSS of the master and workers in bytes
+    """
+    env = dict(os.environ, PRELOAD_MODELS=mode, BACKGROUND_TASKS='')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'main:app', f'--workers={workers}', f'--bind=127.0.0.1:{port}'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        previous = None
+        steady = 0
+        while time.monotonic() < deadline:
+            time.sleep(1)
+            if server.poll() is not None:
+                raise SystemExit(f"❌ gunicorn exited with code {server.returncode} in {mode} mode")
+            rows = server_memory(server.pid)
+            rss = sum(memory['rss'] for _, _, memory in rows)
+            # settled when every worker is up and the total has not moved by 1% for 3 seconds
+            if len(rows) == workers + 1 and previous and abs(rss - previous) < previous / 100:
+                steady += 1
+                if steady >= 3:
+                    break
+            else:
+                steady = 0
+            previous = rss
+        else:
+            print(f"⚠️ Memory did not settle within {timeout}s in {mode} mode, reporting it as is")
+        return print_report(f"PRELOAD_MODELS={mode}", server_memory(server.pid))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description='Report RSS and PSS per gunicorn worker.')
+    parser.add_argument('--pid', type=int, help='report a running gunicorn master instead of starting one')
+    parser.add_argument('--workers', type=int, default=3, help='workers to start for the comparison')
+    parser.add_argument('--port', type=int, default=3168, help='port to bind for the comparison')
+    parser.add_argument('--timeout', type=int, default=300, help='seconds to wait for the models to load')
+    args = parser.parse_args()
+
+    if args.pid:
+        print_report(f"gunicorn master {args.pid}", server_memory(args.pid))
+        return
+
+    before = measure('worker', args.workers, args.port, args.timeout)
+    after = measure('master', args.workers, args.port, args.timeout)
+    saved = before - after
+    print(f"\nPSS with models per worker: {human_bytes(before, 'Mi')}, preloaded in the master: {human_bytes(after, 'Mi')}")
+    print(f"Preloading saves {human_bytes(saved, 'Mi')} ({saved * 100 / before:.0f}%) with {args.workers} workers")
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,125 @@
-import os, time, requests
+import os, time, json, argparse, tempfile, threading, requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
 import pytz
 
 BASE_URL = "https://www.bordertraffic.com/videoclips/free_california-baja_sanysidro-tijuana_passengerlines_0_255_"
 SAVE_DIR = "data/videos"
 pacific = pytz.timezone("America/Los_Angeles")
 
+# Concurrent fetchers used for backfill, also the size of the keep-alive connection pool
+WORKERS = 8
+# Minutes that 404 are recorded here so later backfills do not probe them again
+MISSING_MANIFEST = os.path.join(SAVE_DIR, "missing.json")
+# A clip for a very recent minute may not be published yet, only older misses are remembered
+MISSING_MIN_AGE = timedelta(minutes=10)
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=WORKERS, pool_maxsize=WORKERS))
+session.headers.update({"User-Agent": "Mozilla/5.0"})
+
+missing = set()
+missing_lock = threading.Lock()
+
 def ensure_dir(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
+def load_missing():
+    """Load the timestamps known to be unavailable upstream."""
+    try:
+        with open(MISSING_MANIFEST) as f:
+            missing.update(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+def save_missing():
+    """Write the known-missing timestamps atomically, a crash leaves the previous manifest intact."""
+    with missing_lock:
+        data = sorted(missing)
+    ensure_dir(SAVE_DIR)
+    temp_path = f"{MISSING_MANIFEST}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, MISSING_MANIFEST)
+
 def download_video_at(dt):
-    filename = dt.strftime("%Y_%m_%d_%H_%M") + ".mp4"
+    """Download the clip for one minute, returns True when it is in the archive afterwards."""
+    stamp = dt.strftime("%Y_%m_%d_%H_%M")
+    filename = stamp + ".mp4"
     url = f"{BASE_URL}{filename}"
     save_path = os.path.join(SAVE_DIR, filename)
 
     if os.path.exists(save_path):
-        return
+        return True
+    with missing_lock:
+        if stamp in missing:
+            return False
 
     try:
-        r = requests.get(url, stream=True, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
+        r = session.get(url, stream=True, timeout=10)
         if r.status_code == 200:
             ensure_dir(SAVE_DIR)
-            with open(save_path, "wb") as f:
-                for chunk in r.iter_content(8192):
-                    f.write(chunk)
+            # Write to a temp file and rename, so an interrupted download never looks complete
+            fd, temp_path = tempfile.mkstemp(dir=SAVE_DIR, prefix=f".{stamp}.", suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in r.iter_content(65536):
+                        f.write(chunk)
+                os.replace(temp_path, save_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
             print(f"✅ Saved {filename}")
-        else:
-            print(f"❌ Not available: {url} [{r.status_code}]")
+            return True
+        print(f"❌ Not available: {url} [{r.status_code}]")
+        if r.status_code == 404 and datetime.now(pacific) - dt > MISSING_MIN_AGE:
+            with missing_lock:
+                missing.add(stamp)
     except Exception as e:
         print(f"Error downloading {url}: {e}")
+    return False
 
 def download_latest():
     now = datetime.now(pacific)
     download_video_at(now)
 
-def backfill_last_2_hours():
+def backfill(minutes, workers=WORKERS):
+    """Fetch the last number of minutes concurrently, skipping archived and known-missing clips."""
     now = datetime.now(pacific)
-    for i in range(120):
-        dt = now - timedelta(minutes=i)
-        download_video_at(dt)
+    stamps = [now - timedelta(minutes=i) for i in range(minutes)]
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            saved = sum(pool.map(download_video_at, stamps))
+        print(f"📦 Backfill done: {saved}/{minutes} minutes archived")
+    finally:
+        save_missing()
+
+def backfill_last_2_hours():
+    backfill(120)
+
+def clean_partial_downloads():
+    """Remove temp files left behind by a crawler that was killed mid download."""
+    for f in os.listdir(SAVE_DIR):
+        if f.endswith(".part"):
+            os.remove(os.path.join(SAVE_DIR, f))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive border camera clips once a minute.")
+    parser.add_argument("--backfill-hours", type=float, default=None,
+                        help="Backfill this many hours before crawling (default: 2 hours if the archive is empty)")
+    args = parser.parse_args()
+
     ensure_dir(SAVE_DIR)
-    if not any(f.endswith(".mp4") for f in os.listdir(SAVE_DIR)):
+    clean_partial_downloads()
+    load_missing()
+    if args.backfill_hours is not None:
+        print(f"📦 Backfilling last {args.backfill_hours} hours...")
+        backfill(int(args.backfill_hours * 60))
+    elif not any(f.endswith(".mp4") for f in os.listdir(SAVE_DIR)):
         print("📦 No existing videos found. Backfilling last 2 hours...")
         backfill_last_2_hours()
     while True:
         download_latest()
-        time.sleep(29)
\ No newline at end of file
+        time.sleep(29)